@@ -4,9 +4,13 @@ from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy.orm import DeclarativeBase
 from werkzeug.middleware.proxy_fix import ProxyFix
+from utils.db_profile import normalize_database_url, engine_options, install_sqlite_pragmas
+from utils.query_stats import install_query_counter
+from utils.metrics import install_metrics
+from utils.request_profiler import install_request_profiler
 
-# Set up logging
-logging.basicConfig(level=logging.DEBUG)
+# Set up logging - INFO by default, LOG_LEVEL=DEBUG for troubleshooting
+logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO").upper())
 
 class Base(DeclarativeBase):
     pass
@@ -18,16 +22,56 @@ app = Flask(__name__)
 app.secret_key = os.environ.get("SESSION_SECRET", "dev-secret-key-change-in-production")
 app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
 
-# Configure the database - using SQLite for local storage
-app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///loss_prevention.db"
-app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
-    "pool_recycle": 300,
-    "pool_pre_ping": True,
-}
+# Configure the database - SQLite for local storage unless DATABASE_URL points
+# to PostgreSQL. Pool sizes are per web worker process; timeouts are in ms and
+# a statement timeout of 0 disables it
+app.config["SQLALCHEMY_DATABASE_URI"] = normalize_database_url(os.environ.get("DATABASE_URL", "sqlite:///loss_prevention.db"))
+app.config["DB_POOL_SIZE"] = int(os.environ.get("DB_POOL_SIZE", "5"))
+app.config["DB_MAX_OVERFLOW"] = int(os.environ.get("DB_MAX_OVERFLOW", "10"))
+app.config["DB_POOL_TIMEOUT"] = int(os.environ.get("DB_POOL_TIMEOUT", "30"))
+app.config["DB_POOL_RECYCLE"] = int(os.environ.get("DB_POOL_RECYCLE", "300"))
+app.config["DB_CONNECT_TIMEOUT"] = int(os.environ.get("DB_CONNECT_TIMEOUT", "10"))
+app.config["DB_STATEMENT_TIMEOUT_MS"] = int(os.environ.get("DB_STATEMENT_TIMEOUT_MS", "0"))
+app.config["DB_BUSY_TIMEOUT_MS"] = int(os.environ.get("DB_BUSY_TIMEOUT_MS", "30000"))
+app.config["SQLITE_JOURNAL_MODE"] = os.environ.get("SQLITE_JOURNAL_MODE", "WAL")
+app.config["SQLITE_SYNCHRONOUS"] = os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL")
+app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(app.config)
 app.config["UPLOAD_FOLDER"] = "uploads"
 app.config["CLIPS_FOLDER"] = "clips"
 app.config["VIDEO_SOURCE_FOLDER"] = "video_source"
-app.config["MAX_CONTENT_LENGTH"] = 16 * 1024 * 1024  # 16MB max file size
+# Video clips are cut by a background worker: "thread" runs it inside each web
+# process, "external" leaves it to a separate `python worker.py` process
+app.config["VIDEO_WORKER_MODE"] = os.environ.get("VIDEO_WORKER_MODE", "thread")
+app.config["VIDEO_WORKERS"] = int(os.environ.get("VIDEO_WORKERS", os.cpu_count() or 1))
+app.config["DVR_MAX_DOWNLOADS"] = int(os.environ.get("DVR_MAX_DOWNLOADS", "4"))
+# ffprobe metadata cache; set MEDIA_CACHE_FILE to keep it across restarts
+app.config["MEDIA_CACHE_SIZE"] = int(os.environ.get("MEDIA_CACHE_SIZE", "512"))
+app.config["MEDIA_CACHE_FILE"] = os.environ.get("MEDIA_CACHE_FILE")
+# Video source health probes run concurrently; results are reused for a short while
+app.config["PROBE_DEADLINE_SECONDS"] = float(os.environ.get("PROBE_DEADLINE_SECONDS", "12"))
+app.config["PROBE_CACHE_SECONDS"] = float(os.environ.get("PROBE_CACHE_SECONDS", "30"))
+# The dashboard counts matching rows up to this many and shows "N+" beyond it
+app.config["DASHBOARD_COUNT_LIMIT"] = int(os.environ.get("DASHBOARD_COUNT_LIMIT", "10000"))
+# Clips are revalidated by ETag after CLIP_CACHE_MAX_AGE seconds. Set
+# CLIP_ACCEL_REDIRECT_PREFIX to an nginx internal location aliased to the
+# clips folder to let nginx send clip bytes itself
+app.config["CLIP_CACHE_MAX_AGE"] = int(os.environ.get("CLIP_CACHE_MAX_AGE", "300"))
+app.config["CLIP_ACCEL_REDIRECT_PREFIX"] = os.environ.get("CLIP_ACCEL_REDIRECT_PREFIX")
+# Most transactions one bulk review (/api/review) may change
+app.config["BULK_REVIEW_LIMIT"] = int(os.environ.get("BULK_REVIEW_LIMIT", "5000"))
+# Parser processes for batch ingestion (/api/ingest and ingest.py)
+app.config["INGEST_WORKERS"] = int(os.environ.get("INGEST_WORKERS", os.cpu_count() or 1))
+# SQL statements a request may run before it is logged as over budget;
+# 0 turns per-request query counting off
+app.config["QUERY_BUDGET"] = int(os.environ.get("QUERY_BUDGET", "0"))
+# Requests sent with an X-Profile header are run under cProfile when this is
+# on; set PROFILE_TOKEN to require it as the header value
+app.config["PROFILE_REQUESTS"] = os.environ.get("PROFILE_REQUESTS", "0") == "1"
+app.config["PROFILE_TOKEN"] = os.environ.get("PROFILE_TOKEN")
+app.config["PROFILE_FOLDER"] = "profiles"
+app.config["BULK_INSERT_BATCH_SIZE"] = int(os.environ.get("BULK_INSERT_BATCH_SIZE", "5000"))
+# CSV exports are streamed in chunks, so multi-week reports can be uploaded
+app.config["MAX_CONTENT_LENGTH"] = int(os.environ.get("MAX_UPLOAD_MB", "512")) * 1024 * 1024
 
 # Initialize the app with the extension
 db.init_app(app)
@@ -38,9 +82,30 @@ os.makedirs(app.config["CLIPS_FOLDER"], exist_ok=True)
 os.makedirs(app.config["VIDEO_SOURCE_FOLDER"], exist_ok=True)
 
 with app.app_context():
+    install_sqlite_pragmas(db.engine, app.config)
+    install_query_counter(app, db.engine, app.config["QUERY_BUDGET"])
+    install_metrics(app, db.engine)
+    if app.config["PROFILE_REQUESTS"]:
+        install_request_profiler(app, app.config["PROFILE_FOLDER"], app.config["PROFILE_TOKEN"])
+    
     # Import models to create tables
     import models
     db.create_all()
+    
+    # Add columns and indexes introduced after an existing database was created
+    from utils.db_migrations import ensure_columns, ensure_indexes
+    ensure_columns()
+    ensure_indexes()
+    
+    # Build the statistics summary for databases that predate it
+    from utils.statistics import ensure_summary
+    ensure_summary()
+
+@app.cli.command("rebuild-summary")
+def rebuild_summary_command():
+    """Recompute the statistics summary from all transactions."""
+    from utils.statistics import rebuild_summary
+    print(f"Rebuilt transaction summary with {rebuild_summary()} rows")
 
 # Import routes
 import routes
@@ -0,0 +1,170 @@
+"""
+Review/upload concurrency benchmark.
+
+Runs one uploader process that keeps saving large reports, several
+reviewer processes posting /update_review and reader processes loading
+/dashboard against the same database, like gunicorn workers would, and
+reports latency and failures per role.
+
+'legacy' is the old SQLite setup (rollback journal, synchronous=FULL,
+pysqlite's 5 second lock timeout); 'tuned' is the default profile (WAL,
+synchronous=NORMAL, 30 second busy timeout). Pass --database-url to run
+against PostgreSQL instead, where uploads are loaded with COPY.
+
+Usage:
+    python benchmarks/concurrency_benchmark.py --compare
+    python benchmarks/concurrency_benchmark.py --database-url postgresql://localhost/lp_bench
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import statistics
+import subprocess
+import multiprocessing
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PROFILES = {
+    'legacy': {'SQLITE_JOURNAL_MODE': 'DELETE', 'SQLITE_SYNCHRONOUS': 'FULL', 'DB_BUSY_TIMEOUT_MS': '5000'},
+    'tuned': {'SQLITE_JOURNAL_MODE': 'WAL', 'SQLITE_SYNCHRONOUS': 'NORMAL', 'DB_BUSY_TIMEOUT_MS': '30000'}
+}
+SEED_TRANSACTIONS = 2000
+STATUSES = ['ok', 'review', 'fraud', 'pending']
+
+def load_app():
+    import logging
+    from app import app
+    import routes  # noqa: F401
+    logging.getLogger().setLevel(logging.ERROR)
+    return app
+
+def make_transactions(count, day, parse_seconds=0.0):
+    # Sleeping in ten steps stands in for the time spent parsing the file
+    start = datetime(2025, 1, 1) + timedelta(days=day)
+    step = max(count // 10, 1)
+    for number in range(count):
+        if parse_seconds and number % step == 0:
+            time.sleep(parse_seconds / 10)
+        yield {
+            'timestamp': start + timedelta(seconds=number),
+            'cashier_id': f"C{number % 40:03d}",
+            'register_id': str(number % 3 + 1),
+            'transaction_type': random.choice(['VOID', 'REFUND', 'NO SALE']),
+            'transaction_id': f"{day}-{number}",
+            'amount': round(random.uniform(1, 100), 2),
+            'pump_number': '',
+            'raw_data': {'Tran Date': str(start + timedelta(seconds=number)), 'Tran ID': number, 'Note': 'x' * 40}
+        }
+
+def uploader(deadline, rows, parse_seconds, results):
+    app = load_app()
+    from utils.ingest import store_report
+    timings, errors, day = [], 0, 1
+    with app.app_context():
+        while time.time() < deadline:
+            started = time.perf_counter()
+            try:
+                store_report(f"bench_{os.getpid()}_{day}.csv", f"{os.getpid():08x}{day:056x}",
+                             make_transactions(rows, day, parse_seconds), {'total_count': rows})
+                timings.append(time.perf_counter() - started)
+            except Exception:
+                errors += 1
+            day += 1
+    results.put(('upload', timings, errors))
+
+def reviewer(deadline, transaction_ids, results):
+    app = load_app()
+    timings, errors = [], 0
+    with app.test_client() as client:
+        while time.time() < deadline:
+            started = time.perf_counter()
+            response = client.post(f"/update_review/{random.choice(transaction_ids)}",
+                                   data={'status': random.choice(STATUSES), 'notes': 'benchmark'})
+            if response.status_code == 302:
+                timings.append(time.perf_counter() - started)
+            else:
+                errors += 1
+    results.put(('review', timings, errors))
+
+def reader(deadline, results):
+    app = load_app()
+    timings, errors = [], 0
+    with app.test_client() as client:
+        while time.time() < deadline:
+            started = time.perf_counter()
+            response = client.get('/dashboard', query_string={'status': 'pending'})
+            if response.status_code == 200:
+                timings.append(time.perf_counter() - started)
+            else:
+                errors += 1
+    results.put(('dashboard', timings, errors))
+
+def run_profile(args):
+    app = load_app()
+    from app import db
+    from models import SuspiciousTransaction
+    from utils.ingest import store_report
+    
+    with app.app_context():
+        store_report('bench_seed.csv', '0' * 64, make_transactions(SEED_TRANSACTIONS, 0), {'total_count': SEED_TRANSACTIONS})
+        transaction_ids = db.session.execute(db.select(SuspiciousTransaction.id)).scalars().all()
+        db.engine.dispose()
+    
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    deadline = time.time() + args.seconds + 5  # children need a few seconds to import the app
+    processes = [context.Process(target=uploader, args=(deadline, args.upload_rows, args.parse_seconds, results))]
+    processes += [context.Process(target=reviewer, args=(deadline, transaction_ids, results)) for _ in range(args.reviewers)]
+    processes += [context.Process(target=reader, args=(deadline, results)) for _ in range(args.readers)]
+    for process in processes:
+        process.start()
+    
+    merged = {}
+    for _ in processes:
+        role, timings, errors = results.get()
+        merged.setdefault(role, ([], 0))
+        merged[role] = (merged[role][0] + timings, merged[role][1] + errors)
+    for process in processes:
+        process.join()
+    
+    print(f"{'role':<10} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9} {'errors':>7}")
+    for role in ('upload', 'review', 'dashboard'):
+        timings, errors = merged.get(role, ([], 0))
+        timings = sorted(timing * 1000 for timing in timings) or [0.0]
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        print(f"{role:<10} {len(timings):>7} {statistics.median(timings):>9.1f} {p95:>9.1f} {timings[-1]:>9.1f} {errors:>7}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--profile', choices=sorted(PROFILES), default='tuned', help='SQLite settings to use')
+    parser.add_argument('--compare', action='store_true', help='Run every SQLite profile on a fresh database')
+    parser.add_argument('--database-url', help='Benchmark this database instead of a scratch SQLite file')
+    parser.add_argument('--seconds', type=int, default=15)
+    parser.add_argument('--reviewers', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=2)
+    parser.add_argument('--upload-rows', type=int, default=5000, help='Suspicious transactions per upload')
+    parser.add_argument('--parse-seconds', type=float, default=1.0, help='Simulated parse time per upload')
+    args = parser.parse_args()
+    
+    if args.compare:
+        for profile in sorted(PROFILES):
+            print(f"== {profile}", flush=True)
+            command = [sys.executable, __file__, '--profile', profile, '--seconds', str(args.seconds),
+                       '--reviewers', str(args.reviewers), '--readers', str(args.readers),
+                       '--upload-rows', str(args.upload_rows), '--parse-seconds', str(args.parse_seconds)]
+            subprocess.run(command, check=True)
+        return
+    
+    workdir = tempfile.mkdtemp(prefix='concurrency-bench-')
+    os.environ['DATABASE_URL'] = args.database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ['VIDEO_WORKER_MODE'] = 'external'
+    os.environ.update(PROFILES[args.profile])
+    os.chdir(workdir)  # uploads/ and clips/ folders are created here
+    run_profile(args)
+
+if __name__ == '__main__':
+    main()
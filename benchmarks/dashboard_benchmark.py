@@ -0,0 +1,150 @@
+"""
+Dashboard latency benchmark.
+
+Fills a scratch SQLite database with synthetic suspicious transactions in
+growing steps and times /dashboard for the common filter combinations at
+each size. With the composite indexes in models.py the latency should stay
+roughly flat as the table grows; run with --drop-indexes to compare against
+a table with primary keys only. 'deep page' follows an old page-number
+link (OFFSET), 'deep cursor' reaches the same page through keyset cursors.
+
+Usage:
+    python benchmarks/dashboard_benchmark.py --sizes 10000 100000 1000000
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import statistics
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+STATUSES = ['pending'] * 6 + ['ok'] * 3 + ['review', 'fraud']
+TYPES = ['VOID', 'REFUND', 'NO_SALE', 'DISCOUNT_REMOVED']
+CASHIERS = [f"C{number:03d}" for number in range(40)]
+REPORT_COUNT = 365
+INSERT_BATCH_SIZE = 50000
+
+def make_rows(start, count, total):
+    # Timestamps grow with the row number over one year, one report per day
+    first_day = datetime(2024, 1, 1)
+    seconds_per_row = 365 * 24 * 3600 / total
+    now = datetime.utcnow()
+    for number in range(start, start + count):
+        timestamp = first_day + timedelta(seconds=number * seconds_per_row)
+        yield {
+            'report_id': min(int(number * REPORT_COUNT / total), REPORT_COUNT - 1) + 1,
+            'transaction_timestamp': timestamp,
+            'cashier_id': random.choice(CASHIERS),
+            'register_id': '1',
+            'transaction_type': random.choice(TYPES),
+            'transaction_id': str(number),
+            'amount': round(random.uniform(1, 100), 2),
+            'review_status': random.choice(STATUSES),
+            'video_processed': False,
+            'created_date': now
+        }
+
+def fill(db, SuspiciousTransaction, start, stop, total):
+    from sqlalchemy import insert
+    
+    for batch_start in range(start, stop, INSERT_BATCH_SIZE):
+        count = min(INSERT_BATCH_SIZE, stop - batch_start)
+        db.session.execute(insert(SuspiciousTransaction.__table__), list(make_rows(batch_start, count, total)))
+    db.session.commit()
+
+def scenarios(total):
+    middle_day = (datetime(2024, 1, 1) + timedelta(days=182)).strftime('%Y-%m-%d')
+    return {
+        'no filter': {},
+        'status': {'status': 'pending'},
+        'type': {'type': 'VOID'},
+        'cashier': {'cashier': 'C007'},
+        'report': {'report_id': str(REPORT_COUNT // 2)},
+        'date': {'date_filter': middle_day},
+        'status+type+date': {'status': 'pending', 'type': 'REFUND', 'date_filter': middle_day},
+        'deep page': {'status': 'pending', 'page': '50'}
+    }
+
+def deep_cursor(client, params, pages):
+    # Follow the JSON listing's cursors to reach a deep page
+    cursor = ''
+    for _ in range(pages):
+        cursor = client.get('/api/transactions', query_string=dict(params, cursor=cursor)).get_json()['next_cursor']
+    return cursor
+
+def time_request(client, params, repeats):
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        response = client.get('/dashboard', query_string=params)
+        timings.append((time.perf_counter() - started) * 1000)
+        assert response.status_code == 200, response.status_code
+    return statistics.median(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--drop-indexes', action='store_true', help='Benchmark without the secondary indexes')
+    parser.add_argument('--explain', action='store_true', help='Print SQLite query plans at the largest size')
+    args = parser.parse_args()
+    
+    random.seed(42)
+    workdir = tempfile.mkdtemp(prefix='dashboard-bench-')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ.setdefault('VIDEO_WORKER_MODE', 'external')
+    
+    import logging
+    from sqlalchemy import text
+    from app import app, db
+    from models import TransactionReport, SuspiciousTransaction
+    import routes  # noqa: F401
+    
+    logging.getLogger().setLevel(logging.WARNING)
+    total = max(args.sizes)
+    
+    with app.app_context():
+        db.session.add_all([TransactionReport(filename=f"report_{day}.csv") for day in range(REPORT_COUNT)])
+        db.session.commit()
+        
+        if args.drop_indexes:
+            for index in SuspiciousTransaction.__table__.indexes:
+                index.drop(bind=db.engine)
+    
+    results = {}
+    loaded = 0
+    with app.app_context(), app.test_client() as client:
+        for size in sorted(args.sizes):
+            fill(db, SuspiciousTransaction, loaded, size, total)
+            loaded = size
+            with db.engine.begin() as connection:
+                connection.execute(text('ANALYZE'))
+            
+            cases = scenarios(total)
+            cases['deep cursor'] = {'status': 'pending', 'cursor': deep_cursor(client, {'status': 'pending'}, 49)}
+            for name, params in cases.items():
+                time_request(client, params, 1)  # warm up
+                results.setdefault(name, {})[size] = time_request(client, params, args.repeats)
+            print(f"Measured {size:,} rows", file=sys.stderr)
+        
+        if args.explain:
+            with db.engine.connect() as connection:
+                for name, sql in [
+                    ('status', "SELECT id FROM suspicious_transaction WHERE review_status = 'pending' ORDER BY transaction_timestamp DESC LIMIT 20"),
+                    ('cashier', "SELECT id FROM suspicious_transaction WHERE cashier_id = 'C007' ORDER BY transaction_timestamp DESC LIMIT 20"),
+                    ('date', "SELECT id FROM suspicious_transaction WHERE transaction_timestamp BETWEEN '2024-07-01' AND '2024-07-02' ORDER BY transaction_timestamp DESC LIMIT 20"),
+                ]:
+                    plan = connection.execute(text(f"EXPLAIN QUERY PLAN {sql}")).all()
+                    print(f"{name}: {'; '.join(row[-1] for row in plan)}")
+    
+    sizes = sorted(args.sizes)
+    print(f"{'median ms':<20}" + ''.join(f"{size:>12,}" for size in sizes))
+    for name, timings in results.items():
+        print(f"{name:<20}" + ''.join(f"{timings[size]:>12.1f}" for size in sizes))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+Parser regression check.
+
+Parses report files with the working tree's parser and with the parser of
+an earlier git revision and compares the suspicious transactions they
+find. CSV files are also parsed at several chunk sizes, since results must
+not depend on where chunk boundaries fall. Every Excel file is
+additionally exported to a CSV copy with the same preamble rows, which
+must give the same transactions as the workbook so re-uploads in either
+format are recognized as duplicates.
+
+Usage:
+    python benchmarks/parser_regression.py --rev d56b56c uploads/*.xls
+"""
+import os
+import sys
+import shutil
+import logging
+import argparse
+import tempfile
+import subprocess
+import importlib.util
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from utils import file_parser
+
+FIELDS = ('timestamp', 'cashier_id', 'register_id', 'transaction_type', 'transaction_id', 'amount', 'pump_number')
+
+def load_parser(rev, workdir):
+    source = subprocess.run(['git', 'show', f"{rev}:utils/file_parser.py"], cwd=ROOT,
+                            capture_output=True, text=True, check=True).stdout
+    path = os.path.join(workdir, 'baseline_file_parser.py')
+    with open(path, 'w') as f:
+        f.write(source)
+    spec = importlib.util.spec_from_file_location('baseline_file_parser', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def rows(transactions):
+    return [tuple(str(transaction.get(field)) for field in FIELDS) for transaction in transactions]
+
+def compare(label, expected, actual):
+    mismatches = sum(1 for left, right in zip(expected, actual) if left != right) + abs(len(expected) - len(actual))
+    print(f"{label:<60} {len(expected):>6} {len(actual):>6} {mismatches:>10}")
+    for left, right in [(left, right) for left, right in zip(expected, actual) if left != right][:3]:
+        print(f"    expected {left}\n    got      {right}")
+    return mismatches
+
+def csv_copy(workbook, workdir):
+    # The raw sheet, preamble included, as Modisoft would export it to CSV
+    frame = file_parser.read_excel_frame(workbook)
+    path = os.path.join(workdir, os.path.splitext(os.path.basename(workbook))[0] + '.csv')
+    frame.to_csv(path, header=False, index=False)
+    return path
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('paths', nargs='+', help='CSV or Excel report files')
+    parser.add_argument('--rev', default='HEAD', help='git revision whose parser is the reference')
+    parser.add_argument('--chunksize', type=int, nargs='+', default=[file_parser.CSV_CHUNK_SIZE, 7])
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+    
+    workdir = tempfile.mkdtemp(prefix='parser-regression-')
+    try:
+        baseline = load_parser(args.rev, workdir)
+        print(f"{'file':<60} {'before':>6} {'after':>6} {'mismatches':>10}")
+        total = 0
+        for path in args.paths:
+            expected = rows(baseline.iter_modisoft_file(path))
+            if path.lower().endswith('.csv'):
+                for chunksize in args.chunksize:
+                    actual = rows(file_parser.iter_modisoft_csv(path, chunksize=chunksize))
+                    total += compare(f"{os.path.basename(path)} (chunks of {chunksize})", expected, actual)
+                continue
+            
+            total += compare(os.path.basename(path), expected, rows(file_parser.iter_modisoft_file(path)))
+            exported = csv_copy(path, workdir)
+            for chunksize in args.chunksize:
+                actual = rows(file_parser.iter_modisoft_csv(exported, chunksize=chunksize))
+                total += compare(f"{os.path.basename(exported)} (chunks of {chunksize})", expected, actual)
+    finally:
+        shutil.rmtree(workdir)
+    
+    print(f"{total} mismatches")
+    return 1 if total else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,37 @@
+import sys
+import argparse
+
+# Batch ingestion of Modisoft exports, e.g. a backfill of several stores:
+#   python ingest.py --store-from-dir backfill/   (one subdirectory per store)
+#   python ingest.py --store 12 exports.zip
+def main():
+    parser = argparse.ArgumentParser(description="Ingest Modisoft report files, directories or zip archives")
+    parser.add_argument('paths', nargs='+', help="report files, directories or zip archives")
+    parser.add_argument('--store', dest='store_id', help="store ID to tag every report with")
+    parser.add_argument('--store-from-dir', action='store_true', help="use each file's directory name as its store ID")
+    parser.add_argument('--workers', type=int, help="parser processes (default INGEST_WORKERS)")
+    args = parser.parse_args()
+    
+    # Imported here so the spawned parser processes do not set up the app again
+    from app import app
+    from utils.batch_ingest import stage_paths, ingest_files
+    
+    with app.app_context():
+        staged = stage_paths(args.paths, app.config['UPLOAD_FOLDER'], args.store_id, args.store_from_dir)
+        results = ingest_files(staged, workers=args.workers)
+    
+    for result in results:
+        store = f" [store {result['store_id']}]" if result['store_id'] else ''
+        if result['status'] == 'processed':
+            print(f"{result['file']}{store}: report #{result['report_id']}, "
+                  f"{result['suspicious_transactions']} suspicious of {result['total_transactions']}")
+        elif result['status'] == 'duplicate':
+            print(f"{result['file']}{store}: already ingested as {result['duplicate_of']}")
+        else:
+            print(f"{result['file']}{store}: failed: {result['error']}")
+    
+    # Clips are cut by `python worker.py` or the web app's background worker
+    return 1 if any(result['status'] == 'failed' for result in results) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
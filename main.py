@@ -1,4 +1,23 @@
-from app import app
+import os
+
+# Parser processes spawned by batch ingest re-import this module as
+# __mp_main__ (before multiprocessing.parent_process() is set); they must
+# not set up the app or start a video worker
+if __name__ != "__mp_main__":
+    from app import app
+    from utils.job_queue import start_background_worker
+
+    def start_video_worker():
+        # Resume video jobs left queued or waiting for a retry by the previous run
+        if app.config["VIDEO_WORKER_MODE"] == "thread":
+            start_background_worker(app)
+
+    if __name__ != "__main__":
+        # Loaded by the WSGI server (gunicorn main:app) in each worker process
+        start_video_worker()
 
 if __name__ == "__main__":
+    # With the reloader only the child process it starts serves requests
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_video_worker()
     app.run(host="0.0.0.0", port=5000, debug=True)
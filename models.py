@@ -1,4 +1,5 @@
 from datetime import datetime
+from sqlalchemy.orm import deferred
 from app import db
 
 class TransactionReport(db.Model):
@@ -8,6 +9,9 @@ class TransactionReport(db.Model):
     processed = db.Column(db.Boolean, default=False)
     total_transactions = db.Column(db.Integer, default=0)
     suspicious_transactions = db.Column(db.Integer, default=0)
+    content_digest = db.Column(db.String(64), index=True)  # SHA-256 of the uploaded file
+    store_id = db.Column(db.String(50), index=True)  # Store the report was exported from
+    raw_columns = db.Column(db.Text)  # JSON list of column names for the raw_data arrays
 
 class SuspiciousTransaction(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -19,7 +23,7 @@ class SuspiciousTransaction(db.Model):
     transaction_id = db.Column(db.String(100))
     amount = db.Column(db.Float)
     pump_number = db.Column(db.String(10))
-    raw_data = db.Column(db.Text)  # Store original row data
+    raw_data = deferred(db.Column(db.Text))  # Original row as a JSON array, loaded only when accessed
     
     # Video clip info
     video_clip_path = db.Column(db.String(500))
@@ -35,10 +39,20 @@ class SuspiciousTransaction(db.Model):
     
     # Relationship
     report = db.relationship('TransactionReport', backref=db.backref('suspicious_transactions_list', lazy=True))
+    
+    # The dashboard filters on any of these columns and always orders by
+    # timestamp, so each index ends with it to serve both filter and sort
+    __table_args__ = (
+        db.Index('ix_suspicious_transaction_timestamp', 'transaction_timestamp'),
+        db.Index('ix_suspicious_transaction_status_timestamp', 'review_status', 'transaction_timestamp'),
+        db.Index('ix_suspicious_transaction_type_timestamp', 'transaction_type', 'transaction_timestamp'),
+        db.Index('ix_suspicious_transaction_cashier_timestamp', 'cashier_id', 'transaction_timestamp'),
+        db.Index('ix_suspicious_transaction_report_timestamp', 'report_id', 'transaction_timestamp'),
+    )
 
 class ReviewLog(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    transaction_id = db.Column(db.Integer, db.ForeignKey('suspicious_transaction.id'), nullable=False)
+    transaction_id = db.Column(db.Integer, db.ForeignKey('suspicious_transaction.id'), nullable=False, index=True)
     old_status = db.Column(db.String(20))
     new_status = db.Column(db.String(20))
     notes = db.Column(db.Text)
@@ -46,3 +60,67 @@ class ReviewLog(db.Model):
     
     # Relationship
     transaction = db.relationship('SuspiciousTransaction', backref='review_logs')
+
+class TransactionSummary(db.Model):
+    # Running counts per cashier and transaction type, kept up to date on
+    # upload and review so statistics never scan SuspiciousTransaction
+    id = db.Column(db.Integer, primary_key=True)
+    cashier_id = db.Column(db.String(50), nullable=False, default='')  # '' for unknown cashier
+    transaction_type = db.Column(db.String(50), nullable=False)
+    total = db.Column(db.Integer, nullable=False, default=0)
+    pending = db.Column(db.Integer, nullable=False, default=0)
+    ok = db.Column(db.Integer, nullable=False, default=0)
+    review = db.Column(db.Integer, nullable=False, default=0)
+    fraud = db.Column(db.Integer, nullable=False, default=0)
+    
+    __table_args__ = (
+        db.UniqueConstraint('cashier_id', 'transaction_type', name='uq_transaction_summary_cashier_type'),
+    )
+
+class FormatProfile(db.Model):
+    # Header offset, columns and column mapping of one export layout, reused
+    # when a later upload has the same header
+    id = db.Column(db.Integer, primary_key=True)
+    file_type = db.Column(db.String(10), nullable=False)  # csv, excel
+    signature_hash = db.Column(db.String(64), nullable=False)  # SHA-256 of file type, header row and header labels
+    profile = db.Column(db.Text, nullable=False)  # JSON format profile
+    use_count = db.Column(db.Integer, default=0)
+    created_date = db.Column(db.DateTime, default=datetime.utcnow)
+    last_used_date = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.UniqueConstraint('signature_hash', name='uq_format_profile_signature'),
+    )
+
+class VideoJob(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    transaction_id = db.Column(db.Integer, db.ForeignKey('suspicious_transaction.id'), nullable=False, index=True)
+    status = db.Column(db.String(20), default='queued')  # queued, running, done, failed
+    attempts = db.Column(db.Integer, default=0)
+    max_attempts = db.Column(db.Integer, default=3)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow)
+    clip_path = db.Column(db.String(500))
+    error = db.Column(db.Text)
+    created_date = db.Column(db.DateTime, default=datetime.utcnow)
+    started_date = db.Column(db.DateTime)
+    finished_date = db.Column(db.DateTime)
+    
+    # Relationship
+    transaction = db.relationship('SuspiciousTransaction', backref='video_jobs')
+    
+    # Workers poll for queued jobs that are due
+    __table_args__ = (
+        db.Index('ix_video_job_status_next_attempt', 'status', 'next_attempt_at'),
+    )
+
+class VideoSource(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    path = db.Column(db.String(500), nullable=False, unique=True)
+    camera = db.Column(db.String(50))
+    start_time = db.Column(db.DateTime, nullable=False, index=True)
+    end_time = db.Column(db.DateTime, nullable=False)
+    duration = db.Column(db.Float)  # Probed duration in seconds
+    file_mtime = db.Column(db.Float)
+    file_size = db.Column(db.BigInteger)
+    keyframes = db.Column(db.Text)  # JSON list of keyframe times in seconds
+    indexed_date = db.Column(db.DateTime, default=datetime.utcnow)
@@ -1,16 +1,57 @@
 import os
 import subprocess
+import zipfile
 from datetime import datetime
-from flask import render_template, request, redirect, url_for, flash, jsonify, send_file
+from flask import render_template, request, redirect, url_for, flash, jsonify, Response, stream_with_context
+from werkzeug.datastructures import MultiDict
+from sqlalchemy.orm import joinedload, load_only, raiseload, undefer
 from werkzeug.utils import secure_filename
 from app import app, db
-from models import TransactionReport, SuspiciousTransaction, ReviewLog
-from utils.file_parser import parse_modisoft_file
+from models import TransactionReport, SuspiciousTransaction, ReviewLog, VideoJob
+from utils.file_parser import iter_modisoft_file
+from utils.format_profiles import load_format_profiles
+from utils.ingest import upload_path, save_upload, find_processed_report, discard_upload, store_report
+from utils.batch_ingest import INGEST_EXTENSIONS, stage_zip, ingest_files
 from utils.video_processor import create_video_clip, test_video_connection
+from utils.media_cache import get_media_cache
+from utils.pagination import keyset_page
+from utils.clip_server import get_clip_path, forget_clip_path, send_clip
+from utils.csv_export import iter_transactions_csv
+from utils.raw_rows import decode_raw_row
+from utils.statistics import get_statistics, record_status_change
+from utils.reviews import apply_bulk_review
+from utils.metrics import render_metrics, timed_iter
+from utils.health_probe import first_positive, cached_probe
+from utils.job_queue import enqueue_video_jobs, start_background_worker, job_status
 import logging
 
 ALLOWED_EXTENSIONS = {'txt', 'csv', 'xls', 'xlsx'}
 
+# Columns each list page renders. Pages load only these and raise on any
+# other column or relationship, so a template change cannot quietly turn
+# into one extra query per row
+DASHBOARD_COLUMNS = (
+    SuspiciousTransaction.id, SuspiciousTransaction.transaction_timestamp, SuspiciousTransaction.transaction_type,
+    SuspiciousTransaction.cashier_id, SuspiciousTransaction.register_id, SuspiciousTransaction.amount,
+    SuspiciousTransaction.review_status, SuspiciousTransaction.video_processed,
+    SuspiciousTransaction.video_clip_path, SuspiciousTransaction.video_error
+)
+RELATED_COLUMNS = (
+    SuspiciousTransaction.id, SuspiciousTransaction.transaction_timestamp, SuspiciousTransaction.transaction_type,
+    SuspiciousTransaction.amount, SuspiciousTransaction.review_status
+)
+RECENT_FRAUD_COLUMNS = (
+    SuspiciousTransaction.id, SuspiciousTransaction.transaction_timestamp, SuspiciousTransaction.transaction_type,
+    SuspiciousTransaction.cashier_id
+)
+
+# Dashboard filters accepted by /api/review, as read by filter_transactions
+BULK_REVIEW_FILTERS = ('status', 'type', 'cashier', 'report_id', 'date_filter')
+
+def list_columns(columns):
+    """Loader options for a list page that renders only `columns`."""
+    return (load_only(*columns, raiseload=True), raiseload('*'))
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
@@ -20,17 +61,7 @@ def index():
     recent_reports = TransactionReport.query.order_by(TransactionReport.upload_date.desc()).limit(5).all()
     
     # Statistics
-    total_reports = TransactionReport.query.count()
-    total_suspicious = SuspiciousTransaction.query.count()
-    pending_reviews = SuspiciousTransaction.query.filter_by(review_status='pending').count()
-    fraud_count = SuspiciousTransaction.query.filter_by(review_status='fraud').count()
-    
-    stats = {
-        'total_reports': total_reports,
-        'total_suspicious': total_suspicious,
-        'pending_reviews': pending_reviews,
-        'fraud_count': fraud_count
-    }
+    stats = get_statistics()
     
     return render_template('index.html', recent_reports=recent_reports, stats=stats)
 
@@ -48,51 +79,42 @@ def upload_file():
             return redirect(request.url)
         
         if file and allowed_file(file.filename):
-            filename = secure_filename(file.filename)
             # Add timestamp to avoid conflicts
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_')
-            filename = timestamp + filename
-            filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            file.save(filepath)
+            filepath = upload_path(app.config['UPLOAD_FOLDER'], file.filename)
+            content_digest = save_upload(file, filepath)
+            store_id = request.form.get('store_id', '').strip() or None
+            
+            # An identical file was already processed, nothing to do
+            existing_report = find_processed_report(content_digest)
+            if existing_report:
+                discard_upload(filepath)
+                flash(f'This file was already uploaded as report #{existing_report.id} '
+                      f'({existing_report.filename}), skipping it.', 'info')
+                return redirect(url_for('dashboard', report_id=existing_report.id))
             
             try:
-                # Create report record
-                report = TransactionReport(filename=filename)
-                db.session.add(report)
-                db.session.commit()
-                
-                # Process the file
-                suspicious_transactions = parse_modisoft_file(filepath)
+                # Process the file, streaming CSV exports chunk by chunk and
+                # reusing the stored layout of known export formats; the report
+                # and its transactions are saved in one commit
+                parse_stats = {}
+                suspicious_transactions = timed_iter('parse', iter_modisoft_file(filepath, stats=parse_stats, profiles=load_format_profiles()))
+                report, save_stats = store_report(filepath, content_digest, suspicious_transactions, parse_stats, store_id)
+                suspicious_count = save_stats['rows']
                 
-                # Save suspicious transactions
-                for trans_data in suspicious_transactions:
-                    transaction = SuspiciousTransaction(
-                        report_id=report.id,
-                        transaction_timestamp=trans_data['timestamp'],
-                        cashier_id=trans_data.get('cashier_id'),
-                        register_id=trans_data.get('register_id'),
-                        transaction_type=trans_data['transaction_type'],
-                        transaction_id=trans_data.get('transaction_id'),
-                        amount=trans_data.get('amount'),
-                        pump_number=trans_data.get('pump_number'),
-                        raw_data=str(trans_data.get('raw_data', ''))
-                    )
-                    db.session.add(transaction)
+                flash(f'File processed successfully! Found {suspicious_count} suspicious transactions.', 'success')
+                if save_stats['duplicates']:
+                    flash(f"Skipped {save_stats['duplicates']} transactions already imported from earlier reports.", 'info')
+                if parse_stats.get('unparsable_timestamps'):
+                    flash(f"Skipped {parse_stats['unparsable_timestamps']} suspicious transactions with unreadable timestamps.", 'warning')
                 
-                # Update report
-                report.processed = True
-                report.total_transactions = trans_data.get('total_count', 0)
-                report.suspicious_transactions = len(suspicious_transactions)
-                db.session.commit()
-                
-                flash(f'File processed successfully! Found {len(suspicious_transactions)} suspicious transactions.', 'success')
-                
-                # Process video clips for each transaction
-                flash('Starting video processing...', 'info')
-                process_video_clips(report.id)
+                # Queue video clips for each transaction and return right away
+                queued_count = enqueue_video_jobs(report.id)
+                if app.config['VIDEO_WORKER_MODE'] == 'thread':
+                    start_background_worker(app)
+                flash(f'Queued {queued_count} video clips for processing.', 'info')
                 
                 return redirect(url_for('dashboard'))
-                
+            
             except Exception as e:
                 logging.error(f"Error processing file: {str(e)}")
                 flash(f'Error processing file: {str(e)}', 'error')
@@ -103,23 +125,31 @@ def upload_file():
     
     return render_template('upload.html')
 
-@app.route('/dashboard')
-def dashboard():
-    """Main dashboard for reviewing suspicious transactions"""
-    page = request.args.get('page', 1, type=int)
-    status_filter = request.args.get('status', 'all')
-    transaction_type_filter = request.args.get('type', 'all')
-    date_filter = request.args.get('date_filter', '')
-    report_id = request.args.get('report_id', '', type=str)
-    cashier_filter = request.args.get('cashier', '', type=str)
+def filter_transactions(args):
+    """
+    Build the suspicious transaction query for the dashboard filters.
+    
+    Args:
+        args: Request arguments with optional status, type, cashier,
+            report_id and date_filter values
+    
+    Returns:
+        tuple: (filtered query, list of error messages for invalid filters)
+    """
+    status_filter = args.get('status', 'all')
+    transaction_type_filter = args.get('type', 'all')
+    date_filter = args.get('date_filter', '')
+    report_id = args.get('report_id', '', type=str)
+    cashier_filter = args.get('cashier', '', type=str)
+    errors = []
     
     # Build query
     query = SuspiciousTransaction.query
     
-    if status_filter != 'all':
+    if status_filter and status_filter != 'all':
         query = query.filter_by(review_status=status_filter)
     
-    if transaction_type_filter != 'all':
+    if transaction_type_filter and transaction_type_filter != 'all':
         query = query.filter_by(transaction_type=transaction_type_filter)
     
     # Add cashier filtering
@@ -132,12 +162,11 @@ def dashboard():
             report_id_int = int(report_id)
             query = query.filter_by(report_id=report_id_int)
         except ValueError:
-            flash(f'Invalid report ID: {report_id}', 'error')
+            errors.append(f'Invalid report ID: {report_id}')
     
     # Add date filtering
     if date_filter:
         try:
-            from datetime import datetime, timedelta
             filter_date = datetime.strptime(date_filter, '%Y-%m-%d').date()
             start_datetime = datetime.combine(filter_date, datetime.min.time())
             end_datetime = datetime.combine(filter_date, datetime.max.time())
@@ -146,12 +175,47 @@ def dashboard():
                 SuspiciousTransaction.transaction_timestamp <= end_datetime
             )
         except ValueError:
-            flash(f'Invalid date format: {date_filter}', 'error')
+            errors.append(f'Invalid date format: {date_filter}')
     
-    # Pagination
-    transactions = query.order_by(SuspiciousTransaction.transaction_timestamp.desc()).paginate(
-        page=page, per_page=20, error_out=False
-    )
+    return query, errors
+
+def transaction_summary(transaction):
+    """JSON-serializable summary of a suspicious transaction for the APIs."""
+    return {
+        'id': transaction.id,
+        'transaction_timestamp': transaction.transaction_timestamp.isoformat(),
+        'transaction_type': transaction.transaction_type,
+        'amount': transaction.amount,
+        'cashier_id': transaction.cashier_id,
+        'register_id': transaction.register_id
+    }
+
+@app.route('/dashboard')
+def dashboard():
+    """Main dashboard for reviewing suspicious transactions"""
+    page = request.args.get('page', 1, type=int)
+    cursor = request.args.get('cursor', '')
+    status_filter = request.args.get('status', 'all')
+    transaction_type_filter = request.args.get('type', 'all')
+    date_filter = request.args.get('date_filter', '')
+    report_id = request.args.get('report_id', '', type=str)
+    cashier_filter = request.args.get('cashier', '', type=str)
+    
+    query, errors = filter_transactions(request.args)
+    for error in errors:
+        flash(error, 'error')
+    query = query.options(*list_columns(DASHBOARD_COLUMNS))
+    
+    # Keyset pagination; a page number from an old link is only used when
+    # there is no cursor
+    try:
+        transactions = keyset_page(
+            query, 20, cursor=cursor or None, offset=(max(page, 1) - 1) * 20,
+            count_limit=app.config['DASHBOARD_COUNT_LIMIT']
+        )
+    except ValueError as e:
+        flash(str(e), 'error')
+        transactions = keyset_page(query, 20, count_limit=app.config['DASHBOARD_COUNT_LIMIT'])
     
     return render_template('dashboard.html', 
                          transactions=transactions, 
@@ -159,12 +223,18 @@ def dashboard():
                          transaction_type_filter=transaction_type_filter,
                          date_filter=date_filter,
                          report_id=report_id,
-                         cashier_filter=cashier_filter)
+                         cashier_filter=cashier_filter,
+                         cursor=cursor)
 
 @app.route('/review/<int:transaction_id>')
 def review_transaction(transaction_id):
     """Review individual transaction with video"""
-    transaction = SuspiciousTransaction.query.get_or_404(transaction_id)
+    # One query for the transaction, its original row and the report's
+    # column dictionary
+    transaction = SuspiciousTransaction.query.options(
+        undefer(SuspiciousTransaction.raw_data),
+        joinedload(SuspiciousTransaction.report).load_only(TransactionReport.raw_columns)
+    ).get_or_404(transaction_id)
     
     # Get filter parameters to maintain context
     date_filter = request.args.get('date_filter', '')
@@ -172,24 +242,28 @@ def review_transaction(transaction_id):
     type_filter = request.args.get('type_filter', '')
     report_id = request.args.get('report_id', '')
     cashier_filter = request.args.get('cashier', '')
-    page = request.args.get('page', 1)
+    cursor = request.args.get('cursor', '')
     
     # Get related transactions (same cashier, same time period)
     related_transactions = SuspiciousTransaction.query.filter(
         SuspiciousTransaction.cashier_id == transaction.cashier_id,
         SuspiciousTransaction.transaction_timestamp >= transaction.transaction_timestamp,
         SuspiciousTransaction.id != transaction.id
-    ).limit(5).all()
+    ).options(*list_columns(RELATED_COLUMNS)).limit(5).all()
+    
+    # Original report row; raw_data is deferred everywhere else
+    raw_row = decode_raw_row(transaction.raw_data, transaction.report.raw_columns)
     
     return render_template('review.html', 
                          transaction=transaction,
                          related_transactions=related_transactions,
+                         raw_row=raw_row,
                          date_filter=date_filter,
                          status_filter=status_filter,
                          type_filter=type_filter,
                          report_id=report_id,
                          cashier_filter=cashier_filter,
-                         page=page)
+                         cursor=cursor)
 
 @app.route('/update_review/<int:transaction_id>', methods=['POST'])
 def update_review(transaction_id):
@@ -213,98 +287,115 @@ def update_review(transaction_id):
     transaction.review_status = new_status
     transaction.review_date = datetime.utcnow()
     transaction.review_notes = notes
+    record_status_change(transaction, old_status, new_status)
     
     db.session.commit()
     
     flash(f'Transaction marked as {new_status}', 'success')
     return redirect(url_for('dashboard'))
 
+@app.route('/api/review', methods=['POST'])
+def api_review():
+    """Set the review status of many transactions at once
+    
+    JSON body with `status`, optional `notes` and either `ids` (list of
+    transaction IDs) or `filter` (dashboard filters: status, type, cashier,
+    report_id, date_filter). All changes and their review logs are saved
+    in one database transaction.
+    """
+    data = request.get_json(silent=True) or {}
+    ids = data.get('ids')
+    filters = data.get('filter')
+    
+    if ids is not None:
+        if not isinstance(ids, list) or not ids or not all(isinstance(value, int) for value in ids):
+            return jsonify({'error': 'ids must be a non-empty list of transaction IDs'}), 400
+        if len(ids) > app.config['BULK_REVIEW_LIMIT']:
+            return jsonify({'error': f"At most {app.config['BULK_REVIEW_LIMIT']} ids per request"}), 400
+        query = SuspiciousTransaction.query.filter(SuspiciousTransaction.id.in_(ids))
+    elif isinstance(filters, dict):
+        unknown = sorted(set(filters) - set(BULK_REVIEW_FILTERS))
+        if unknown:
+            return jsonify({'error': f"Unknown filters: {', '.join(unknown)}"}), 400
+        if not any(filters.get(key) not in ('', 'all', None) for key in BULK_REVIEW_FILTERS):
+            # An empty filter would match every transaction
+            return jsonify({'error': 'Provide ids or at least one filter'}), 400
+        query, errors = filter_transactions(MultiDict(filters))
+        if errors:
+            return jsonify({'error': '; '.join(errors)}), 400
+    else:
+        # An empty filter would match every transaction
+        return jsonify({'error': 'Provide ids or at least one filter'}), 400
+    
+    try:
+        result = apply_bulk_review(query, data.get('status'), data.get('notes') or '',
+                                   limit=app.config['BULK_REVIEW_LIMIT'])
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    result['status'] = data.get('status')
+    if ids is not None:
+        found = set(result['updated']) | set(result['unchanged'])
+        result['not_found'] = [transaction_id for transaction_id in ids if transaction_id not in found]
+    return jsonify(result)
+
 @app.route('/reports')
 def reports():
     """Generate reports and analytics"""
     # Summary statistics
-    total_transactions = SuspiciousTransaction.query.count()
-    
-    # By status
-    status_counts = db.session.query(
-        SuspiciousTransaction.review_status,
-        db.func.count(SuspiciousTransaction.id)
-    ).group_by(SuspiciousTransaction.review_status).all()
-    
-    # By transaction type
-    type_counts = db.session.query(
-        SuspiciousTransaction.transaction_type,
-        db.func.count(SuspiciousTransaction.id)
-    ).group_by(SuspiciousTransaction.transaction_type).all()
-    
-    # By cashier (top 10)
-    cashier_counts = db.session.query(
-        SuspiciousTransaction.cashier_id,
-        db.func.count(SuspiciousTransaction.id)
-    ).group_by(SuspiciousTransaction.cashier_id).order_by(
-        db.func.count(SuspiciousTransaction.id).desc()
-    ).limit(10).all()
+    stats = get_statistics()
     
     # Recent fraud cases
-    recent_fraud = SuspiciousTransaction.query.filter_by(review_status='fraud').order_by(
-        SuspiciousTransaction.review_date.desc()
-    ).limit(10).all()
+    recent_fraud = SuspiciousTransaction.query.filter_by(review_status='fraud').options(
+        *list_columns(RECENT_FRAUD_COLUMNS)
+    ).order_by(SuspiciousTransaction.review_date.desc()).limit(10).all()
     
     return render_template('reports.html',
-                         total_transactions=total_transactions,
-                         status_counts=status_counts,
-                         type_counts=type_counts,
-                         cashier_counts=cashier_counts,
+                         total_transactions=stats['total_suspicious'],
+                         status_counts=stats['status_counts'],
+                         type_counts=stats['type_counts'],
+                         cashier_counts=stats['cashier_counts'],
                          recent_fraud=recent_fraud)
 
 @app.route('/export_csv')
 def export_csv():
-    """Export suspicious transactions to CSV"""
-    import csv
-    import io
-    
-    output = io.StringIO()
-    writer = csv.writer(output)
-    
-    # Write header
-    writer.writerow([
-        'ID', 'Date', 'Time', 'Cashier ID', 'Register ID', 'Transaction Type',
-        'Transaction ID', 'Amount', 'Pump Number', 'Review Status', 'Review Notes'
-    ])
-    
-    # Write data
-    transactions = SuspiciousTransaction.query.all()
-    for trans in transactions:
-        writer.writerow([
-            trans.id,
-            trans.transaction_timestamp.strftime('%Y-%m-%d'),
-            trans.transaction_timestamp.strftime('%H:%M:%S'),
-            trans.cashier_id or '',
-            trans.register_id or '',
-            trans.transaction_type,
-            trans.transaction_id or '',
-            trans.amount or '',
-            trans.pump_number or '',
-            trans.review_status,
-            trans.review_notes or ''
-        ])
-    
-    # Create response
-    output.seek(0)
-    from flask import Response
+    """Export suspicious transactions to CSV
+    
+    Accepts the dashboard filters, and gzip=1 for a compressed download.
+    The file is streamed while rows are read from the database.
+    """
+    query, errors = filter_transactions(request.args)
+    if errors:
+        for error in errors:
+            flash(error, 'error')
+        return redirect(url_for('dashboard'))
+    
+    gzip = request.args.get('gzip') == '1'
+    filename = 'suspicious_transactions.csv.gz' if gzip else 'suspicious_transactions.csv'
+    
     return Response(
-        output.getvalue(),
-        mimetype='text/csv',
-        headers={'Content-Disposition': 'attachment; filename=suspicious_transactions.csv'}
+        stream_with_context(iter_transactions_csv(query, gzip=gzip)),
+        mimetype='application/gzip' if gzip else 'text/csv',
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
     )
 
 @app.route('/video/<int:transaction_id>')
 def serve_video(transaction_id):
-    """Serve video clip for a transaction"""
-    transaction = SuspiciousTransaction.query.get_or_404(transaction_id)
+    """Serve video clip for a transaction, with range and conditional requests"""
+    clip_path = get_clip_path(transaction_id)
     
-    if transaction.video_clip_path and os.path.exists(transaction.video_clip_path):
-        return send_file(transaction.video_clip_path)
+    file_stat = None
+    if clip_path:
+        try:
+            file_stat = os.stat(clip_path)
+        except OSError:
+            # The clip may have been re-cut under a new name
+            forget_clip_path(transaction_id)
+            clip_path = get_clip_path(transaction_id)
+            file_stat = os.stat(clip_path) if clip_path and os.path.exists(clip_path) else None
+    
+    if file_stat:
+        return send_clip(clip_path, file_stat)
     else:
         flash('Video clip not available', 'error')
         return redirect(url_for('dashboard'))
@@ -325,12 +416,13 @@ def video_settings():
     
     return render_template('video_settings.html', 
                          connection_status=connection_status,
-                         current_settings=current_settings)
+                         current_settings=current_settings,
+                         cache_stats=get_media_cache().stats())
 
 @app.route('/test_video_connection')
 def test_video_connection_route():
     """AJAX endpoint to test video connections"""
-    status = test_video_connection()
+    status = test_video_connection(refresh=request.args.get('refresh') == '1')
     return jsonify(status)
 
 @app.route('/test_rtsp_url', methods=['POST'])
@@ -376,7 +468,7 @@ def test_rtsp_url():
                     'error': error_msg,
                     'troubleshooting': 'Check if: 1) Camera is powered on, 2) Network connection is working, 3) Username/password are correct, 4) RTSP port 1050 is open'
                 })
-        
+    
     except subprocess.TimeoutExpired:
         logging.error("RTSP test timeout")
         return jsonify({
@@ -392,35 +484,11 @@ def test_rtsp_url():
             'troubleshooting': 'Check camera settings and network connectivity'
         })
 
-def process_video_clips(report_id):
-    """Process video clips for all suspicious transactions in a report"""
-    transactions = SuspiciousTransaction.query.filter_by(report_id=report_id).all()
-    processed_count = 0
-    error_count = 0
-    
-    logging.info(f"Processing video clips for {len(transactions)} transactions in report {report_id}")
-    
-    for transaction in transactions:
-        try:
-            logging.info(f"Processing video for transaction {transaction.id} at {transaction.transaction_timestamp}")
-            clip_path = create_video_clip(transaction)
-            if clip_path:
-                transaction.video_clip_path = clip_path
-                transaction.video_processed = True
-                processed_count += 1
-                logging.info(f"Successfully created video clip: {clip_path}")
-            else:
-                transaction.video_error = "No matching video source found for this timestamp"
-                error_count += 1
-                logging.warning(f"No video source found for transaction {transaction.id}")
-        except Exception as e:
-            logging.error(f"Error creating video clip for transaction {transaction.id}: {str(e)}")
-            transaction.video_error = str(e)
-            error_count += 1
-        
-        db.session.commit()
-    
-    logging.info(f"Video processing complete: {processed_count} success, {error_count} errors")
+@app.route('/jobs/<int:job_id>')
+def job_status_route(job_id):
+    """JSON status of a background video clip job"""
+    job = VideoJob.query.get_or_404(job_id)
+    return jsonify(job_status(job))
 
 @app.route('/test_video_processing')
 def test_video_processing():
@@ -464,23 +532,115 @@ def alibi_integration():
 
 @app.route('/api/pending_transactions')
 def api_pending_transactions():
-    """API endpoint to get transactions needing video review"""
-    pending = SuspiciousTransaction.query.filter(
+    """API endpoint to get transactions needing video review
+    
+    Returns a plain list; the cursor of the next page is sent in the
+    X-Next-Cursor and Link headers.
+    """
+    query = SuspiciousTransaction.query.filter(
         SuspiciousTransaction.video_processed == False
-    ).order_by(SuspiciousTransaction.transaction_timestamp.desc()).limit(20).all()
+    )
+    
+    try:
+        pending = keyset_page(
+            query, 20, cursor=request.args.get('cursor') or None,
+            count_limit=app.config['DASHBOARD_COUNT_LIMIT'] if request.args.get('total') == '1' else None
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    transactions = [transaction_summary(transaction) for transaction in pending.items]
+    
+    response = jsonify(transactions)
+    if pending.next_cursor:
+        response.headers['X-Next-Cursor'] = pending.next_cursor
+        response.headers['Link'] = f'<{url_for("api_pending_transactions", cursor=pending.next_cursor)}>; rel="next"'
+    if pending.total is not None:
+        response.headers['X-Total-Count'] = str(pending.total)
+        response.headers['X-Total-Exact'] = str(pending.total_is_exact).lower()
+    return response
+
+@app.route('/api/transactions')
+def api_transactions():
+    """JSON listing of suspicious transactions with the dashboard filters
+    
+    Query parameters are the dashboard filters plus cursor, limit (up to
+    100) and total=1 to include an approximate total.
+    """
+    query, errors = filter_transactions(request.args)
+    if errors:
+        return jsonify({'error': '; '.join(errors)}), 400
+    
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+    try:
+        page = keyset_page(
+            query, limit, cursor=request.args.get('cursor') or None,
+            count_limit=app.config['DASHBOARD_COUNT_LIMIT'] if request.args.get('total') == '1' else None
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
     transactions = []
-    for transaction in pending:
-        transactions.append({
-            'id': transaction.id,
-            'transaction_timestamp': transaction.transaction_timestamp.isoformat(),
-            'transaction_type': transaction.transaction_type,
-            'amount': transaction.amount,
-            'cashier_id': transaction.cashier_id,
-            'register_id': transaction.register_id
-        })
+    for transaction in page.items:
+        summary = transaction_summary(transaction)
+        summary['review_status'] = transaction.review_status
+        summary['report_id'] = transaction.report_id
+        transactions.append(summary)
+    
+    return jsonify({
+        'transactions': transactions,
+        'next_cursor': page.next_cursor,
+        'prev_cursor': page.prev_cursor,
+        'total': page.total,
+        'total_is_exact': page.total_is_exact if page.total is not None else None
+    })
+
+@app.route('/api/ingest', methods=['POST'])
+def api_ingest():
+    """Batch ingestion of several report files or zip archives of them
+    
+    Multipart form with one or more `files` and an optional `store_id`.
+    Files are parsed in parallel and each is saved as its own report.
+    """
+    uploads = request.files.getlist('files')
+    if not any(upload.filename for upload in uploads):
+        return jsonify({'error': 'No files selected'}), 400
+    
+    store_id = request.form.get('store_id', '').strip() or None
+    staged = []
+    rejected = []
+    for upload in uploads:
+        if not upload.filename:
+            continue
+        filepath = upload_path(app.config['UPLOAD_FOLDER'], upload.filename)
+        if upload.filename.lower().endswith('.zip'):
+            save_upload(upload, filepath)
+            try:
+                staged.extend(stage_zip(filepath, app.config['UPLOAD_FOLDER'], store_id))
+            except zipfile.BadZipFile:
+                rejected.append({'file': upload.filename, 'status': 'failed', 'error': 'Not a valid zip archive'})
+            finally:
+                discard_upload(filepath)
+        elif upload.filename.lower().endswith(INGEST_EXTENSIONS):
+            staged.append((filepath, save_upload(upload, filepath), store_id))
+        else:
+            rejected.append({'file': upload.filename, 'status': 'failed', 'error': 'Unsupported file type'})
     
-    return jsonify(transactions)
+    results = rejected + ingest_files(staged)
+    if app.config['VIDEO_WORKER_MODE'] == 'thread' and any(result['status'] == 'processed' for result in results):
+        start_background_worker(app)
+    
+    return jsonify({
+        'results': results,
+        'processed': sum(1 for result in results if result['status'] == 'processed'),
+        'duplicates': sum(1 for result in results if result['status'] == 'duplicate'),
+        'failed': sum(1 for result in results if result['status'] == 'failed')
+    })
+
+@app.route('/metrics')
+def metrics():
+    """Timing histograms of this worker process in Prometheus text format"""
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
 
 @app.route('/upload_video_clips', methods=['POST'])
 def upload_video_clips():
@@ -525,7 +685,7 @@ def upload_video_clips():
             'success': True, 
             'message': f'Uploaded {uploaded_count} video clips successfully'
         })
-        
+    
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
@@ -544,72 +704,19 @@ def live_feed_stream():
     alibi_password = os.environ.get('ALIBI_PASSWORD', 'password')
     camera_id = os.environ.get('ALIBI_CAMERA_ID', '4')  # Default to camera 4
     
-    # Test connection to your DVR with multiple authentication methods
+    test_url = f"http://{alibi_dvr_host}:{alibi_dvr_port}"
+    
+    def probe_dvr():
+        return probe_dvr_endpoints(test_url, alibi_username, alibi_password, app.config['PROBE_DEADLINE_SECONDS'])
+    
+    # Probe every auth method and endpoint at once, reusing a recent answer
     try:
-        import requests
-        from requests.auth import HTTPBasicAuth, HTTPDigestAuth
-        
-        test_url = f"http://{alibi_dvr_host}:{alibi_dvr_port}"
-        
-        # Try different authentication methods
-        auth_methods = [
-            HTTPBasicAuth(alibi_username, alibi_password),
-            HTTPDigestAuth(alibi_username, alibi_password),
-            None  # No auth
-        ]
-        
-        # Try different common endpoints
-        endpoints = [
-            '',
-            '/index.html',
-            '/login',
-            '/cgi-bin/main-cgi',
-            '/web'
-        ]
-        
-        last_error = None
-        
-        for auth in auth_methods:
-            for endpoint in endpoints:
-                try:
-                    full_url = test_url + endpoint
-                    response = requests.get(
-                        full_url, 
-                        auth=auth, 
-                        timeout=10,
-                        allow_redirects=True,
-                        verify=False  # Skip SSL verification for local DVR
-                    )
-                    
-                    if response.status_code in [200, 401, 403]:  # 401/403 means DVR is responding
-                        return jsonify({
-                            'dvr_url': test_url,
-                            'camera_id': camera_id,
-                            'status': 'dvr_responding',
-                            'port': alibi_dvr_port,
-                            'host': alibi_dvr_host,
-                            'auth_required': response.status_code in [401, 403],
-                            'endpoint': endpoint,
-                            'status_code': response.status_code
-                        })
-                        
-                except requests.exceptions.ConnectionError as e:
-                    last_error = f"Connection refused - DVR may be offline or firewalled"
-                    continue
-                except requests.exceptions.Timeout as e:
-                    last_error = f"Connection timeout - DVR not responding"
-                    continue
-                except Exception as e:
-                    last_error = str(e)
-                    continue
-        
-        return jsonify({
-            'error': last_error or 'All connection attempts failed',
-            'dvr_url': test_url,
-            'status': 'connection_failed',
-            'help': 'Check if DVR is online and accessible from this network'
-        })
-        
+        result = cached_probe(
+            ('live_feed', test_url, alibi_username),
+            probe_dvr,
+            ttl=app.config['PROBE_CACHE_SECONDS'],
+            refresh=request.args.get('refresh') == '1'
+        )
     except Exception as e:
         return jsonify({
             'error': f'Configuration error: {str(e)}',
@@ -617,12 +724,91 @@ def live_feed_stream():
             'status': 'config_error'
         })
     
+    if 'status_code' in result:
+        return jsonify({
+            'dvr_url': test_url,
+            'camera_id': camera_id,
+            'status': 'dvr_responding',
+            'port': alibi_dvr_port,
+            'host': alibi_dvr_host,
+            'auth_required': result['status_code'] in [401, 403],
+            'endpoint': result['endpoint'],
+            'status_code': result['status_code']
+        })
+    
     return jsonify({
-        'error': 'Local Alibi DVR not found. Please check network connection and IP address.',
-        'dvr_ip': alibi_dvr_ip,
-        'status': 'not_found'
+        'error': result['error'],
+        'dvr_url': test_url,
+        'status': 'connection_failed',
+        'help': 'Check if DVR is online and accessible from this network'
     })
 
+def probe_dvr_endpoints(test_url, username, password, deadline):
+    """
+    Probe a DVR web interface with every auth method and endpoint concurrently.
+    
+    Args:
+        test_url: DVR base URL
+        username: DVR username
+        password: DVR password
+        deadline: Overall deadline in seconds
+    
+    Returns:
+        dict: 'endpoint' and 'status_code' of the first answer showing the
+        DVR is responding, or 'error' if none did
+    """
+    import requests
+    from requests.auth import HTTPBasicAuth, HTTPDigestAuth
+    
+    # Try different authentication methods
+    auth_methods = [
+        HTTPBasicAuth(username, password),
+        HTTPDigestAuth(username, password),
+        None  # No auth
+    ]
+    
+    # Try different common endpoints
+    endpoints = [
+        '',
+        '/index.html',
+        '/login',
+        '/cgi-bin/main-cgi',
+        '/web'
+    ]
+    
+    def make_probe(auth, endpoint):
+        def probe():
+            response = requests.get(
+                test_url + endpoint,
+                auth=auth,
+                timeout=(5, 10),
+                allow_redirects=True,
+                verify=False  # Skip SSL verification for local DVR
+            )
+            if response.status_code in [200, 401, 403]:  # 401/403 means DVR is responding
+                return {'endpoint': endpoint, 'status_code': response.status_code}
+            return None
+        return probe
+    
+    probes = {
+        (index, endpoint): make_probe(auth, endpoint)
+        for index, auth in enumerate(auth_methods)
+        for endpoint in endpoints
+    }
+    key, result = first_positive(probes, deadline=deadline)
+    if key is not None:
+        return result
+    
+    last_error = None
+    for error in result.values():
+        if isinstance(error, requests.exceptions.ConnectionError):
+            last_error = "Connection refused - DVR may be offline or firewalled"
+        elif isinstance(error, (requests.exceptions.Timeout, TimeoutError)):
+            last_error = "Connection timeout - DVR not responding"
+        else:
+            last_error = str(error)
+    return {'error': last_error or 'All connection attempts failed'}
+
 @app.errorhandler(404)
 def not_found_error(error):
     return render_template('404.html'), 404
@@ -7,6 +7,7 @@ document.addEventListener('DOMContentLoaded', function() {
     initializeNotifications();
     initializeSearchFilters();
     initializeTooltips();
+    initializeBulkReview();
 });
 
 // File upload functionality
@@ -49,7 +50,9 @@ function initializeFileUpload() {
 // File validation
 function validateFile(file) {
     const allowedTypes = ['text/csv', 'application/vnd.ms-excel', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'];
-    const maxSize = 16 * 1024 * 1024; // 16MB
+    const fileInput = document.getElementById('file');
+    const maxSizeMb = fileInput && fileInput.dataset.maxMb ? parseInt(fileInput.dataset.maxMb, 10) : 16;
+    const maxSize = maxSizeMb * 1024 * 1024;
     
     if (!allowedTypes.includes(file.type)) {
         showNotification('Please select a CSV or Excel file.', 'error');
@@ -57,7 +60,7 @@ function validateFile(file) {
     }
     
     if (file.size > maxSize) {
-        showNotification('File size exceeds 16MB limit.', 'error');
+        showNotification('File size exceeds ' + maxSizeMb + 'MB limit.', 'error');
         return false;
     }
     
@@ -172,27 +175,127 @@ function initializeTooltips() {
 }
 
 // Transaction review functionality
-function updateTransactionStatus(transactionId, status) {
-    const formData = new FormData();
-    formData.append('status', status);
-    
-    fetch(`/update_review/${transactionId}`, {
+const REVIEW_BADGES = {
+    pending: ['bg-secondary', 'Pending'],
+    ok: ['bg-success', 'OK'],
+    review: ['bg-warning', 'Review'],
+    fraud: ['bg-danger', 'Fraud']
+};
+const REVIEW_ROW_CLASSES = {ok: 'table-success', review: 'table-warning', fraud: 'table-danger'};
+
+function submitReview(payload) {
+    return fetch('/api/review', {
         method: 'POST',
-        body: formData
+        headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify(payload)
     })
-    .then(response => response.json())
-    .then(data => {
-        if (data.success) {
-            showNotification('Transaction status updated successfully.', 'success');
-            location.reload();
-        } else {
-            showNotification('Error updating transaction status.', 'error');
+    .then(response => response.json().then(data => {
+        if (!response.ok) {
+            throw new Error(data.error || 'Error updating transaction status.');
+        }
+        return data;
+    }));
+}
+
+// Show a new review status on the dashboard rows without reloading
+function markRowsReviewed(ids, status) {
+    ids.forEach(function(id) {
+        const row = document.querySelector(`tr[data-transaction-id="${id}"]`);
+        if (!row) {
+            return;
+        }
+        Object.values(REVIEW_ROW_CLASSES).forEach(rowClass => row.classList.remove(rowClass));
+        if (REVIEW_ROW_CLASSES[status]) {
+            row.classList.add(REVIEW_ROW_CLASSES[status]);
+        }
+        const cell = row.querySelector('.review-status');
+        if (cell) {
+            const [badgeClass, label] = REVIEW_BADGES[status];
+            cell.innerHTML = `<span class="badge ${badgeClass}">${label}</span>`;
         }
+    });
+}
+
+function updateTransactionStatus(transactionId, status) {
+    submitReview({ids: [transactionId], status: status})
+    .then(data => {
+        markRowsReviewed(data.updated, status);
+        showNotification('Transaction status updated successfully.', 'success');
     })
     .catch(error => {
         console.error('Error:', error);
-        showNotification('Error updating transaction status.', 'error');
+        showNotification(error.message, 'error');
+    });
+}
+
+// Bulk review on the dashboard: selected rows or everything matching the filters
+function initializeBulkReview() {
+    const toolbar = document.getElementById('bulk-review');
+    if (!toolbar) {
+        return;
+    }
+    
+    const selectAll = document.getElementById('bulk-select-all');
+    const checkboxes = document.querySelectorAll('.bulk-select');
+    const selectedButton = toolbar.querySelector('[data-bulk-scope="selected"]');
+    const filterButton = toolbar.querySelector('[data-bulk-scope="filter"]');
+    
+    function selectedIds() {
+        return Array.from(checkboxes).filter(box => box.checked).map(box => parseInt(box.value, 10));
+    }
+    
+    function refreshSelection() {
+        const count = selectedIds().length;
+        document.getElementById('bulk-selected-count').textContent = count;
+        selectedButton.disabled = count === 0;
+        if (selectAll) {
+            selectAll.checked = count > 0 && count === checkboxes.length;
+        }
+    }
+    
+    function apply(payload, button) {
+        const originalText = button.innerHTML;
+        const status = document.getElementById('bulk-status').value;
+        payload.status = status;
+        payload.notes = document.getElementById('bulk-notes').value;
+        
+        showLoadingState(button);
+        submitReview(payload)
+        .then(data => {
+            markRowsReviewed(data.updated, status);
+            checkboxes.forEach(box => { box.checked = false; });
+            showNotification(`${data.updated.length} transactions marked as ${status}` +
+                (data.unchanged.length ? ` (${data.unchanged.length} already were)` : '') + '.', 'success');
+        })
+        .catch(error => {
+            console.error('Error:', error);
+            showNotification(error.message, 'error');
+        })
+        .finally(() => {
+            hideLoadingState(button, originalText);
+            refreshSelection();
+        });
+    }
+    
+    if (selectAll) {
+        selectAll.addEventListener('change', function() {
+            checkboxes.forEach(box => { box.checked = selectAll.checked; });
+            refreshSelection();
+        });
+    }
+    checkboxes.forEach(box => box.addEventListener('change', refreshSelection));
+    
+    selectedButton.addEventListener('click', function() {
+        apply({ids: selectedIds()}, selectedButton);
     });
+    
+    if (filterButton) {
+        filterButton.addEventListener('click', function() {
+            if (confirm('Change the status of every transaction matching the current filters, including other pages?')) {
+                apply({filter: JSON.parse(toolbar.dataset.filter)}, filterButton);
+            }
+        });
+    }
 }
 
 // Export functionality
@@ -0,0 +1,165 @@
+import os
+import time
+import zipfile
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from flask import current_app
+from utils.file_parser import iter_modisoft_file, parse_report_file
+from utils.format_profiles import load_format_profiles
+from utils.ingest import upload_path, save_stream, find_processed_report, discard_upload, store_report
+from utils.job_queue import enqueue_video_jobs
+from utils.metrics import observe, timed_iter
+
+# Report files picked up from directories and zip archives
+INGEST_EXTENSIONS = ('.csv', '.xls', '.xlsx')
+
+def stage_zip(archive_path, upload_folder, store_id=None):
+    """
+    Extract the report files of a zip archive into the upload folder.
+    
+    Args:
+        archive_path: Path to the zip archive
+        upload_folder: Upload directory
+        store_id: Store the reports belong to
+    
+    Returns:
+        list: (filepath, content digest, store ID) tuples
+    """
+    staged = []
+    with zipfile.ZipFile(archive_path) as archive:
+        for member in sorted(archive.infolist(), key=lambda member: member.filename):
+            if member.is_dir() or not member.filename.lower().endswith(INGEST_EXTENSIONS):
+                continue
+            # upload_path() keeps only the member's base name, so paths in the archive cannot escape
+            filepath = upload_path(upload_folder, member.filename)
+            with archive.open(member) as stream:
+                staged.append((filepath, save_stream(stream, filepath), store_id))
+    logging.info(f"Extracted {len(staged)} report files from {archive_path}")
+    return staged
+
+def stage_paths(paths, upload_folder, store_id=None, store_from_dir=False):
+    """
+    Copy report files, directories of them and zip archives into the upload folder.
+    
+    Args:
+        paths: Files, directories or zip archives
+        upload_folder: Upload directory
+        store_id: Store every report belongs to
+        store_from_dir: Use each file's parent directory name as its store ID
+    
+    Returns:
+        list: (filepath, content digest, store ID) tuples
+    """
+    sources = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                sources.extend(os.path.join(root, name) for name in sorted(files))
+        else:
+            sources.append(path)
+    
+    staged = []
+    for source in sources:
+        source_store = os.path.basename(os.path.dirname(os.path.abspath(source))) if store_from_dir else store_id
+        if source.lower().endswith('.zip'):
+            staged.extend(stage_zip(source, upload_folder, source_store))
+        elif source.lower().endswith(INGEST_EXTENSIONS):
+            filepath = upload_path(upload_folder, source)
+            with open(source, 'rb') as stream:
+                staged.append((filepath, save_stream(stream, filepath), source_store))
+        else:
+            logging.info(f"Skipping {source}: not a report file")
+    return staged
+
+def ingest_files(staged, workers=None):
+    """
+    Parse staged report files in parallel and save each as its own report.
+    
+    Files are parsed in a process pool, so a backfill scales with the number
+    of cores. Results are saved by the calling process as they complete, one
+    commit per file, so a bad file does not affect the others. Files whose
+    contents were already processed are skipped and removed.
+    
+    Args:
+        staged: (filepath, content digest, store ID) tuples from stage_paths
+        workers: Parser processes, defaults to INGEST_WORKERS
+    
+    Returns:
+        list: One result dict per file with file, store_id, status
+        ('processed', 'duplicate' or 'failed'), report_id, counts and error
+    """
+    if workers is None:
+        workers = current_app.config.get('INGEST_WORKERS', os.cpu_count() or 1)
+    
+    results = []
+    pending = []
+    seen_digests = {}
+    for filepath, content_digest, store_id in staged:
+        result = {'file': os.path.basename(filepath), 'store_id': store_id}
+        existing_report = find_processed_report(content_digest)
+        if existing_report or content_digest in seen_digests:
+            discard_upload(filepath)
+            result['status'] = 'duplicate'
+            result['report_id'] = existing_report.id if existing_report else None
+            result['duplicate_of'] = existing_report.filename if existing_report else seen_digests[content_digest]
+            results.append(result)
+            continue
+        seen_digests[content_digest] = result['file']
+        pending.append((filepath, content_digest, store_id, result))
+    
+    profiles = load_format_profiles()
+    start = time.perf_counter()
+    
+    if len(pending) <= 1 or workers <= 1:
+        # Not worth starting a pool; CSV exports are streamed straight into the database
+        for filepath, content_digest, store_id, result in pending:
+            parse_stats = {}
+            transactions = timed_iter('parse', iter_modisoft_file(filepath, stats=parse_stats, profiles=profiles))
+            _store_result(result, filepath, content_digest, store_id, transactions, parse_stats)
+            results.append(result)
+    else:
+        # Spawned workers import the parser and re-import the main module as
+        # __mp_main__; main.py skips app setup and the video worker there
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=min(workers, len(pending)), mp_context=context) as pool:
+            futures = {
+                pool.submit(parse_report_file, filepath, profiles): (filepath, content_digest, store_id, result)
+                for filepath, content_digest, store_id, result in pending
+            }
+            for future in as_completed(futures):
+                filepath, content_digest, store_id, result = futures[future]
+                try:
+                    transactions, parse_stats = future.result()
+                except Exception as e:
+                    logging.error(f"Error parsing {filepath}: {str(e)}")
+                    result.update(status='failed', error=str(e))
+                else:
+                    # Parsed in another process, so the span is recorded here
+                    observe('parse', parse_stats['parse_seconds'])
+                    _store_result(result, filepath, content_digest, store_id, transactions, parse_stats)
+                results.append(result)
+    
+    processed = sum(1 for result in results if result['status'] == 'processed')
+    logging.info(f"Ingested {processed} of {len(staged)} files in {time.perf_counter() - start:.2f}s "
+                 f"with {min(workers, max(len(pending), 1))} workers")
+    return results
+
+def _store_result(result, filepath, content_digest, store_id, transactions, parse_stats):
+    try:
+        report, save_stats = store_report(filepath, content_digest, transactions, parse_stats, store_id)
+    except Exception as e:
+        logging.error(f"Error processing {filepath}: {str(e)}")
+        result.update(status='failed', error=str(e))
+        return
+    
+    result.update(
+        status='processed',
+        report_id=report.id,
+        total_transactions=report.total_transactions,
+        suspicious_transactions=report.suspicious_transactions,
+        duplicates=save_stats['duplicates'],
+        unparsable_timestamps=parse_stats.get('unparsable_timestamps', 0),
+        queued_clips=enqueue_video_jobs(report.id)
+    )
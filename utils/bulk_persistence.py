@@ -0,0 +1,189 @@
+import io
+import logging
+import time
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import insert
+from app import db
+from models import TransactionReport, SuspiciousTransaction
+from utils.raw_rows import encode_raw_row
+from utils.metrics import observe
+
+DEFAULT_BATCH_SIZE = 5000
+
+def natural_key(row):
+    """Identity of a transaction across reports: (timestamp, register, transaction ID, type)."""
+    return (row['transaction_timestamp'], row['register_id'], row['transaction_id'], row['transaction_type'])
+
+def existing_natural_keys(connection, report_id, batch, store_id=None):
+    """
+    Natural keys of transactions from other reports in a batch's time range.
+    
+    Only reports of the same store are compared, since register and
+    transaction numbers repeat between stores.
+    
+    Args:
+        connection: Database connection
+        report_id: ID of the report being saved
+        batch: Rows about to be inserted
+        store_id: Store of the report, None for untagged reports
+        
+    Returns:
+        set: Natural keys already stored
+    """
+    timestamps = [row['transaction_timestamp'] for row in batch]
+    rows = connection.execute(
+        db.select(
+            SuspiciousTransaction.transaction_timestamp,
+            SuspiciousTransaction.register_id,
+            SuspiciousTransaction.transaction_id,
+            SuspiciousTransaction.transaction_type
+        ).where(
+            SuspiciousTransaction.transaction_timestamp >= min(timestamps),
+            SuspiciousTransaction.transaction_timestamp <= max(timestamps),
+            SuspiciousTransaction.report_id != report_id,
+            SuspiciousTransaction.report_id.in_(
+                db.select(TransactionReport.id).where(
+                    TransactionReport.store_id.is_(None) if store_id is None else TransactionReport.store_id == store_id
+                )
+            )
+        )
+    )
+    return {tuple(row) for row in rows}
+
+def copy_value(value):
+    """Format a value for COPY ... FROM STDIN in PostgreSQL's text format."""
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, datetime):
+        return value.isoformat(' ')
+    return str(value).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+def copy_rows(connection, table, rows):
+    """
+    Load rows into a table with PostgreSQL COPY, in the connection's transaction.
+    
+    Column defaults are evaluated here, since COPY bypasses the ones
+    SQLAlchemy applies to INSERT statements.
+    
+    Args:
+        connection: SQLAlchemy connection using psycopg2
+        table: Target Table
+        rows: dicts with the same keys
+    """
+    values = dict.fromkeys(rows[0])
+    defaults = {
+        column.name: column.default.arg(None) if column.default.is_callable else column.default.arg
+        for column in table.columns
+        if column.name not in values and column.default is not None and not column.default.is_sequence
+    }
+    columns = list(values) + list(defaults)
+    default_values = [copy_value(value) for value in defaults.values()]
+    
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write('\t'.join([copy_value(row[column]) for column in values] + default_values))
+        buffer.write('\n')
+    buffer.seek(0)
+    
+    quote = connection.dialect.identifier_preparer.quote
+    cursor = connection.connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {quote(table.name)} ({', '.join(quote(column) for column in columns)}) FROM STDIN", buffer
+        )
+    finally:
+        cursor.close()
+
+def save_suspicious_transactions(report_id, transactions, batch_size=None, skip_existing=True, store_id=None):
+    """
+    Save parsed suspicious transactions with batched executemany inserts.
+    
+    Rows are written through the current session without committing, so the
+    caller decides when the report is complete. Transactions already saved
+    by another report, such as an overlapping date range exported twice, are
+    skipped so they are not reviewed or clipped again. Raw rows are stored
+    as JSON arrays against a column dictionary kept on the report. On
+    PostgreSQL with psycopg2 each batch is loaded with COPY instead.
+    
+    Args:
+        report_id: ID of the TransactionReport the rows belong to
+        transactions: Iterable of suspicious transaction dictionaries
+        batch_size: Rows per INSERT batch, defaults to BULK_INSERT_BATCH_SIZE
+        skip_existing: Skip rows whose natural key is already stored
+        store_id: Store of the report, limits the duplicate check to it
+        
+    Returns:
+        dict: Number of rows saved, duplicates skipped, elapsed seconds,
+        rows per second and the column dictionary of the raw rows
+    """
+    if batch_size is None:
+        batch_size = current_app.config.get('BULK_INSERT_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+    
+    statement = insert(SuspiciousTransaction.__table__)
+    connection = db.session.connection()
+    use_copy = connection.dialect.name == 'postgresql' and connection.dialect.driver == 'psycopg2'
+    start = time.perf_counter()
+    saved_count = 0
+    duplicate_count = 0
+    raw_columns = None
+    batch = []
+    # Time spent writing, without the time the transactions take to parse
+    persist_seconds = 0.0
+    
+    def flush(batch):
+        nonlocal saved_count, duplicate_count, persist_seconds
+        flush_start = time.perf_counter()
+        if skip_existing:
+            existing = existing_natural_keys(connection, report_id, batch, store_id)
+            if existing:
+                new_rows = [row for row in batch if natural_key(row) not in existing]
+                duplicate_count += len(batch) - len(new_rows)
+                batch = new_rows
+        if batch and use_copy:
+            copy_rows(connection, SuspiciousTransaction.__table__, batch)
+            saved_count += len(batch)
+        elif batch:
+            connection.execute(statement, batch)
+            saved_count += len(batch)
+        persist_seconds += time.perf_counter() - flush_start
+    
+    for trans_data in transactions:
+        # The first row's columns become the report's column dictionary
+        raw_data = trans_data.get('raw_data') or {}
+        if raw_columns is None:
+            raw_columns = list(raw_data)
+        batch.append({
+            'report_id': report_id,
+            'transaction_timestamp': trans_data['timestamp'],
+            'cashier_id': trans_data.get('cashier_id'),
+            'register_id': trans_data.get('register_id'),
+            'transaction_type': trans_data['transaction_type'],
+            'transaction_id': trans_data.get('transaction_id'),
+            'amount': trans_data.get('amount'),
+            'pump_number': trans_data.get('pump_number'),
+            'raw_data': encode_raw_row(raw_data, raw_columns)
+        })
+        
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+    
+    if batch:
+        flush(batch)
+    
+    observe('persist', persist_seconds)
+    elapsed = time.perf_counter() - start
+    rows_per_sec = saved_count / elapsed if elapsed > 0 else 0.0
+    logging.info(f"Saved {saved_count} suspicious transactions for report {report_id} "
+                 f"in {elapsed:.2f}s ({rows_per_sec:.0f} rows/sec), skipped {duplicate_count} already stored")
+    
+    return {
+        'rows': saved_count,
+        'duplicates': duplicate_count,
+        'seconds': elapsed,
+        'rows_per_sec': rows_per_sec,
+        'raw_columns': raw_columns
+    }
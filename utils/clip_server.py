@@ -0,0 +1,97 @@
+import os
+import time
+import threading
+from urllib.parse import quote
+from flask import current_app, request, send_file, abort
+from app import db
+from models import SuspiciousTransaction
+
+# Seconds a transaction's clip path is served without asking the database again
+CLIP_PATH_CACHE_SECONDS = 60
+
+_clip_paths_lock = threading.Lock()
+_clip_paths = {}
+
+def get_clip_path(transaction_id):
+    """
+    Look up the clip path of a transaction, cached for a short while.
+    
+    Args:
+        transaction_id: ID of the SuspiciousTransaction
+    
+    Returns:
+        str: Clip path, or None if the transaction has no clip yet
+    
+    Raises:
+        NotFound: If the transaction does not exist
+    """
+    with _clip_paths_lock:
+        cached = _clip_paths.get(transaction_id)
+    if cached and time.monotonic() - cached[1] < CLIP_PATH_CACHE_SECONDS:
+        return cached[0]
+    
+    row = db.session.execute(
+        db.select(SuspiciousTransaction.video_clip_path).where(SuspiciousTransaction.id == transaction_id)
+    ).first()
+    if row is None:
+        abort(404)
+    
+    clip_path = row[0]
+    if clip_path:
+        with _clip_paths_lock:
+            _clip_paths[transaction_id] = (clip_path, time.monotonic())
+    return clip_path
+
+def forget_clip_path(transaction_id):
+    """Drop the cached clip path of a transaction."""
+    with _clip_paths_lock:
+        _clip_paths.pop(transaction_id, None)
+
+def send_clip(clip_path, file_stat):
+    """
+    Build the response for a video clip.
+    
+    Conditional requests (ETag/Last-Modified) and single byte ranges are
+    answered with 304/206. Under gunicorn ranged responses also go through
+    its sendfile() path. With CLIP_ACCEL_REDIRECT_PREFIX set, only an
+    X-Accel-Redirect header is returned and the front proxy sends the file.
+    
+    Args:
+        clip_path: Path to the clip file
+        file_stat: os.stat result of the clip file
+    
+    Returns:
+        Response: Flask response
+    """
+    accel_prefix = current_app.config.get('CLIP_ACCEL_REDIRECT_PREFIX')
+    if accel_prefix:
+        relative_path = os.path.relpath(os.path.abspath(clip_path), os.path.abspath(current_app.config['CLIPS_FOLDER']))
+        if not relative_path.startswith('..'):
+            response = current_app.response_class(mimetype='video/mp4')
+            response.headers['X-Accel-Redirect'] = f"{accel_prefix.rstrip('/')}/{quote(relative_path)}"
+            return response
+    
+    response = send_file(
+        os.path.abspath(clip_path),
+        mimetype='video/mp4',
+        conditional=True,
+        etag=f"{file_stat.st_mtime_ns:x}-{file_stat.st_size:x}",
+        last_modified=file_stat.st_mtime,
+        max_age=current_app.config.get('CLIP_CACHE_MAX_AGE', 300)
+    )
+    # Evidence clips must not be kept by shared caches
+    response.cache_control.public = False
+    response.cache_control.private = True
+    
+    # Werkzeug copies ranges through Python; gunicorn's file wrapper sends
+    # Content-Length bytes from the current file offset with sendfile()
+    file_wrapper = request.environ.get('wsgi.file_wrapper')
+    if response.status_code == 206 and file_wrapper \
+            and request.environ.get('SERVER_SOFTWARE', '').startswith('gunicorn'):
+        clip_file = open(clip_path, 'rb')
+        clip_file.seek(response.content_range.start)
+        response.response.close()
+        response.response = file_wrapper(clip_file, 8192)
+        response.direct_passthrough = True
+    
+    return response
@@ -0,0 +1,81 @@
+import io
+import csv
+import zlib
+from models import SuspiciousTransaction
+
+CSV_HEADER = [
+    'ID', 'Date', 'Time', 'Cashier ID', 'Register ID', 'Transaction Type',
+    'Transaction ID', 'Amount', 'Pump Number', 'Review Status', 'Review Notes'
+]
+
+# Rows fetched from the database per round trip and written per output chunk
+EXPORT_CHUNK_ROWS = 1000
+
+def iter_transactions_csv(query, gzip=False, chunk_rows=EXPORT_CHUNK_ROWS):
+    """
+    Stream suspicious transactions as CSV.
+    
+    Only the exported columns are selected, as plain tuples, and rows are
+    fetched `chunk_rows` at a time (a server-side cursor on PostgreSQL), so
+    memory use does not depend on the number of rows exported.
+    
+    Args:
+        query: Filtered SuspiciousTransaction query
+        gzip: Compress the output with gzip
+        chunk_rows: Rows per fetch and per yielded chunk
+    
+    Yields:
+        bytes: Consecutive pieces of the CSV file
+    """
+    rows = query.with_entities(
+        SuspiciousTransaction.id,
+        SuspiciousTransaction.transaction_timestamp,
+        SuspiciousTransaction.cashier_id,
+        SuspiciousTransaction.register_id,
+        SuspiciousTransaction.transaction_type,
+        SuspiciousTransaction.transaction_id,
+        SuspiciousTransaction.amount,
+        SuspiciousTransaction.pump_number,
+        SuspiciousTransaction.review_status,
+        SuspiciousTransaction.review_notes
+    ).order_by(SuspiciousTransaction.id).yield_per(chunk_rows)
+    
+    compressor = zlib.compressobj(wbits=31) if gzip else None
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_HEADER)
+    pending_rows = 0
+    
+    for (transaction_pk, timestamp, cashier_id, register_id, transaction_type,
+         transaction_id, amount, pump_number, review_status, review_notes) in rows:
+        writer.writerow([
+            transaction_pk,
+            timestamp.strftime('%Y-%m-%d'),
+            timestamp.strftime('%H:%M:%S'),
+            cashier_id or '',
+            register_id or '',
+            transaction_type,
+            transaction_id or '',
+            amount or '',
+            pump_number or '',
+            review_status,
+            review_notes or ''
+        ])
+        pending_rows += 1
+        if pending_rows >= chunk_rows:
+            chunk = _take_chunk(buffer, compressor)
+            pending_rows = 0
+            if chunk:
+                yield chunk
+    
+    chunk = _take_chunk(buffer, compressor)
+    if compressor:
+        chunk += compressor.flush()
+    if chunk:
+        yield chunk
+
+def _take_chunk(buffer, compressor):
+    data = buffer.getvalue().encode('utf-8')
+    buffer.seek(0)
+    buffer.truncate()
+    return compressor.compress(data) if compressor else data
@@ -0,0 +1,81 @@
+import logging
+from sqlalchemy import inspect, text
+from app import db
+
+def ensure_columns():
+    """
+    Add columns declared on the models that are missing from the database.
+    
+    Only nullable columns without server defaults are added, which is what
+    every column added to an existing model so far has been. Other missing
+    columns would need a backfill and are logged and skipped.
+    
+    Returns:
+        list: 'table.column' names of the columns that were added
+    """
+    engine = db.engine
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    added = []
+    
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        
+        existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing_columns:
+                continue
+            if not column.nullable or column.server_default is not None:
+                logging.warning(f"Not adding column {column.name} to {table.name}: "
+                                f"NOT NULL or server default columns need a manual migration")
+                continue
+            column_type = column.type.compile(dialect=engine.dialect)
+            logging.info(f"Adding column {column.name} to {table.name}")
+            with engine.begin() as connection:
+                connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+            added.append(f"{table.name}.{column.name}")
+    
+    return added
+
+def ensure_indexes():
+    """
+    Create indexes declared on the models that are missing from the database.
+    
+    db.create_all() only creates tables that do not exist yet, so databases
+    created before an index was added to a model never get it. This adds the
+    missing ones in place and refreshes the planner statistics. It is safe to
+    run on every start and works on SQLite and PostgreSQL.
+    
+    Returns:
+        list: Names of the indexes that were created
+    """
+    engine = db.engine
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    created = []
+    
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        
+        existing_indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+        existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+        for index in table.indexes:
+            if index.name in existing_indexes:
+                continue
+            if any(column.name not in existing_columns for column in index.columns):
+                # Its column was skipped by ensure_columns
+                logging.warning(f"Not creating index {index.name} on {table.name}: column missing")
+                continue
+            logging.info(f"Creating index {index.name} on {table.name}")
+            index.create(bind=engine)
+            created.append(index.name)
+    
+    if created:
+        # Let the query planner see the new indexes' selectivity
+        with engine.begin() as connection:
+            connection.execute(text('ANALYZE'))
+        logging.info(f"Created {len(created)} missing indexes: {', '.join(created)}")
+    
+    return created
@@ -0,0 +1,93 @@
+import logging
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+# journal_mode and synchronous values accepted from the environment
+SQLITE_JOURNAL_MODES = ('DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF')
+SQLITE_SYNCHRONOUS_MODES = ('OFF', 'NORMAL', 'FULL', 'EXTRA')
+
+def normalize_database_url(url):
+    """
+    Accept the postgres:// scheme some hosts put in DATABASE_URL.
+    
+    Args:
+        url: Database URL
+    
+    Returns:
+        str: URL SQLAlchemy understands
+    """
+    if url.startswith('postgres://'):
+        return 'postgresql://' + url[len('postgres://'):]
+    return url
+
+def engine_options(config):
+    """
+    Build SQLAlchemy engine options for the configured database.
+    
+    Pool sizes apply per process, so a gunicorn deployment opens up to
+    workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW) connections. PostgreSQL
+    connections get a server-side statement timeout; SQLite connections
+    wait DB_BUSY_TIMEOUT_MS for a lock instead of failing right away.
+    
+    Args:
+        config: Flask config with SQLALCHEMY_DATABASE_URI and the DB_* settings
+    
+    Returns:
+        dict: Value for SQLALCHEMY_ENGINE_OPTIONS
+    """
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+    options = {
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': True
+    }
+    
+    if url.get_backend_name() == 'sqlite':
+        options['connect_args'] = {'timeout': config['DB_BUSY_TIMEOUT_MS'] / 1000}
+        if url.database in (None, '', ':memory:'):
+            return options
+    elif url.get_backend_name() == 'postgresql':
+        connect_args = {'connect_timeout': config['DB_CONNECT_TIMEOUT']}
+        if config['DB_STATEMENT_TIMEOUT_MS']:
+            connect_args['options'] = f"-c statement_timeout={config['DB_STATEMENT_TIMEOUT_MS']}"
+        options['connect_args'] = connect_args
+    
+    options.update(
+        pool_size=config['DB_POOL_SIZE'],
+        max_overflow=config['DB_MAX_OVERFLOW'],
+        pool_timeout=config['DB_POOL_TIMEOUT']
+    )
+    return options
+
+def install_sqlite_pragmas(engine, config):
+    """
+    Set the journal mode, sync level and busy timeout on SQLite connections.
+    
+    In WAL mode readers never wait for a writer, so dashboards and video
+    workers keep working during an upload, and with synchronous=NORMAL a
+    commit no longer waits for an fsync. Writers still take turns; the busy
+    timeout makes them queue instead of failing with "database is locked".
+    
+    Args:
+        engine: SQLAlchemy engine
+        config: Flask config with the SQLITE_* and DB_BUSY_TIMEOUT_MS settings
+    """
+    if engine.dialect.name != 'sqlite':
+        return
+    
+    journal_mode = config['SQLITE_JOURNAL_MODE'].upper()
+    synchronous = config['SQLITE_SYNCHRONOUS'].upper()
+    if journal_mode not in SQLITE_JOURNAL_MODES or synchronous not in SQLITE_SYNCHRONOUS_MODES:
+        raise ValueError(f"Invalid SQLite settings: journal_mode={journal_mode}, synchronous={synchronous}")
+    busy_timeout = int(config['DB_BUSY_TIMEOUT_MS'])
+    
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute(f"PRAGMA journal_mode={journal_mode}")
+            cursor.execute(f"PRAGMA synchronous={synchronous}")
+            cursor.execute(f"PRAGMA busy_timeout={busy_timeout}")
+        finally:
+            cursor.close()
+    
+    logging.info(f"SQLite journal_mode={journal_mode}, synchronous={synchronous}, busy_timeout={busy_timeout}ms")
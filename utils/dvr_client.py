@@ -0,0 +1,149 @@
+import time
+import logging
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+# Download endpoints used by Alibi DVR firmware versions, in probe order
+DVR_DOWNLOAD_PATHS = [
+    '/cgi-bin/videodownload.cgi',
+    '/api/video/export',
+    '/video/download',
+    '/playback/download',
+    '/cgi-bin/playback.cgi',
+    '/download/video'
+]
+
+# Seconds before a DVR with no working endpoint is probed again
+NEGATIVE_CACHE_SECONDS = 300
+
+# Connect and read timeouts in seconds
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 60
+
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+_clients_lock = threading.Lock()
+_clients = {}
+
+class DvrClient:
+    """
+    Pooled HTTP client for downloading clips from an Alibi DVR.
+    
+    One keep-alive session is shared by every download, the working download
+    endpoint is discovered once per camera and cached, and the number of
+    concurrent downloads is bounded.
+    """
+    
+    def __init__(self, base_url, username, password, max_downloads=4):
+        self.base_url = base_url.rstrip('/')
+        self.session = requests.Session()
+        self.session.auth = (username, password)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_downloads)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._downloads = threading.BoundedSemaphore(max_downloads)
+        self._lock = threading.Lock()
+        self._endpoints = {}
+    
+    def download_clip(self, camera_id, start_time, end_time, output_path):
+        """
+        Download a clip for a camera and time range.
+        
+        Args:
+            camera_id: DVR camera/channel number
+            start_time: Start time for the clip
+            end_time: End time for the clip
+            output_path: Path for output clip
+        
+        Returns:
+            bool: True if the clip was saved
+        """
+        params = {
+            'camera': camera_id,
+            'channel': camera_id,
+            'starttime': start_time.strftime('%Y-%m-%d %H:%M:%S'),
+            'endtime': end_time.strftime('%Y-%m-%d %H:%M:%S'),
+            'format': 'mp4'
+        }
+        
+        with self._downloads:
+            path, discovered_at = self.cached_endpoint(camera_id)
+            if path:
+                if self._download(path, params, output_path):
+                    return True
+                # The endpoint stopped working, forget it and probe again
+                self.forget_endpoint(camera_id)
+            elif discovered_at and time.monotonic() - discovered_at < NEGATIVE_CACHE_SECONDS:
+                logging.info(f"Skipping DVR {self.base_url}: no download endpoint found recently")
+                return False
+            
+            for path in DVR_DOWNLOAD_PATHS:
+                if self._download(path, params, output_path):
+                    self.remember_endpoint(camera_id, path)
+                    return True
+            
+            self.remember_endpoint(camera_id, None)
+            return False
+    
+    def cached_endpoint(self, camera_id):
+        """
+        Get the cached download endpoint for a camera.
+        
+        Args:
+            camera_id: DVR camera/channel number
+        
+        Returns:
+            tuple: (path or None, monotonic time it was cached or None)
+        """
+        with self._lock:
+            return self._endpoints.get(str(camera_id), (None, None))
+    
+    def remember_endpoint(self, camera_id, path):
+        """Cache the download endpoint for a camera, None if none worked."""
+        with self._lock:
+            self._endpoints[str(camera_id)] = (path, time.monotonic())
+    
+    def forget_endpoint(self, camera_id):
+        """Drop the cached download endpoint for a camera."""
+        with self._lock:
+            self._endpoints.pop(str(camera_id), None)
+    
+    def _download(self, path, params, output_path):
+        dvr_url = f"{self.base_url}{path}"
+        try:
+            with self.session.get(dvr_url, params=params, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT), stream=True) as response:
+                if response.status_code == 200 and 'video' in response.headers.get('content-type', ''):
+                    # Save the video clip
+                    with open(output_path, 'wb', buffering=DOWNLOAD_CHUNK_SIZE) as f:
+                        for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                            f.write(chunk)
+                    logging.info(f"Successfully downloaded clip from local DVR via {dvr_url}")
+                    return True
+                elif response.status_code != 404:
+                    logging.warning(f"DVR endpoint {dvr_url} returned: {response.status_code}")
+        except requests.exceptions.RequestException as e:
+            logging.warning(f"Failed to connect to DVR at {dvr_url}: {str(e)}")
+        return False
+
+def get_dvr_client(host, port, username, password, max_downloads=4):
+    """
+    Get the shared client for a DVR, creating it on first use.
+    
+    Args:
+        host: DVR host name or IP
+        port: DVR web port
+        username: DVR username
+        password: DVR password
+        max_downloads: Maximum concurrent downloads from this DVR
+    
+    Returns:
+        DvrClient: Client shared by all threads of this process
+    """
+    key = (host, str(port), username, password)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = DvrClient(f"http://{host}:{port}", username, password, max_downloads=max_downloads)
+            _clients[key] = client
+        return client
@@ -1,203 +1,743 @@
 import pandas as pd
-import os
+import codecs
+import re
+import time
 import logging
 from datetime import datetime
 
-def parse_modisoft_file(filepath):
+# Define suspicious transaction types (Modisoft specific)
+# Based on your data, we're looking for non-"normal" transaction types
+SUSPICIOUS_TYPES = ['VOID', 'NO SALE', 'REFUND', 'DISCOUNT REMOVED', 'NO_SALE', 'VOID_TRANSACTION', 'CANCEL', 'COMP', 'RETURN', 'ADJUSTMENT']
+# Note: "normal" transactions are regular sales, everything else is potentially suspicious
+
+# One compiled alternation so the whole type column is matched in a single pass
+SUSPICIOUS_PATTERN = re.compile('|'.join(re.escape(sus_type) for sus_type in SUSPICIOUS_TYPES))
+
+TIMESTAMP_FORMATS = [
+    '%Y-%m-%d %H:%M:%S',
+    '%m/%d/%Y %H:%M:%S',
+    '%m-%d-%Y %H:%M:%S',
+    '%Y-%m-%d %H:%M',
+    '%m/%d/%Y %H:%M',
+    '%m/%d/%Y %I:%M:%S %p',
+    '%m/%d/%Y %I:%M %p',
+    '%Y-%m-%d',
+    '%m/%d/%Y'
+]
+
+# Formats of a separate time-of-day column, combined with a date-only column
+TIME_FORMATS = ['%H:%M:%S', '%H:%M', '%I:%M:%S %p', '%I:%M %p']
+
+# Column names of a separate time-of-day column
+TIME_COLUMN_NAMES = ['time', 'tran time', 'trans_time', 'transaction_time']
+
+# Values inspected when inferring the format of a timestamp column
+TIMESTAMP_SAMPLE_SIZE = 50
+
+MISSING_VALUES = ['nan', 'none', '']
+
+CSV_ENCODINGS = ['utf-8', 'latin-1', 'cp1252', 'iso-8859-1']
+
+# Rows per chunk when streaming CSV exports
+CSV_CHUNK_SIZE = 50000
+
+# Leading bytes inspected when sniffing the CSV encoding
+ENCODING_SAMPLE_SIZE = 64 * 1024
+
+# Excel reader engine by file signature: legacy OLE2 .xls and zipped .xlsx.
+# Modisoft names its xlsx exports .xls, so the extension is not reliable.
+EXCEL_SIGNATURES = [
+    (b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1', 'xlrd'),
+    (b'PK\x03\x04', 'openpyxl')
+]
+
+def parse_modisoft_file(filepath, profiles=None, stats=None):
     """
     Parse Modisoft transaction file and extract suspicious transactions.
     
     Args:
         filepath (str): Path to the uploaded file
-        
+        profiles (list): Known format profiles; a matching one skips header
+            and column detection
+        stats (dict): Optional dict that receives 'total_count',
+            'format_profile', 'profile_reused' and 'unparsable_timestamps'
+    
     Returns:
         list: List of suspicious transaction dictionaries
     """
-    suspicious_transactions = []
-    
+    stats = stats if stats is not None else {}
     try:
-        # Determine file type and read accordingly with better error handling
+        # CSV exports are streamed in chunks; report the final row count on every result
         if filepath.lower().endswith('.csv'):
-            # Try different encodings for CSV
-            for encoding in ['utf-8', 'latin-1', 'cp1252', 'iso-8859-1']:
-                try:
-                    df = pd.read_csv(filepath, encoding=encoding)
-                    break
-                except:
-                    continue
-            else:
-                raise ValueError("Could not read CSV file with any encoding")
-        elif filepath.lower().endswith(('.xls', '.xlsx')):
-            # Try reading Excel with different parameters
-            try:
-                # First try normal read
-                df = pd.read_excel(filepath)
-            except Exception as e1:
-                try:
-                    # Try with different engines
-                    df = pd.read_excel(filepath, engine='openpyxl')
-                except Exception as e2:
-                    try:
-                        # Try reading with xlrd for .xls files
-                        df = pd.read_excel(filepath, engine='xlrd')
-                    except Exception as e3:
-                        try:
-                            # Try skipping problematic rows
-                            df = pd.read_excel(filepath, skiprows=1)
-                        except Exception as e4:
-                            logging.error(f"All Excel reading attempts failed: {e1}, {e2}, {e3}, {e4}")
-                            raise ValueError("Could not read Excel file with any method")
+            suspicious_transactions = list(iter_modisoft_csv(filepath, stats=stats, profiles=profiles))
+            for suspicious_transaction in suspicious_transactions:
+                suspicious_transaction['total_count'] = stats['total_count']
+            return suspicious_transactions
+        
+        # Determine file type and read accordingly with better error handling
+        if filepath.lower().endswith(('.xls', '.xlsx')):
+            df = read_excel_frame(filepath)
         else:
             raise ValueError("Unsupported file format")
         
         logging.info(f"Loaded file with {len(df)} total transactions")
-        logging.info(f"Columns: {df.columns.tolist()}")
-        
-        # Clean up the dataframe for Modisoft format
-        # Look for the actual header row with transaction data
-        header_row_index = None
-        for i in range(min(10, len(df))):
-            row_data = df.iloc[i].astype(str)
-            row_str = ' '.join(row_data.values).upper()
-            if any(keyword in row_str for keyword in ['TRAN DATE', 'TRAN TYPE', 'TENDER', 'GROSS']):
-                header_row_index = i
-                logging.info(f"Found header row at index {i}: {df.iloc[i].tolist()}")
-                break
         
-        if header_row_index is not None:
-            # Use the found row as column headers
-            df.columns = df.iloc[header_row_index].astype(str)
-            df = df.iloc[header_row_index + 1:].reset_index(drop=True)
+        # Reuse a known layout for this export format, or detect it
+        profile = match_excel_profile(df, profiles or [])
+        stats['profile_reused'] = profile is not None
+        if profile is None:
+            profile = detect_format_profile(df)
+            profile['file_type'] = 'excel'
+            profile['signature'] = excel_header_signature(df, profile['header_row'])
+        stats['format_profile'] = profile
         
-        # Clean column names and remove empty columns
-        df.columns = [str(col).strip() if pd.notna(col) else f"Col_{i}" for i, col in enumerate(df.columns)]
-        df = df.dropna(axis=1, how='all').dropna(axis=0, how='all')
+        df = apply_format_profile(df, profile)
+        column_mapping = profile['column_mapping']
         
         logging.info(f"After cleanup: {len(df)} transactions with columns: {df.columns.tolist()}")
         
-        # Define suspicious transaction types (Modisoft specific)
-        # Based on your data, we're looking for non-"normal" transaction types
-        suspicious_types = ['VOID', 'NO SALE', 'REFUND', 'DISCOUNT REMOVED', 'NO_SALE', 'VOID_TRANSACTION', 'CANCEL', 'COMP', 'RETURN', 'ADJUSTMENT']
-        # Note: "normal" transactions are regular sales, everything else is potentially suspicious
+        # Filter for suspicious transactions
+        suspicious_transactions = detect_suspicious_transactions(df, column_mapping, stats)
+        stats['total_count'] = len(df)
         
-        # Try to identify columns with improved mapping
-        column_mapping = identify_columns(df.columns.tolist())
+        logging.info(f"Found {len(suspicious_transactions)} suspicious transactions")
+        return suspicious_transactions
+    
+    except Exception as e:
+        logging.error(f"Error parsing file {filepath}: {str(e)}")
+        raise
+
+def iter_modisoft_file(filepath, stats=None, profiles=None):
+    """
+    Iterate over the suspicious transactions in a Modisoft file.
+    
+    CSV exports are streamed so memory stays flat regardless of file size;
+    Excel workbooks are parsed in one go.
+    
+    Args:
+        filepath (str): Path to the uploaded file
+        stats (dict): Optional dict that receives 'total_count' once
+            exhausted, plus 'format_profile', 'profile_reused' and
+            'unparsable_timestamps'
+        profiles (list): Known format profiles
+    
+    Yields:
+        dict: Suspicious transaction dictionaries
+    """
+    if filepath.lower().endswith('.csv'):
+        yield from iter_modisoft_csv(filepath, stats=stats, profiles=profiles)
+        return
+    
+    yield from parse_modisoft_file(filepath, profiles=profiles, stats=stats)
+
+def parse_report_file(filepath, profiles=None):
+    """
+    Parse a whole Modisoft file, for use in a worker process.
+    
+    Args:
+        filepath (str): Path to the uploaded file
+        profiles (list): Known format profiles
+    
+    Returns:
+        tuple: (list of suspicious transaction dictionaries, stats dict
+        including parse_seconds)
+    """
+    stats = {}
+    start = time.perf_counter()
+    transactions = list(iter_modisoft_file(filepath, stats=stats, profiles=profiles))
+    stats['parse_seconds'] = time.perf_counter() - start
+    return transactions, stats
+
+def iter_modisoft_csv(filepath, chunksize=CSV_CHUNK_SIZE, stats=None, profiles=None):
+    """
+    Stream suspicious transactions from a Modisoft CSV export.
+    
+    The encoding is sniffed once and the file is read in bounded chunks.
+    The header offset and column mapping come from a matching format profile,
+    or are detected on the leading rows. Every chunk is read by the profile's
+    column positions, so a column that is empty in one chunk cannot shift
+    the columns of the next. Only the profile's columns are
+    loaded, with the transaction type read as a category and the ID columns
+    as text.
+    
+    Args:
+        filepath (str): Path to the CSV file
+        chunksize (int): Rows per chunk
+        stats (dict): Optional dict that receives 'total_count' once
+            exhausted, plus 'format_profile', 'profile_reused' and
+            'unparsable_timestamps'
+        profiles (list): Known format profiles
+    
+    Yields:
+        dict: Suspicious transaction dictionaries, 'total_count' is the
+        number of rows read so far
+    """
+    encoding = sniff_encoding(filepath)
+    logging.info(f"Streaming {filepath} as {encoding} in chunks of {chunksize} rows")
+    
+    total_count = 0
+    found_count = 0
+    
+    try:
+        profile = match_csv_profile(filepath, encoding, profiles or [])
+        if stats is not None:
+            stats['profile_reused'] = profile is not None
+        if profile is None:
+            # Detected on a fixed sample rather than the first chunk, so the
+            # kept columns and their mapping do not depend on the chunk size
+            profile = detect_csv_profile(filepath, encoding)
+        if stats is not None:
+            stats['format_profile'] = profile
         
-        # Enhanced pattern search for Modisoft data
-        if not column_mapping:
-            logging.info("Standard column mapping failed, searching for Modisoft patterns...")
-            column_mapping = {}
-            
-            # Search all data for transaction types
-            for col in df.columns:
-                try:
-                    col_name = str(col).upper()
-                    sample_data = df[col].astype(str).str.upper().head(20)
-                    
-                    # Check if this column contains transaction types
-                    if any(sus_type in ' '.join(sample_data.values) for sus_type in suspicious_types):
-                        column_mapping['transaction_type'] = col
-                        logging.info(f"Found transaction types in column: {col}")
-                    
-                    # Check for date/time columns
-                    if any(keyword in col_name for keyword in ['DATE', 'TIME', 'TIMESTAMP']):
-                        column_mapping['timestamp'] = col
-                        logging.info(f"Found timestamp column: {col}")
-                    
-                    # Check for amount columns
-                    if any(keyword in col_name for keyword in ['AMOUNT', 'TOTAL', 'PRICE', '$']):
-                        column_mapping['amount'] = col
-                    
-                    # Check for cashier columns
-                    if any(keyword in col_name for keyword in ['CASHIER', 'CLERK', 'EMPLOYEE']):
-                        column_mapping['cashier_id'] = col
-                        
-                    # Check for register columns
-                    if any(keyword in col_name for keyword in ['REGISTER', 'REG', 'TERMINAL']):
-                        column_mapping['register_id'] = col
-                        
-                except Exception as e:
-                    logging.warning(f"Error analyzing column {col}: {e}")
-                    continue
+        column_mapping = profile['column_mapping']
+        column_names = profile['column_names']
+        logging.info(f"Header columns: {column_names}")
         
-        logging.info(f"Final column mapping: {column_mapping}")
+        # The transaction type takes far less memory as a category. ID columns
+        # are read as text: pandas would make a numeric column with blanks
+        # float, turning '7745' into '7745.0' depending on the chunk
+        labels = profile['signature']
+        id_columns = [column_mapping.get(key) for key in ('cashier_id', 'register_id', 'transaction_id', 'pump_number')]
+        dtype = {}
+        for position, name in zip(profile['columns'], column_names):
+            if name == column_mapping.get('transaction_type'):
+                dtype[labels[position]] = 'category'
+            elif name in id_columns:
+                dtype[labels[position]] = str
         
-        if not column_mapping or 'transaction_type' not in column_mapping:
-            # Last resort - show user what we found for manual mapping
-            logging.error("Could not automatically identify columns")
-            sample_data = df.head(10).to_string()
-            logging.info(f"Sample data:\n{sample_data}")
-            raise ValueError("Could not identify required columns. Please check the Modisoft export format.")
+        with pd.read_csv(filepath, encoding=encoding, encoding_errors='replace', header=profile['header_row'],
+                         usecols=profile['columns'], dtype=dtype, chunksize=chunksize) as reader:
+            for chunk in reader:
+                chunk.columns = column_names
+                chunk = chunk.dropna(axis=0, how='all')
+                
+                total_count += len(chunk)
+                for suspicious_transaction in detect_suspicious_transactions(chunk, column_mapping, stats):
+                    suspicious_transaction['total_count'] = total_count
+                    found_count += 1
+                    yield suspicious_transaction
+    except Exception as e:
+        logging.error(f"Error parsing file {filepath}: {str(e)}")
+        raise
+    
+    if stats is not None:
+        stats['total_count'] = total_count
+    logging.info(f"Streamed {total_count} transactions, found {found_count} suspicious transactions")
+
+def detect_csv_profile(filepath, encoding, sample_rows=CSV_CHUNK_SIZE):
+    """
+    Detect the format profile of a CSV export from its leading rows.
+    
+    Args:
+        filepath (str): Path to the CSV file
+        encoding (str): File encoding
+        sample_rows (int): Rows read for detection
+    
+    Returns:
+        dict: Format profile
+    """
+    sample = pd.read_csv(filepath, encoding=encoding, encoding_errors='replace', nrows=sample_rows)
+    profile = detect_format_profile(sample)
+    profile['file_type'] = 'csv'
+    profile['signature'] = csv_header_signature(filepath, encoding, profile['header_row'])
+    return profile
+
+def csv_header_signature(filepath, encoding, header_row):
+    """
+    Column labels pandas reads from a CSV header row.
+    
+    Args:
+        filepath (str): Path to the CSV file
+        encoding (str): File encoding
+        header_row (int): Header row as passed to read_csv
+    
+    Returns:
+        list: Column labels
+    """
+    header = pd.read_csv(filepath, encoding=encoding, encoding_errors='replace', header=header_row, nrows=0)
+    return [str(col) for col in header.columns]
+
+def excel_header_signature(df, header_row):
+    """
+    Header row cells of a workbook read with the first row as header.
+    
+    Args:
+        df: Raw DataFrame as read from the file
+        header_row (int): Header row of the format profile
+    
+    Returns:
+        list: Header cells as strings
+    """
+    cells = df.columns if header_row == 0 else df.iloc[header_row - 1]
+    return [str(cell) for cell in cells]
+
+def match_csv_profile(filepath, encoding, profiles):
+    """
+    Find the format profile whose header matches a CSV file.
+    
+    Args:
+        filepath (str): Path to the CSV file
+        encoding (str): File encoding
+        profiles (list): Known format profiles
+    
+    Returns:
+        dict: Matching profile or None
+    """
+    signatures = {}
+    for profile in profiles:
+        if profile.get('file_type') != 'csv':
+            continue
+        header_row = profile['header_row']
+        if header_row not in signatures:
+            try:
+                signatures[header_row] = csv_header_signature(filepath, encoding, header_row)
+            except (ValueError, pd.errors.ParserError):
+                signatures[header_row] = None
+        if signatures[header_row] == profile['signature']:
+            logging.info(f"Reusing format profile with header row {header_row}")
+            return profile
+    return None
+
+def match_excel_profile(df, profiles):
+    """
+    Find the format profile whose header matches a workbook.
+    
+    Args:
+        df: Raw DataFrame as read from the file
+        profiles (list): Known format profiles
+    
+    Returns:
+        dict: Matching profile or None
+    """
+    for profile in profiles:
+        if profile.get('file_type') != 'excel' or profile['header_row'] > len(df):
+            continue
+        if excel_header_signature(df, profile['header_row']) == profile['signature']:
+            logging.info(f"Reusing format profile with header row {profile['header_row']}")
+            return profile
+    return None
+
+def detect_excel_engine(filepath):
+    """
+    Pick the Excel reader engine from the file's leading bytes.
+    
+    Args:
+        filepath (str): Path to the workbook
+    
+    Returns:
+        str: pandas engine name ('xlrd' or 'openpyxl')
+    
+    Raises:
+        ValueError: If the file is neither an OLE2 nor a zipped workbook
+    """
+    with open(filepath, 'rb') as f:
+        header = f.read(8)
+    
+    for signature, engine in EXCEL_SIGNATURES:
+        if header.startswith(signature):
+            return engine
+    raise ValueError("Could not read Excel file: unrecognized file signature")
+
+def read_excel_frame(filepath):
+    """
+    Read the first worksheet of a workbook into a DataFrame.
+    
+    The workbook is opened once with the engine matching its signature
+    (openpyxl loads it read-only).
+    
+    Args:
+        filepath (str): Path to the workbook
+    
+    Returns:
+        DataFrame: Worksheet contents with the first row as header
+    """
+    engine = detect_excel_engine(filepath)
+    try:
+        return pd.read_excel(filepath, engine=engine)
+    except Exception as e:
+        logging.error(f"Reading Excel file with {engine} failed: {str(e)}")
+        raise ValueError(f"Could not read Excel file: {str(e)}") from e
+
+def sniff_encoding(filepath, sample_size=ENCODING_SAMPLE_SIZE):
+    """
+    Pick a CSV encoding from a leading byte sample.
+    
+    Args:
+        filepath (str): Path to the CSV file
+        sample_size (int): Number of bytes to inspect
+    
+    Returns:
+        str: First encoding in CSV_ENCODINGS that decodes the sample
+    """
+    with open(filepath, 'rb') as f:
+        sample = f.read(sample_size)
+    
+    for encoding in CSV_ENCODINGS:
+        try:
+            # Incremental decoding tolerates a multi-byte character cut off by the sample
+            codecs.getincrementaldecoder(encoding)().decode(sample, final=False)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    
+    raise ValueError("Could not read CSV file with any encoding")
+
+def find_header_row(df):
+    """
+    Find the row holding the real column headers below a report preamble.
+    
+    Args:
+        df: Raw DataFrame as read from the file
+    
+    Returns:
+        int: Index of the header row within the first 10 rows, or None
+    """
+    for i in range(min(10, len(df))):
+        row_data = df.iloc[i].astype(str)
+        row_str = ' '.join(row_data.values).upper()
+        if any(keyword in row_str for keyword in ['TRAN DATE', 'TRAN TYPE', 'TENDER', 'GROSS']):
+            logging.info(f"Found header row at index {i}: {df.iloc[i].tolist()}")
+            return i
+    return None
+
+def detect_format_profile(df):
+    """
+    Detect the layout of an export: header offset, columns and mapping.
+    
+    Columns that have a header name or any data are kept, so a column that
+    happens to be empty in the first file of a format is still read later.
+    
+    Args:
+        df: Raw DataFrame as read with the first row as header
+    
+    Returns:
+        dict: Format profile with 'header_row' (as passed to the pandas
+        readers), 'columns' (positions), 'column_names' and 'column_mapping'
+    """
+    header_row_index = find_header_row(df)
+    if header_row_index is not None:
+        header_cells = df.iloc[header_row_index].astype(str)
+        data = df.iloc[header_row_index + 1:]
+    else:
+        header_cells = df.columns
+        data = df
+    
+    names = [str(col).strip() if pd.notna(col) else f"Col_{i}" for i, col in enumerate(header_cells)]
+    has_data = data.notna().any(axis=0).tolist()
+    columns = [
+        i for i, name in enumerate(names)
+        if has_data[i] or not (name.lower() in MISSING_VALUES or name.startswith(('Unnamed:', 'Col_')))
+    ]
+    
+    profile = {
+        'header_row': header_row_index + 1 if header_row_index is not None else 0,
+        'columns': columns,
+        'column_names': [names[i] for i in columns]
+    }
+    profile['column_mapping'] = resolve_column_mapping(apply_format_profile(df, profile))
+    return profile
+
+def apply_format_profile(df, profile):
+    """
+    Cut a raw DataFrame down to the data rows and columns of a profile.
+    
+    Args:
+        df: Raw DataFrame as read with the first row as header
+        profile: Format profile
+    
+    Returns:
+        DataFrame: Transaction rows with the profile's column names
+    """
+    df = df.iloc[profile['header_row']:, profile['columns']]
+    if profile['header_row']:
+        df = df.reset_index(drop=True)
+    df.columns = profile['column_names']
+    return df.dropna(axis=0, how='all')
+
+def resolve_column_mapping(df):
+    """
+    Map standardized column names onto the columns of a cleaned DataFrame.
+    
+    Args:
+        df: Cleaned transaction DataFrame
+    
+    Returns:
+        dict: Column mapping dictionary
+    
+    Raises:
+        ValueError: If no transaction type column can be identified
+    """
+    # Try to identify columns with improved mapping
+    column_mapping = identify_columns(df.columns.tolist())
+    
+    # Enhanced pattern search for Modisoft data
+    if not column_mapping:
+        logging.info("Standard column mapping failed, searching for Modisoft patterns...")
+        column_mapping = {}
         
-        # Filter for suspicious transactions
-        for index, row in df.iterrows():
+        # Search all data for transaction types
+        for col in df.columns:
             try:
-                # Get transaction type
-                transaction_type = str(row.get(column_mapping.get('transaction_type', ''), '')).upper()
+                col_name = str(col).upper()
+                sample_data = df[col].astype(str).str.upper().head(20)
+                
+                # Check if this column contains transaction types
+                if any(sus_type in ' '.join(sample_data.values) for sus_type in SUSPICIOUS_TYPES):
+                    column_mapping['transaction_type'] = col
+                    logging.info(f"Found transaction types in column: {col}")
+                
+                # Check for date/time columns
+                if any(keyword in col_name for keyword in ['DATE', 'TIME', 'TIMESTAMP']):
+                    column_mapping['timestamp'] = col
+                    logging.info(f"Found timestamp column: {col}")
                 
-                # For Modisoft: flag specific suspicious transaction types
-                # Based on your data: "No Sale", "void", etc.
-                is_suspicious = (transaction_type.upper() in ['NO SALE', 'VOID', 'REFUND', 'RETURN', 'CANCEL', 'ADJUSTMENT']) or \
-                               any(sus_type in transaction_type.upper() for sus_type in suspicious_types)
+                # Check for amount columns
+                if any(keyword in col_name for keyword in ['AMOUNT', 'TOTAL', 'PRICE', '$']):
+                    column_mapping['amount'] = col
                 
-                if is_suspicious:
-                    # Parse timestamp
-                    timestamp = parse_timestamp(row, column_mapping)
-                    
-                    if timestamp:
-                        # Get cashier name, fallback to register or N/A
-                        cashier_name = str(row.get(column_mapping.get('cashier_id', ''), '')).strip()
-                        if not cashier_name or cashier_name.lower() in ['nan', 'none', '']:
-                            cashier_name = "N/A"
-                        
-                        # Get register ID and transaction ID
-                        register_id = str(row.get(column_mapping.get('register_id', ''), '')).strip()
-                        trans_id = str(row.get(column_mapping.get('transaction_id', ''), '')).strip()
-                        
-                        # Handle missing register/transaction data
-                        if not register_id or register_id.lower() in ['nan', 'none', '']:
-                            if trans_id and trans_id.isdigit() and trans_id.lower() != 'nan':
-                                # Use pattern from transaction ID 
-                                register_id = f"REG-{(int(trans_id) % 3) + 1}"  # 3 registers
-                            elif cashier_name and cashier_name != "N/A":
-                                # Assign register based on cashier
-                                register_id = "REG-1"  # Main register for named cashiers
-                            else:
-                                register_id = "REG-2"  # Default for unnamed transactions
-                        
-                        # Clean up transaction ID
-                        if not trans_id or trans_id.lower() in ['nan', 'none', '']:
-                            trans_id = f"TXN-{timestamp.strftime('%H%M%S')}"  # Generate from timestamp
-                        
-                        # Get amount, ensure it's properly parsed
-                        amount_value = row.get(column_mapping.get('amount', ''), 0)
-                        amount = parse_amount(amount_value) if amount_value else 0.0
-                        
-                        suspicious_transaction = {
-                            'timestamp': timestamp,
-                            'cashier_id': cashier_name,
-                            'register_id': register_id,
-                            'transaction_type': transaction_type,
-                            'transaction_id': trans_id,
-                            'amount': amount,
-                            'pump_number': str(row.get(column_mapping.get('pump_number', ''), '')),
-                            'raw_data': row.to_dict(),
-                            'total_count': len(df)
-                        }
-                        
-                        suspicious_transactions.append(suspicious_transaction)
-                        logging.debug(f"Found suspicious transaction: {transaction_type} at {timestamp}")
-                    
+                # Check for cashier columns
+                if any(keyword in col_name for keyword in ['CASHIER', 'CLERK', 'EMPLOYEE']):
+                    column_mapping['cashier_id'] = col
+                
+                # Check for register columns
+                if any(keyword in col_name for keyword in ['REGISTER', 'REG', 'TERMINAL']):
+                    column_mapping['register_id'] = col
+            
             except Exception as e:
-                logging.warning(f"Error processing row {index}: {str(e)}")
+                logging.warning(f"Error analyzing column {col}: {e}")
                 continue
-        
-        logging.info(f"Found {len(suspicious_transactions)} suspicious transactions")
-        return suspicious_transactions
-        
-    except Exception as e:
-        logging.error(f"Error parsing file {filepath}: {str(e)}")
-        raise
+    
+    logging.info(f"Final column mapping: {column_mapping}")
+    
+    if not column_mapping or 'transaction_type' not in column_mapping:
+        # Last resort - show user what we found for manual mapping
+        logging.error("Could not automatically identify columns")
+        sample_data = df.head(10).to_string()
+        logging.info(f"Sample data:\n{sample_data}")
+        raise ValueError("Could not identify required columns. Please check the Modisoft export format.")
+    
+    return column_mapping
+
+def detect_suspicious_transactions(df, column_mapping, stats=None):
+    """
+    Columnar detection of suspicious transactions.
+    
+    Computes the suspicious mask for the whole frame at once and parses
+    timestamps, amounts and ID fallbacks as columns. Dictionaries are only
+    built for the flagged rows.
+    
+    Args:
+        df: Cleaned transaction DataFrame
+        column_mapping: Column mapping dictionary
+        stats (dict): Optional dict whose 'unparsable_timestamps' count is
+            increased by the flagged rows dropped for lack of a timestamp
+    
+    Returns:
+        list: List of suspicious transaction dictionaries
+    """
+    # Get transaction type and flag suspicious rows in one pass
+    transaction_types = column_as_str(df, column_mapping, 'transaction_type').str.upper()
+    is_suspicious = transaction_types.str.contains(SUSPICIOUS_PATTERN, na=False)
+    
+    flagged = df[is_suspicious.values]
+    if flagged.empty or 'timestamp' not in column_mapping:
+        return []
+    
+    transaction_types = transaction_types[is_suspicious.values]
+    
+    # Parse timestamps, dropping rows we could not place in time
+    time_column = find_time_column(flagged.columns, column_mapping['timestamp'])
+    timestamps, unparsable_count = parse_timestamp_column(
+        column_as_str(flagged, column_mapping, 'timestamp'),
+        flagged[time_column].astype(str) if time_column is not None else None
+    )
+    if unparsable_count:
+        logging.warning(f"Dropped {unparsable_count} suspicious transactions with unparsable timestamps")
+        if stats is not None:
+            stats['unparsable_timestamps'] = stats.get('unparsable_timestamps', 0) + unparsable_count
+    has_timestamp = timestamps.notna().values
+    flagged = flagged[has_timestamp]
+    transaction_types = transaction_types[has_timestamp]
+    timestamps = timestamps[has_timestamp]
+    
+    # Get cashier name, fallback to N/A
+    cashier_names = column_as_str(flagged, column_mapping, 'cashier_id').str.strip()
+    cashier_missing = cashier_names.str.lower().isin(MISSING_VALUES)
+    cashier_names = cashier_names.mask(cashier_missing, 'N/A')
+    
+    # Get register ID and transaction ID
+    register_ids = column_as_str(flagged, column_mapping, 'register_id').str.strip()
+    trans_ids = column_as_str(flagged, column_mapping, 'transaction_id').str.strip()
+    trans_missing = trans_ids.str.lower().isin(MISSING_VALUES)
+    
+    # Handle missing register data: derive from numeric transaction IDs (3 registers),
+    # then main register for named cashiers, then the default register
+    register_missing = register_ids.str.lower().isin(MISSING_VALUES)
+    numeric_ids = register_missing & trans_ids.str.isdigit()
+    register_ids = register_ids.mask(register_missing & ~cashier_missing, 'REG-1')
+    register_ids = register_ids.mask(register_missing & cashier_missing, 'REG-2')
+    register_ids[numeric_ids] = trans_ids[numeric_ids].map(lambda trans_id: f"REG-{(int(trans_id) % 3) + 1}")
+    
+    # Clean up transaction ID, generating missing ones from the timestamp
+    trans_ids[trans_missing] = 'TXN-' + timestamps[trans_missing].dt.strftime('%H%M%S')
+    
+    amounts = parse_amount_column(flagged[column_mapping['amount']]) \
+        if column_mapping.get('amount') in flagged.columns else pd.Series(0.0, index=flagged.index)
+    pump_numbers = column_as_str(flagged, column_mapping, 'pump_number')
+    
+    total_count = len(df)
+    suspicious_transactions = []
+    for timestamp, cashier_name, register_id, transaction_type, trans_id, amount, pump_number, raw_data in zip(
+            timestamps.array.to_pydatetime(), cashier_names, register_ids, transaction_types,
+            trans_ids, amounts, pump_numbers, flagged.to_dict('records')):
+        suspicious_transactions.append({
+            'timestamp': timestamp,
+            'cashier_id': cashier_name,
+            'register_id': register_id,
+            'transaction_type': transaction_type,
+            'transaction_id': trans_id,
+            'amount': float(amount),
+            'pump_number': pump_number,
+            'raw_data': raw_data,
+            'total_count': total_count
+        })
+    
+    return suspicious_transactions
+
+def column_as_str(df, column_mapping, key):
+    """
+    Get a mapped column as strings, or empty strings if it is not mapped.
+    
+    Args:
+        df: Transaction DataFrame
+        column_mapping: Column mapping dictionary
+        key: Standardized column name
+    
+    Returns:
+        Series: String values indexed like df
+    """
+    column = column_mapping.get(key, '')
+    if column in df.columns:
+        return df[column].astype(str)
+    return pd.Series('', index=df.index, dtype=object)
+
+def parse_timestamp_column(values, times=None):
+    """
+    Parse a column of timestamp strings.
+    
+    The format is inferred once from a sample and the whole column is parsed
+    with it. A date-only column is combined with a separate time column
+    first. Values the inferred format does not match go through the other
+    known formats, then the pandas parser one at a time.
+    
+    Args:
+        values: Series of timestamp or date strings
+        times: Optional Series of time-of-day strings for a date-only column
+    
+    Returns:
+        tuple: (Series of datetime64 values with NaT where parsing failed,
+        number of unparsable values)
+    """
+    timestamps = pd.Series(pd.NaT, index=values.index, dtype='datetime64[ns]')
+    if values.empty:
+        return timestamps, 0
+    
+    fmt = infer_timestamp_format(values)
+    if times is not None and fmt in ('%Y-%m-%d', '%m/%d/%Y'):
+        # Dates pair with the time column; rows without a usable time stay at midnight
+        time_formats = ordered_formats(infer_timestamp_format(times, TIME_FORMATS), TIME_FORMATS)
+        _parse_with_formats(values + ' ' + times, timestamps, [f"{fmt} {time_fmt}" for time_fmt in time_formats])
+    
+    remaining = _parse_with_formats(values[timestamps.isna()], timestamps, ordered_formats(fmt, TIMESTAMP_FORMATS))
+    
+    # Try pandas to_datetime as fallback
+    unparsable_count = 0
+    for index, timestamp_str in remaining.items():
+        if timestamp_str.strip().lower() in MISSING_VALUES:
+            unparsable_count += 1
+            continue
+        try:
+            timestamps[index] = pd.to_datetime(timestamp_str)
+        except Exception as e:
+            unparsable_count += 1
+            logging.warning(f"Error parsing timestamp: {str(e)}")
+    
+    return timestamps, unparsable_count
+
+def _parse_with_formats(values, timestamps, formats):
+    # Fill `timestamps` from each format in turn, returning the values none matched
+    remaining = values
+    for fmt in formats:
+        if remaining.empty:
+            break
+        parsed = pd.to_datetime(remaining, format=fmt, errors='coerce', cache=True)
+        matched = parsed.notna()
+        timestamps[matched[matched].index] = parsed[matched]
+        remaining = remaining[~matched]
+    return remaining
+
+def ordered_formats(first, formats):
+    """Candidate formats with an inferred one, if any, tried first."""
+    return [first] + [fmt for fmt in formats if fmt != first] if first else list(formats)
+
+def infer_timestamp_format(values, formats=TIMESTAMP_FORMATS, sample_size=TIMESTAMP_SAMPLE_SIZE):
+    """
+    Pick the format that matches most of a sample of a column.
+    
+    Args:
+        values: Series of strings
+        formats (list): Candidate strptime formats
+        sample_size (int): Number of distinct values inspected
+    
+    Returns:
+        str: Best matching format, or None if none matches
+    """
+    sample = values[~values.str.strip().str.lower().isin(MISSING_VALUES)].drop_duplicates().head(sample_size)
+    best_format, best_count = None, 0
+    for fmt in formats:
+        count = pd.to_datetime(sample, format=fmt, errors='coerce').notna().sum()
+        if count > best_count:
+            best_format, best_count = fmt, count
+            if count == len(sample):
+                break
+    return best_format
+
+def find_time_column(columns, timestamp_column):
+    """
+    Find a separate time-of-day column next to the timestamp column.
+    
+    Args:
+        columns (list): Column names
+        timestamp_column: Name of the mapped timestamp column
+    
+    Returns:
+        str: Name of the time column, or None
+    """
+    for col in columns:
+        if col != timestamp_column and str(col).strip().lower() in TIME_COLUMN_NAMES:
+            return col
+    return None
+
+def parse_amount_column(values):
+    """
+    Parse a column of monetary amounts.
+    
+    Args:
+        values: Series of amount values
+    
+    Returns:
+        Series: Float amounts, 0.0 where parsing failed
+    """
+    if pd.api.types.is_numeric_dtype(values):
+        return values.astype(float)
+    
+    # Remove currency symbols and spaces
+    amount_strs = values.astype(str).str.replace('$', '', regex=False).str.replace(',', '', regex=False).str.strip()
+    amounts = pd.to_numeric(amount_strs, errors='coerce')
+    
+    # Keep literal NaN values, everything else unparsable becomes 0.0
+    unparsable = amounts.isna() & ~amount_strs.str.lower().isin(['nan', '+nan', '-nan'])
+    return amounts.mask(unparsable, 0.0).astype(float)
 
 def identify_columns(columns):
     """
@@ -205,7 +745,7 @@ def identify_columns(columns):
     
     Args:
         columns (list): List of column names
-        
+    
     Returns:
         dict: Mapping of standardized column names to actual column names
     """
@@ -249,7 +789,7 @@ def parse_timestamp(row, column_mapping):
     Args:
         row: Pandas row
         column_mapping: Column mapping dictionary
-        
+    
     Returns:
         datetime: Parsed timestamp or None
     """
@@ -259,17 +799,7 @@ def parse_timestamp(row, column_mapping):
             timestamp_str = str(row[column_mapping['timestamp']])
             
             # Try common timestamp formats
-            timestamp_formats = [
-                '%Y-%m-%d %H:%M:%S',
-                '%m/%d/%Y %H:%M:%S',
-                '%m-%d-%Y %H:%M:%S',
-                '%Y-%m-%d %H:%M',
-                '%m/%d/%Y %H:%M',
-                '%Y-%m-%d',
-                '%m/%d/%Y'
-            ]
-            
-            for fmt in timestamp_formats:
+            for fmt in TIMESTAMP_FORMATS:
                 try:
                     return datetime.strptime(timestamp_str, fmt)
                 except ValueError:
@@ -277,24 +807,7 @@ def parse_timestamp(row, column_mapping):
             
             # Try pandas to_datetime as fallback
             return pd.to_datetime(timestamp_str)
-            
+    
     except Exception as e:
         logging.warning(f"Error parsing timestamp: {str(e)}")
         return None
-
-def parse_amount(amount_str):
-    """
-    Parse monetary amount from string.
-    
-    Args:
-        amount_str: String representation of amount
-        
-    Returns:
-        float: Parsed amount or 0.0
-    """
-    try:
-        # Remove currency symbols and spaces
-        amount_str = str(amount_str).replace('$', '').replace(',', '').strip()
-        return float(amount_str)
-    except (ValueError, TypeError):
-        return 0.0
@@ -0,0 +1,65 @@
+import json
+import hashlib
+import logging
+from datetime import datetime
+from sqlalchemy.exc import IntegrityError
+from app import db
+from models import FormatProfile
+
+def signature_hash(profile):
+    """
+    Stable hash identifying a format profile's header.
+    
+    Args:
+        profile: Format profile from the file parser
+    
+    Returns:
+        str: Hex SHA-256 digest
+    """
+    key = json.dumps([profile['file_type'], profile['header_row'], profile['signature']])
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+def load_format_profiles():
+    """
+    Load every stored format profile, most recently used first.
+    
+    Returns:
+        list: Format profile dictionaries for the file parser
+    """
+    stored = db.session.execute(
+        db.select(FormatProfile.profile).order_by(FormatProfile.last_used_date.desc())
+    ).scalars().all()
+    return [json.loads(profile) for profile in stored]
+
+def record_format_profile(profile):
+    """
+    Store a newly detected format profile, or mark a known one as used.
+    
+    Commits on its own so that a lost race with a concurrent upload of the
+    same format is harmless.
+    
+    Args:
+        profile: Format profile the file was parsed with
+    """
+    if not profile:
+        return
+    
+    profile_hash = signature_hash(profile)
+    result = db.session.execute(
+        db.update(FormatProfile)
+        .where(FormatProfile.signature_hash == profile_hash)
+        .values(use_count=FormatProfile.use_count + 1, last_used_date=datetime.utcnow())
+    )
+    if result.rowcount == 0:
+        db.session.add(FormatProfile(
+            file_type=profile['file_type'],
+            signature_hash=profile_hash,
+            profile=json.dumps(profile),
+            use_count=1
+        ))
+        logging.info(f"Stored new {profile['file_type']} format profile with columns {profile['column_names']}")
+    
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
@@ -0,0 +1,156 @@
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# Default overall deadline in seconds for one round of probes
+DEFAULT_DEADLINE_SECONDS = 12
+
+# Default lifetime in seconds of cached probe results
+DEFAULT_CACHE_SECONDS = 30
+
+class ProbeCache:
+    """
+    Short-lived cache of probe results shared by all request threads.
+    
+    Entries expire after a fixed TTL, so a page that is reloaded repeatedly
+    reuses the last result instead of contacting every video source again.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+    
+    def get(self, key, ttl):
+        """
+        Get a cached result if it is younger than `ttl` seconds.
+        
+        Args:
+            key: Cache key
+            ttl: Maximum age in seconds
+        
+        Returns:
+            tuple: (result, age in seconds), or (None, None) on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return None, None
+        result, stored_at = entry
+        age = time.monotonic() - stored_at
+        if age >= ttl:
+            return None, None
+        return result, age
+    
+    def set(self, key, result):
+        """Store a result under a key."""
+        with self._lock:
+            self._entries[key] = (result, time.monotonic())
+    
+    def clear(self):
+        """Drop every cached result."""
+        with self._lock:
+            self._entries.clear()
+
+probe_cache = ProbeCache()
+
+def _start_probes(probes, deadline):
+    # Probe threads are not joined: a probe stuck past the deadline finishes
+    # on its own timeout in the background instead of holding up the caller
+    pool = ThreadPoolExecutor(max_workers=max(len(probes), 1), thread_name_prefix='health-probe')
+    futures = {pool.submit(probe): key for key, probe in probes.items()}
+    pool.shutdown(wait=False)
+    return futures, time.monotonic() + deadline
+
+def first_positive(probes, deadline=DEFAULT_DEADLINE_SECONDS):
+    """
+    Run probes concurrently and return the first positive result.
+    
+    A probe is a function that returns a result on success and None or raises
+    on failure. Probes still running when a positive result arrives or the
+    deadline passes are abandoned.
+    
+    Args:
+        probes: dict of probe key to probe function
+        deadline: Overall deadline in seconds
+    
+    Returns:
+        tuple: (key, result) of the first positive probe, or (None, errors)
+        where errors maps each failed probe key to its exception
+    """
+    futures, deadline_at = _start_probes(probes, deadline)
+    errors = {}
+    pending = set(futures)
+    
+    while pending:
+        remaining = deadline_at - time.monotonic()
+        if remaining <= 0:
+            break
+        done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+        for future in done:
+            key = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                errors[key] = e
+                continue
+            if result is not None:
+                for other in pending:
+                    other.cancel()
+                return key, result
+    
+    for future in pending:
+        future.cancel()
+        errors[futures[future]] = TimeoutError(f"No answer within {deadline} seconds")
+    return None, errors
+
+def run_all(probes, deadline=DEFAULT_DEADLINE_SECONDS, default=None):
+    """
+    Run probes concurrently and collect every result within the deadline.
+    
+    Args:
+        probes: dict of probe key to probe function
+        deadline: Overall deadline in seconds
+        default: Result for probes that failed or missed the deadline
+    
+    Returns:
+        dict: Probe key to result
+    """
+    futures, deadline_at = _start_probes(probes, deadline)
+    results = {key: default for key in probes}
+    
+    done, pending = wait(futures, timeout=max(deadline_at - time.monotonic(), 0))
+    for future in done:
+        key = futures[future]
+        try:
+            results[key] = future.result()
+        except Exception as e:
+            logging.warning(f"Probe {key} failed: {str(e)}")
+    for future in pending:
+        future.cancel()
+        logging.warning(f"Probe {futures[future]} did not finish within {deadline} seconds")
+    
+    return results
+
+def cached_probe(key, probe, ttl=DEFAULT_CACHE_SECONDS, refresh=False):
+    """
+    Return a recent cached result for a probe round, running it on a miss.
+    
+    Args:
+        key: Cache key
+        probe: Function running the probe round and returning its result
+        ttl: Maximum age in seconds of a reused result
+        refresh: Run the probe even if a fresh result is cached
+    
+    Returns:
+        Result of the probe round
+    """
+    if not refresh:
+        result, age = probe_cache.get(key, ttl)
+        if result is not None:
+            logging.debug(f"Reusing {key} probe result from {age:.1f}s ago")
+            return result
+    
+    result = probe()
+    probe_cache.set(key, result)
+    return result
@@ -0,0 +1,130 @@
+import os
+import json
+import hashlib
+import logging
+from datetime import datetime
+from werkzeug.utils import secure_filename
+from app import db
+from models import TransactionReport
+from utils.bulk_persistence import save_suspicious_transactions
+from utils.statistics import add_report_to_summary
+from utils.format_profiles import record_format_profile
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+def upload_path(upload_folder, original_name):
+    """
+    Pick a timestamped path in the upload folder for a new file.
+    
+    Args:
+        upload_folder: Upload directory
+        original_name: Name the file was uploaded or found with
+    
+    Returns:
+        str: Path that does not exist yet
+    """
+    filename = datetime.now().strftime('%Y%m%d_%H%M%S_') + secure_filename(os.path.basename(original_name))
+    stem, extension = os.path.splitext(filename)
+    filepath = os.path.join(upload_folder, filename)
+    counter = 1
+    while os.path.exists(filepath):
+        filepath = os.path.join(upload_folder, f"{stem}_{counter}{extension}")
+        counter += 1
+    return filepath
+
+def save_stream(stream, filepath):
+    """
+    Copy a binary stream to disk, hashing it on the way.
+    
+    Args:
+        stream: Readable binary file object
+        filepath: Destination path
+    
+    Returns:
+        str: Hex SHA-256 digest of the file contents
+    """
+    digest = hashlib.sha256()
+    with open(filepath, 'wb') as f:
+        while True:
+            chunk = stream.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+            f.write(chunk)
+    return digest.hexdigest()
+
+def save_upload(file_storage, filepath):
+    """
+    Write an uploaded file to disk, hashing it on the way.
+    
+    Args:
+        file_storage: werkzeug FileStorage from the request
+        filepath: Destination path
+    
+    Returns:
+        str: Hex SHA-256 digest of the file contents
+    """
+    return save_stream(file_storage.stream, filepath)
+
+def find_processed_report(content_digest):
+    """
+    Find a fully processed report with the same file contents.
+    
+    Args:
+        content_digest: Hex SHA-256 digest of the uploaded file
+    
+    Returns:
+        TransactionReport: Earlier report, or None if the file is new
+    """
+    return TransactionReport.query.filter_by(content_digest=content_digest, processed=True) \
+        .order_by(TransactionReport.id).first()
+
+def discard_upload(filepath):
+    """Remove an uploaded file that turned out to be a duplicate."""
+    try:
+        os.remove(filepath)
+    except OSError as e:
+        logging.warning(f"Could not remove duplicate upload {filepath}: {str(e)}")
+
+def store_report(filepath, content_digest, transactions, parse_stats, store_id=None):
+    """
+    Save a parsed report and its suspicious transactions in one commit.
+    
+    If saving fails nothing of the report is kept, so the file can simply
+    be ingested again.
+    
+    Args:
+        filepath: Path of the uploaded file
+        content_digest: Hex SHA-256 digest of the file
+        transactions: Iterable of suspicious transaction dictionaries
+        parse_stats: Stats dict filled by the parser while `transactions`
+            is consumed
+        store_id: Store the report was exported from
+    
+    Returns:
+        tuple: (TransactionReport, stats from save_suspicious_transactions)
+    """
+    # SQLite has a single writer and the report insert below takes the write
+    # lock, so parse first to keep reviews from waiting while the file is read
+    if db.engine.dialect.name == 'sqlite':
+        transactions = list(transactions)
+    
+    try:
+        report = TransactionReport(filename=os.path.basename(filepath), content_digest=content_digest, store_id=store_id)
+        db.session.add(report)
+        db.session.flush()
+        
+        save_stats = save_suspicious_transactions(report.id, transactions, store_id=store_id)
+        
+        report.processed = True
+        report.total_transactions = parse_stats.get('total_count', 0)
+        report.suspicious_transactions = save_stats['rows']
+        report.raw_columns = json.dumps(save_stats['raw_columns']) if save_stats['raw_columns'] is not None else None
+        add_report_to_summary(report.id)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    
+    record_format_profile(parse_stats.get('format_profile'))
+    return report, save_stats
@@ -0,0 +1,344 @@
+import os
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from sqlalchemy import insert, update
+from app import db
+from models import SuspiciousTransaction, VideoJob
+from utils.video_processor import create_video_clip, create_video_clips_from_source, find_source_video, has_remote_video_source, max_batch_clips
+
+# Seconds before the first retry, doubled on every further attempt
+RETRY_BACKOFF_SECONDS = 30
+
+# Running jobs older than this are assumed to belong to a dead worker
+STALE_JOB_SECONDS = 600
+
+# Most jobs cut by one FFmpeg run, so a batch finishes before its jobs look stale
+MAX_JOBS_PER_RUN = max_batch_clips(STALE_JOB_SECONDS)
+
+_worker_lock = threading.Lock()
+_worker_thread = None
+
+def enqueue_video_jobs(report_id):
+    """
+    Queue a video clip job for every suspicious transaction in a report.
+    
+    Args:
+        report_id: ID of the TransactionReport
+    
+    Returns:
+        int: Number of jobs queued
+    """
+    transaction_ids = db.session.execute(
+        db.select(SuspiciousTransaction.id).filter_by(report_id=report_id)
+    ).scalars().all()
+    
+    if transaction_ids:
+        now = datetime.utcnow()
+        db.session.execute(insert(VideoJob.__table__), [{
+            'transaction_id': transaction_id,
+            'status': 'queued',
+            'attempts': 0,
+            'max_attempts': 3,
+            'next_attempt_at': now,
+            'created_date': now
+        } for transaction_id in transaction_ids])
+    db.session.commit()
+    
+    logging.info(f"Queued {len(transaction_ids)} video jobs for report {report_id}")
+    return len(transaction_ids)
+
+def due_job_ids(limit):
+    """
+    IDs of up to `limit` queued jobs that are due, oldest first.
+    
+    Jobs left running by a worker that went away count as a failed
+    attempt first: they are retried with the usual backoff, or marked
+    failed once out of attempts.
+    
+    Args:
+        limit: Maximum number of jobs to return
+    
+    Returns:
+        list: Job IDs
+    """
+    now = datetime.utcnow()
+    stale_jobs = db.session.execute(
+        db.select(VideoJob)
+        .where(VideoJob.status == 'running', VideoJob.started_date < now - timedelta(seconds=STALE_JOB_SECONDS))
+    ).scalars().all()
+    for job in stale_jobs:
+        record_job_result(job, None, f"Worker stopped responding after {STALE_JOB_SECONDS}s")
+    
+    job_ids = db.session.execute(
+        db.select(VideoJob.id)
+        .where(VideoJob.status == 'queued', VideoJob.next_attempt_at <= now)
+        .order_by(VideoJob.id)
+        .limit(limit)
+    ).scalars().all()
+    db.session.commit()
+    return job_ids
+
+def claim_jobs(job_ids):
+    """
+    Atomically mark queued jobs as running, starting now.
+    
+    Several workers can poll the same table; a job is only claimed by the
+    worker whose UPDATE actually changed its status. Claim jobs only when
+    they can start right away: started_date is what the stale check goes by.
+    
+    Args:
+        job_ids: IDs of the jobs to claim
+    
+    Returns:
+        list: IDs of the claimed jobs
+    """
+    now = datetime.utcnow()
+    claimed_ids = []
+    for job_id in job_ids:
+        result = db.session.execute(
+            update(VideoJob)
+            .where(VideoJob.id == job_id, VideoJob.status == 'queued')
+            .values(status='running', attempts=VideoJob.attempts + 1, started_date=now)
+        )
+        if result.rowcount == 1:
+            claimed_ids.append(job_id)
+    db.session.commit()
+    
+    return claimed_ids
+
+def run_video_job(app, job_id):
+    """
+    Create the video clip for one claimed job and record the outcome.
+    
+    Args:
+        app: Flask application
+        job_id: ID of a VideoJob in the running state
+    """
+    with app.app_context():
+        try:
+            job = db.session.get(VideoJob, job_id)
+            transaction = job.transaction
+            
+            try:
+                logging.debug(f"Processing video for transaction {transaction.id} at {transaction.transaction_timestamp}")
+                clip_path = create_video_clip(transaction)
+                error = None if clip_path else "No matching video source found for this timestamp"
+            except Exception as e:
+                clip_path = None
+                error = str(e)
+            
+            record_job_result(job, clip_path, error)
+            db.session.commit()
+        except Exception as e:
+            logging.error(f"Error running video job {job_id}: {str(e)}")
+            db.session.rollback()
+        finally:
+            db.session.remove()
+
+def run_video_job_group(app, job_ids, source_path):
+    """
+    Create the clips for claimed jobs whose transactions share a source video.
+    
+    Args:
+        app: Flask application
+        job_ids: IDs of VideoJobs in the running state
+        source_path: Local source video covering every job's transaction
+    """
+    with app.app_context():
+        try:
+            jobs = db.session.execute(
+                db.select(VideoJob).where(VideoJob.id.in_(job_ids))
+            ).scalars().all()
+            
+            try:
+                clip_paths = create_video_clips_from_source(source_path, [job.transaction for job in jobs])
+                error = f"FFmpeg could not extract clip from {os.path.basename(source_path)}"
+            except Exception as e:
+                clip_paths = {}
+                error = str(e)
+            
+            for job in jobs:
+                clip_path = clip_paths.get(job.transaction_id)
+                record_job_result(job, clip_path, None if clip_path else error)
+            db.session.commit()
+        except Exception as e:
+            logging.error(f"Error running video jobs {job_ids}: {str(e)}")
+            db.session.rollback()
+        finally:
+            db.session.remove()
+
+def record_job_result(job, clip_path, error):
+    """
+    Record the outcome of a job attempt on the job and its transaction.
+    
+    Failed attempts are requeued with exponential backoff until the job
+    runs out of attempts.
+    
+    Args:
+        job: VideoJob object
+        clip_path: Path to the created clip, None if the attempt failed
+        error: Error message for a failed attempt
+    """
+    transaction = job.transaction
+    now = datetime.utcnow()
+    
+    if clip_path:
+        job.status = 'done'
+        job.clip_path = clip_path
+        job.error = None
+        job.finished_date = now
+        transaction.video_clip_path = clip_path
+        transaction.video_processed = True
+        transaction.video_error = None
+        logging.info(f"Successfully created video clip: {clip_path}")
+    elif job.attempts < job.max_attempts:
+        job.status = 'queued'
+        job.error = error
+        job.next_attempt_at = now + timedelta(seconds=RETRY_BACKOFF_SECONDS * 2 ** (job.attempts - 1))
+        logging.warning(f"Video job {job.id} attempt {job.attempts} failed, retrying at {job.next_attempt_at}: {error}")
+    else:
+        job.status = 'failed'
+        job.error = error
+        job.finished_date = now
+        transaction.video_error = error
+        logging.warning(f"Video job {job.id} failed after {job.attempts} attempts: {error}")
+
+def group_jobs_by_source(job_ids):
+    """
+    Group jobs by the local source video of their transaction.
+    
+    Args:
+        job_ids: IDs of VideoJobs
+        
+    Returns:
+        tuple: (dict of source path to job IDs in transaction time order,
+            list of job IDs to run one by one)
+    """
+    groups = {}
+    single_job_ids = []
+    
+    # Remote sources take priority over local files, so those jobs are not batched
+    if has_remote_video_source():
+        return groups, list(job_ids)
+    
+    rows = db.session.execute(
+        db.select(VideoJob.id, SuspiciousTransaction.transaction_timestamp)
+        .join(SuspiciousTransaction, VideoJob.transaction_id == SuspiciousTransaction.id)
+        .where(VideoJob.id.in_(job_ids))
+        .order_by(SuspiciousTransaction.transaction_timestamp, VideoJob.id)
+    ).all()
+    
+    for job_id, timestamp in rows:
+        source_path = find_source_video(timestamp)
+        if source_path:
+            groups.setdefault(source_path, []).append(job_id)
+        else:
+            single_job_ids.append(job_id)
+    
+    return groups, single_job_ids
+
+def run_worker(app, max_workers=None, poll_interval=None, stop_event=None):
+    """
+    Poll the job table and run video jobs concurrently.
+    
+    Due jobs are grouped by source video so that clips from one file are
+    cut together, by FFmpeg runs of up to MAX_JOBS_PER_RUN consecutive
+    clips so each run ends before its jobs look stale. Only as many tasks
+    as there are free threads are claimed at a time. Each task spends its
+    time waiting on an FFmpeg process, so a thread per in-flight task is
+    enough to keep `max_workers` FFmpeg processes busy.
+    
+    Args:
+        app: Flask application
+        max_workers: Concurrent jobs, defaults to VIDEO_WORKERS
+        poll_interval: Seconds to sleep when no job is due
+        stop_event: Optional threading.Event that ends the loop
+    """
+    max_workers = max_workers or app.config.get('VIDEO_WORKERS') or os.cpu_count() or 1
+    poll_interval = poll_interval or app.config.get('VIDEO_WORKER_POLL_SECONDS', 2)
+    batch_size = app.config.get('VIDEO_JOB_BATCH_SIZE', 200)
+    stop_event = stop_event or threading.Event()
+    
+    logging.info(f"Video worker started with {max_workers} concurrent jobs")
+    
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='video-job') as pool:
+        in_flight = set()
+        while not stop_event.is_set():
+            in_flight = {future for future in in_flight if not future.done()}
+            free_slots = max_workers - len(in_flight)
+            
+            tasks = []
+            if free_slots > 0:
+                with app.app_context():
+                    try:
+                        # Group a wide window of due jobs, but only claim the
+                        # tasks that start now; the rest stay queued, so no
+                        # job waits in the pool long enough to look stale
+                        groups, single_job_ids = group_jobs_by_source(due_job_ids(batch_size))
+                        candidates = [
+                            (group_job_ids[start:start + MAX_JOBS_PER_RUN], source_path)
+                            for source_path, group_job_ids in groups.items()
+                            for start in range(0, len(group_job_ids), MAX_JOBS_PER_RUN)
+                        ]
+                        candidates += [([job_id], None) for job_id in single_job_ids]
+                        candidates.sort(key=lambda candidate: min(candidate[0]))
+                        for candidate_ids, source_path in candidates[:free_slots]:
+                            claimed_ids = claim_jobs(candidate_ids)
+                            if claimed_ids:
+                                tasks.append((claimed_ids, source_path))
+                    except Exception as e:
+                        logging.error(f"Error claiming video jobs: {str(e)}")
+                        db.session.rollback()
+                        # Leave claimed jobs to be requeued as stale
+                    finally:
+                        db.session.remove()
+            
+            # One FFmpeg run per chunk of a source video's jobs, one per job for everything else
+            for job_ids, source_path in tasks:
+                if source_path:
+                    in_flight.add(pool.submit(run_video_job_group, app, job_ids, source_path))
+                else:
+                    in_flight.add(pool.submit(run_video_job, app, job_ids[0]))
+            
+            if not tasks:
+                stop_event.wait(poll_interval)
+
+def start_background_worker(app):
+    """
+    Start the video worker in a daemon thread of this process, once.
+    
+    Args:
+        app: Flask application
+    """
+    global _worker_thread
+    
+    with _worker_lock:
+        if _worker_thread is None or not _worker_thread.is_alive():
+            _worker_thread = threading.Thread(target=run_worker, args=(app,), name='video-worker', daemon=True)
+            _worker_thread.start()
+
+def job_status(job):
+    """
+    JSON-serializable status of a video job.
+    
+    Args:
+        job: VideoJob object
+    
+    Returns:
+        dict: Job status fields
+    """
+    return {
+        'id': job.id,
+        'transaction_id': job.transaction_id,
+        'status': job.status,
+        'attempts': job.attempts,
+        'max_attempts': job.max_attempts,
+        'next_attempt_at': job.next_attempt_at.isoformat() if job.next_attempt_at else None,
+        'clip_path': job.clip_path,
+        'error': job.error,
+        'created_date': job.created_date.isoformat() if job.created_date else None,
+        'started_date': job.started_date.isoformat() if job.started_date else None,
+        'finished_date': job.finished_date.isoformat() if job.finished_date else None
+    }
@@ -0,0 +1,206 @@
+import os
+import json
+import time
+import atexit
+import logging
+import subprocess
+import threading
+from collections import OrderedDict
+from flask import current_app, has_app_context
+
+DEFAULT_MAX_ENTRIES = 512
+
+# Minimum seconds between two writes of the store file
+STORE_SAVE_INTERVAL = 30
+
+class MediaCache:
+    """
+    Process-wide cache for external tool availability and media metadata.
+    
+    Metadata entries are keyed by kind, path, mtime and size, so a file that
+    is rewritten is probed again. The least recently used entries are evicted
+    once the cache is full. If a store file is configured, metadata survives
+    restarts; new entries are written to it at most every
+    STORE_SAVE_INTERVAL seconds and when the process exits.
+    """
+    
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, store_path=None):
+        self.max_entries = max_entries
+        self.store_path = store_path
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._tools = {}
+        self._volatile = set()
+        self._loaded = False
+        self._dirty = False
+        self._saved_at = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.tool_hits = 0
+        self.tool_misses = 0
+    
+    def configure(self, max_entries=None, store_path=None):
+        """
+        Apply size and on-disk store settings.
+        
+        Args:
+            max_entries: Maximum number of metadata entries kept in memory
+            store_path: Optional JSON file that persists metadata entries
+        """
+        with self._lock:
+            if max_entries:
+                self.max_entries = max_entries
+            if store_path != self.store_path:
+                if self._dirty:
+                    self._save_store()
+                self.store_path = store_path
+                self._loaded = False
+    
+    def tool_available(self, tool):
+        """
+        Check once per process if a command line tool can be run.
+        
+        Args:
+            tool: Executable name, e.g. 'ffmpeg'
+        
+        Returns:
+            bool: True if `tool -version` runs successfully
+        """
+        with self._lock:
+            if tool in self._tools:
+                self.tool_hits += 1
+                return self._tools[tool]
+            self.tool_misses += 1
+        
+        try:
+            result = subprocess.run([tool, '-version'], capture_output=True, text=True)
+            available = result.returncode == 0
+        except FileNotFoundError:
+            available = False
+        
+        with self._lock:
+            self._tools[tool] = available
+        logging.info(f"{tool} available: {available}")
+        return available
+    
+    def get(self, kind, path, loader, persist=True):
+        """
+        Get cached metadata for a file, calling `loader(path)` on a miss.
+        
+        Args:
+            kind: Metadata kind, e.g. 'video_info'
+            path: Path to media file
+            loader: Function returning the metadata for the path
+            persist: False to keep the entry out of the store file
+        
+        Returns:
+            Metadata returned by the loader, or None if the file is missing
+        """
+        try:
+            file_stat = os.stat(path)
+        except OSError:
+            return None
+        key = f"{kind}|{os.path.abspath(path)}|{file_stat.st_mtime}|{file_stat.st_size}"
+        
+        with self._lock:
+            self._load_store()
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+        
+        value = loader(path)
+        if value is None:
+            return None
+        
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            if not persist:
+                self._volatile.add(key)
+            while len(self._entries) > self.max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                self._volatile.discard(evicted)
+                self.evictions += 1
+            if persist and self.store_path:
+                self._dirty = True
+                if time.monotonic() - self._saved_at >= STORE_SAVE_INTERVAL:
+                    self._save_store()
+        return value
+    
+    def flush(self):
+        """
+        Write entries not yet saved to the store file.
+        """
+        with self._lock:
+            if self._dirty:
+                self._save_store()
+    
+    def stats(self):
+        """
+        Hit/miss counters for display.
+        
+        Returns:
+            dict: Cache counters and sizes
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(100.0 * self.hits / lookups, 1) if lookups else 0.0,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'tool_hits': self.tool_hits,
+                'tool_misses': self.tool_misses,
+                'store_path': self.store_path
+            }
+    
+    def _load_store(self):
+        # Called with the lock held
+        if self._loaded:
+            return
+        self._loaded = True
+        if not self.store_path or not os.path.exists(self.store_path):
+            return
+        try:
+            with open(self.store_path) as f:
+                stored = json.load(f)
+            for key, value in list(stored.items())[-self.max_entries:]:
+                self._entries[key] = value
+        except (OSError, ValueError) as e:
+            logging.warning(f"Could not load media cache store {self.store_path}: {str(e)}")
+    
+    def _save_store(self):
+        # Called with the lock held
+        self._dirty = False
+        self._saved_at = time.monotonic()
+        if not self.store_path:
+            return
+        try:
+            tmp_path = f"{self.store_path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump({key: value for key, value in self._entries.items() if key not in self._volatile}, f)
+            os.replace(tmp_path, self.store_path)
+        except (OSError, TypeError) as e:
+            logging.warning(f"Could not save media cache store {self.store_path}: {str(e)}")
+
+media_cache = MediaCache()
+atexit.register(media_cache.flush)
+
+def get_media_cache():
+    """
+    Get the process-wide media cache, configured from the app config.
+    
+    Returns:
+        MediaCache: Shared cache instance
+    """
+    if has_app_context():
+        media_cache.configure(
+            max_entries=current_app.config.get('MEDIA_CACHE_SIZE'),
+            store_path=current_app.config.get('MEDIA_CACHE_FILE')
+        )
+    return media_cache
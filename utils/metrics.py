@@ -0,0 +1,197 @@
+import time
+import threading
+from contextlib import ContextDecorator
+from flask import request
+from sqlalchemy import event
+
+# Histogram bucket upper bounds in seconds, from single queries to long FFmpeg runs
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+class Histogram:
+    """
+    Prometheus-style histogram of durations, one series per label set.
+    
+    Observations are kept in process memory, so each gunicorn worker
+    reports its own counts.
+    """
+    
+    def __init__(self, name, documentation, label_names, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._series = {}
+    
+    def observe(self, seconds, *label_values):
+        """
+        Record one duration.
+        
+        Args:
+            seconds: Duration in seconds
+            *label_values: One value per label name
+        """
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                # Per-bucket counts, total count and sum
+                series = self._series[label_values] = [[0] * len(self.buckets), 0, 0.0]
+            for index, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    series[0][index] += 1
+                    break
+            series[1] += 1
+            series[2] += seconds
+    
+    def render(self):
+        """
+        Format the histogram in the Prometheus text exposition format.
+        
+        Returns:
+            list: Lines of text
+        """
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((labels, [list(counts), count, total]) for labels, (counts, count, total) in self._series.items())
+        
+        for label_values, (counts, count, total) in series:
+            labels = ','.join(f'{name}="{escape_label(value)}"' for name, value in zip(self.label_names, label_values))
+            separator = ',' if labels else ''
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{{{labels}{separator}le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{labels}{separator}le="+Inf"}} {count}')
+            lines.append(f"{self.name}_sum{{{labels}}} {total}")
+            lines.append(f"{self.name}_count{{{labels}}} {count}")
+        return lines
+
+def escape_label(value):
+    """Escape a label value for the Prometheus text format."""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+SPAN_SECONDS = Histogram(
+    'lp_span_seconds', 'Time spent in instrumented code paths (parse, persist, catalog_lookup, ffmpeg, ffprobe, db_query)',
+    ('span',)
+)
+REQUEST_SECONDS = Histogram(
+    'lp_http_request_seconds', 'Time to handle an HTTP request', ('method', 'endpoint', 'status')
+)
+
+def observe(name, seconds):
+    """
+    Record the duration of a span measured elsewhere.
+    
+    Args:
+        name: Span name
+        seconds: Duration in seconds
+    """
+    SPAN_SECONDS.observe(seconds, name)
+
+class Span(ContextDecorator):
+    """
+    Timer for one named span; see span().
+    """
+    
+    def __init__(self, name):
+        self.name = name
+        self.start = None
+    
+    def _recreate_cm(self):
+        # A decorated function may run in several threads at once
+        return Span(self.name)
+    
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+    
+    def __exit__(self, *exc_info):
+        observe(self.name, time.perf_counter() - self.start)
+        return False
+
+def span(name):
+    """
+    Time a block or a function as a named span.
+    
+    Usable as `with span('parse'):` or as the `@span('catalog_lookup')`
+    decorator; each use records one observation in lp_span_seconds.
+    
+    Args:
+        name: Span name
+    
+    Returns:
+        Span: Context manager and decorator
+    """
+    return Span(name)
+
+def timed_iter(name, iterable):
+    """
+    Time the work done producing the items of an iterable.
+    
+    Only the time spent inside the iterable counts, not the time the
+    consumer spends on each item, so a streamed parse can be measured
+    while it is being saved. The span is recorded once the iterable is
+    exhausted.
+    
+    Args:
+        name: Span name
+        iterable: Iterable to time, e.g. a parser generator
+    
+    Yields:
+        The iterable's items
+    """
+    iterator = iter(iterable)
+    elapsed = 0.0
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            observe(name, elapsed + time.perf_counter() - start)
+            return
+        elapsed += time.perf_counter() - start
+        yield item
+
+def render_metrics():
+    """
+    All metrics of this process in the Prometheus text exposition format.
+    
+    Returns:
+        str: Exposition text
+    """
+    return '\n'.join(SPAN_SECONDS.render() + REQUEST_SECONDS.render()) + '\n'
+
+def install_metrics(app, engine):
+    """
+    Time every request and every SQL statement.
+    
+    Args:
+        app: Flask application
+        engine: SQLAlchemy engine
+    """
+    @event.listens_for(engine, 'before_cursor_execute')
+    def start_query_timer(connection, cursor, statement, parameters, context, executemany):
+        connection.info.setdefault('query_start', []).append(time.perf_counter())
+    
+    @event.listens_for(engine, 'after_cursor_execute')
+    def stop_query_timer(connection, cursor, statement, parameters, context, executemany):
+        observe('db_query', time.perf_counter() - connection.info['query_start'].pop())
+    
+    @event.listens_for(engine, 'handle_error')
+    def drop_query_timer(exception_context):
+        # Failed statements never reach after_cursor_execute
+        connection = exception_context.connection
+        if connection is not None and connection.info.get('query_start'):
+            connection.info['query_start'].pop()
+    
+    @app.before_request
+    def start_request_timer():
+        request.environ['lp.request_start'] = time.perf_counter()
+    
+    @app.after_request
+    def stop_request_timer(response):
+        start = request.environ.get('lp.request_start')
+        if start is not None:
+            REQUEST_SECONDS.observe(time.perf_counter() - start, request.method,
+                                    request.endpoint or 'unmatched', str(response.status_code))
+        return response
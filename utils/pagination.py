@@ -0,0 +1,186 @@
+import json
+import base64
+from datetime import datetime
+from sqlalchemy import and_, or_, func, select
+from app import db
+from models import SuspiciousTransaction
+
+# Default cap on rows counted for the approximate total
+DEFAULT_COUNT_LIMIT = 10000
+
+class KeysetPage:
+    """
+    One page of transactions in (transaction_timestamp, id) descending order.
+    
+    Attributes:
+        items: Transactions on this page
+        next_cursor: Cursor of the following page, None on the last page
+        prev_cursor: Cursor of the preceding page, None on the first page
+        total: Approximate number of matching rows, None if not counted
+        total_is_exact: False if the total was capped or estimated
+    """
+    
+    def __init__(self, items, next_cursor, prev_cursor, total=None, total_is_exact=True):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.total = total
+        self.total_is_exact = total_is_exact
+    
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+    
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+def encode_cursor(direction, transaction):
+    """
+    Build an opaque cursor pointing just past a transaction.
+    
+    Args:
+        direction: 'next' for rows after the transaction, 'prev' for rows before it
+        transaction: SuspiciousTransaction at the edge of a page
+    
+    Returns:
+        str: URL-safe cursor
+    """
+    payload = [direction, transaction.transaction_timestamp.isoformat(), transaction.id]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor created by encode_cursor.
+    
+    Args:
+        cursor: URL-safe cursor
+    
+    Returns:
+        tuple: (direction, timestamp, transaction id)
+    
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        direction, timestamp, transaction_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if direction not in ('next', 'prev'):
+            raise ValueError(direction)
+        return direction, datetime.fromisoformat(timestamp), int(transaction_id)
+    except (TypeError, ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+def keyset_page(query, per_page, cursor=None, offset=0, count_limit=None):
+    """
+    Fetch one page of a transaction query with keyset pagination.
+    
+    Instead of OFFSET, each page starts from the (timestamp, id) of the last
+    row of the previous page, so the composite indexes find it directly and
+    a deep page costs the same as the first.
+    
+    Args:
+        query: Filtered SuspiciousTransaction query without ordering
+        per_page: Rows per page
+        cursor: Cursor from a previous page, None for the first page
+        offset: Rows to skip when there is no cursor, for old page links
+        count_limit: Count matching rows up to this many, None to skip counting
+    
+    Returns:
+        KeysetPage: The requested page
+    """
+    timestamp_column = SuspiciousTransaction.transaction_timestamp
+    id_column = SuspiciousTransaction.id
+    
+    page_query = query
+    direction = 'next'
+    if cursor:
+        direction, timestamp, transaction_id = decode_cursor(cursor)
+        if direction == 'next':
+            # The redundant <= bound lets the index range scan start at the cursor
+            page_query = page_query.filter(
+                timestamp_column <= timestamp,
+                or_(timestamp_column < timestamp, and_(timestamp_column == timestamp, id_column < transaction_id))
+            )
+        else:
+            page_query = page_query.filter(
+                timestamp_column >= timestamp,
+                or_(timestamp_column > timestamp, and_(timestamp_column == timestamp, id_column > transaction_id))
+            )
+    
+    if direction == 'next':
+        page_query = page_query.order_by(timestamp_column.desc(), id_column.desc())
+        if not cursor and offset:
+            page_query = page_query.offset(offset)
+    else:
+        page_query = page_query.order_by(timestamp_column.asc(), id_column.asc())
+    
+    # One extra row tells whether there is another page in this direction
+    items = page_query.limit(per_page + 1).all()
+    more = len(items) > per_page
+    items = items[:per_page]
+    
+    if direction == 'prev':
+        items.reverse()
+        has_next = True
+        has_prev = more
+    else:
+        has_next = more
+        has_prev = bool(cursor) or offset > 0
+    
+    next_cursor = encode_cursor('next', items[-1]) if items and has_next else None
+    prev_cursor = encode_cursor('prev', items[0]) if items and has_prev else None
+    
+    total, total_is_exact = (None, True)
+    if count_limit:
+        total, total_is_exact = approximate_count(query, count_limit)
+    
+    return KeysetPage(items, next_cursor, prev_cursor, total, total_is_exact)
+
+def approximate_count(query, count_limit=DEFAULT_COUNT_LIMIT):
+    """
+    Count the rows of a query, stopping at `count_limit`.
+    
+    Counting every row of a broad filter costs as much as scanning it, so
+    only the first `count_limit` rows are counted. On PostgreSQL a capped
+    count is replaced by the query planner's row estimate.
+    
+    Args:
+        query: Filtered query
+        count_limit: Maximum number of rows to count
+    
+    Returns:
+        tuple: (row count, True if the count is exact)
+    """
+    capped = query.with_entities(SuspiciousTransaction.id).order_by(None).limit(count_limit + 1).subquery()
+    count = db.session.execute(select(func.count()).select_from(capped)).scalar()
+    if count <= count_limit:
+        return count, True
+    
+    if db.engine.dialect.name == 'postgresql':
+        estimate = estimate_row_count(query)
+        if estimate:
+            return max(estimate, count_limit), False
+    return count_limit, False
+
+def estimate_row_count(query):
+    """
+    Ask the PostgreSQL planner how many rows a query returns.
+    
+    Args:
+        query: Filtered query
+    
+    Returns:
+        int: Estimated row count, or None if no estimate is available
+    """
+    statement = query.with_entities(SuspiciousTransaction.id).order_by(None).statement
+    compiled = statement.compile(dialect=db.engine.dialect)
+    try:
+        plan = db.session.connection().exec_driver_sql(
+            f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params
+        ).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+    except Exception:
+        return None
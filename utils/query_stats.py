@@ -0,0 +1,42 @@
+import logging
+from collections import Counter
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+def install_query_counter(app, engine, budget):
+    """
+    Count the SQL statements each request runs and log pages over a budget.
+    
+    Every response gets an X-Query-Count header. A request that runs more
+    than `budget` statements is logged with its most repeated statement,
+    which is usually a lazy load in a template loop (an N+1 query).
+    Statements run outside a request, e.g. by the video worker, are not
+    counted.
+    
+    Args:
+        app: Flask application
+        engine: SQLAlchemy engine
+        budget: Statements a request may run before it is logged; 0 disables
+            counting
+    """
+    if budget <= 0:
+        return
+    
+    @event.listens_for(engine, 'before_cursor_execute')
+    def count_statement(connection, cursor, statement, parameters, context, executemany):
+        if has_request_context():
+            g.setdefault('sql_statements', []).append(statement)
+    
+    @app.after_request
+    def report_query_count(response):
+        statements = g.get('sql_statements', [])
+        response.headers['X-Query-Count'] = str(len(statements))
+        if len(statements) > budget:
+            statement, repeats = Counter(statements).most_common(1)[0]
+            logging.warning(
+                f"{request.method} {request.path} ran {len(statements)} SQL statements (budget {budget}); "
+                f"most repeated ({repeats}x): {' '.join(statement.split())[:300]}"
+            )
+        return response
+    
+    logging.info(f"Counting SQL statements per request, budget {budget}")
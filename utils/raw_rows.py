@@ -0,0 +1,73 @@
+import json
+import math
+from datetime import date, time
+
+def raw_row_value(value):
+    """
+    Convert a cell of a parsed report row to a JSON value.
+    
+    Args:
+        value: Cell value from DataFrame.to_dict('records')
+    
+    Returns:
+        str, int, float, bool or None
+    """
+    if value is None:
+        return None
+    if isinstance(value, float):
+        return None if math.isnan(value) else value
+    if isinstance(value, (str, bool, int)):
+        return value
+    if isinstance(value, (date, time)):
+        # pd.NaT is a datetime too, but has no isoformat() value
+        return None if value != value else value.isoformat()
+    if hasattr(value, 'item'):
+        # numpy scalars
+        return raw_row_value(value.item())
+    return str(value)
+
+def encode_raw_row(raw_data, raw_columns):
+    """
+    Encode a parsed report row as a compact JSON array.
+    
+    Values are stored in the order of the report's column dictionary, so
+    the column names are kept once per report instead of in every row.
+    Rows whose columns differ from the dictionary are stored as an object.
+    
+    Args:
+        raw_data: dict of column name to cell value
+        raw_columns: Column names of the report
+    
+    Returns:
+        str: JSON text
+    """
+    if list(raw_data) == raw_columns:
+        values = [raw_row_value(value) for value in raw_data.values()]
+    else:
+        values = {str(column): raw_row_value(value) for column, value in raw_data.items()}
+    return json.dumps(values, separators=(',', ':'), ensure_ascii=False)
+
+def decode_raw_row(raw_data, raw_columns):
+    """
+    Decode a stored report row back into a dict.
+    
+    Args:
+        raw_data: Stored raw_data text
+        raw_columns: JSON column dictionary of the report, or None
+    
+    Returns:
+        dict: column name to value; rows stored before the compact format
+        come back as {'Raw data': text}
+    """
+    if not raw_data:
+        return {}
+    try:
+        values = json.loads(raw_data)
+    except ValueError:
+        return {'Raw data': raw_data}
+    
+    if isinstance(values, dict):
+        return values
+    if isinstance(values, list) and raw_columns:
+        return dict(zip(json.loads(raw_columns), values))
+    return {'Raw data': raw_data}
@@ -0,0 +1,71 @@
+import io
+import os
+import pstats
+import cProfile
+import logging
+import threading
+from datetime import datetime
+from flask import g, request
+
+# Request header that asks for a profile of that request
+PROFILE_HEADER = 'X-Profile'
+
+# Functions listed in the log line of each profiled request
+PROFILE_TOP_FUNCTIONS = 15
+
+# cProfile follows one thread at a time
+_profile_lock = threading.Lock()
+
+def install_request_profiler(app, profile_folder, token=None):
+    """
+    Profile single requests on demand with cProfile.
+    
+    A request carrying the X-Profile header (with the token as its value,
+    when one is configured) is run under cProfile. Its stats are written to
+    profile_folder as a .prof file for snakeviz or pstats, the slowest
+    functions are logged and the file name is returned in the X-Profile-File
+    header. Other requests run unprofiled; a request that asks while another
+    one is being profiled is served without a profile.
+    
+    Args:
+        app: Flask application
+        profile_folder: Directory for the .prof files
+        token: Required X-Profile header value, None to accept any value
+    """
+    os.makedirs(profile_folder, exist_ok=True)
+    
+    @app.before_request
+    def start_profile():
+        value = request.headers.get(PROFILE_HEADER)
+        if not value or (token and value != token):
+            return
+        if not _profile_lock.acquire(blocking=False):
+            logging.warning(f"Not profiling {request.path}: another request is being profiled")
+            return
+        g.profiler = cProfile.Profile()
+        g.profiler.enable()
+    
+    @app.after_request
+    def save_profile(response):
+        profiler = g.get('profiler')
+        if profiler is None:
+            return response
+        
+        profiler.disable()
+        endpoint = request.endpoint or 'unmatched'
+        filename = f"{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}_{endpoint}.prof"
+        profiler.dump_stats(os.path.join(profile_folder, filename))
+        
+        summary = io.StringIO()
+        pstats.Stats(profiler, stream=summary).sort_stats('cumulative').print_stats(PROFILE_TOP_FUNCTIONS)
+        logging.info(f"Profile of {request.method} {request.full_path} saved as {filename}\n{summary.getvalue()}")
+        response.headers['X-Profile-File'] = filename
+        return response
+    
+    @app.teardown_request
+    def stop_profile(exception):
+        # Also runs when the view raised and after_request was skipped
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            _profile_lock.release()
@@ -0,0 +1,82 @@
+import logging
+from datetime import datetime
+from collections import Counter
+from sqlalchemy import insert, update
+from app import db
+from models import SuspiciousTransaction, ReviewLog
+from utils.statistics import SUMMARY_STATUSES, record_status_changes
+
+# Statuses a reviewer can set
+REVIEW_STATUSES = SUMMARY_STATUSES
+
+def apply_bulk_review(query, new_status, notes='', limit=5000):
+    """
+    Set the review status of every transaction matched by a query.
+    
+    Runs in one database transaction: the matching rows are selected (and
+    locked on PostgreSQL), then one ReviewLog insert, one set-based UPDATE
+    and the summary count changes are committed together. Transactions that
+    already have the status are left alone and get no log entry.
+    
+    Args:
+        query: SuspiciousTransaction query, e.g. from the dashboard filters
+            or an id list
+        new_status: One of REVIEW_STATUSES
+        notes: Review notes stored on the transactions and the logs
+        limit: Most transactions one call may change
+    
+    Returns:
+        dict: updated (ids changed), unchanged (ids that already had the
+        status) and review_date
+    
+    Raises:
+        ValueError: For an unknown status or when more than limit
+            transactions match
+    """
+    if new_status not in REVIEW_STATUSES:
+        raise ValueError(f"Invalid review status: {new_status}")
+    
+    try:
+        rows = query.with_entities(
+            SuspiciousTransaction.id,
+            SuspiciousTransaction.review_status,
+            SuspiciousTransaction.cashier_id,
+            SuspiciousTransaction.transaction_type
+        ).order_by(SuspiciousTransaction.id).limit(limit + 1).with_for_update().all()
+        if len(rows) > limit:
+            raise ValueError(f"More than {limit} transactions match; narrow the filter")
+        
+        changed = [row for row in rows if row.review_status != new_status]
+        review_date = datetime.utcnow()
+        if changed:
+            db.session.execute(insert(ReviewLog), [
+                {
+                    'transaction_id': row.id,
+                    'old_status': row.review_status,
+                    'new_status': new_status,
+                    'notes': notes,
+                    'review_date': review_date
+                }
+                for row in changed
+            ])
+            db.session.execute(
+                update(SuspiciousTransaction)
+                .where(SuspiciousTransaction.id.in_([row.id for row in changed]))
+                .values(review_status=new_status, review_date=review_date, review_notes=notes)
+                .execution_options(synchronize_session=False)
+            )
+            record_status_changes(
+                Counter((row.cashier_id or '', row.transaction_type, row.review_status) for row in changed),
+                new_status
+            )
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    
+    logging.info(f"Bulk review marked {len(changed)} transactions as {new_status}")
+    return {
+        'updated': [row.id for row in changed],
+        'unchanged': [row.id for row in rows if row.review_status == new_status],
+        'review_date': review_date.isoformat()
+    }
@@ -0,0 +1,215 @@
+import logging
+from sqlalchemy import case, func, insert, update, delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from app import db
+from models import TransactionReport, SuspiciousTransaction, TransactionSummary
+
+# Review statuses with their own summary column; anything else counts as 'other'
+SUMMARY_STATUSES = ('pending', 'ok', 'review', 'fraud')
+
+def aggregate_transactions(*criteria):
+    """
+    Count transactions per cashier and type in one pass.
+    
+    Every status count comes from the same scan through conditional
+    aggregation instead of one GROUP BY per breakdown.
+    
+    Args:
+        *criteria: Optional filters on SuspiciousTransaction
+    
+    Returns:
+        list: dicts with the TransactionSummary columns
+    """
+    cashier = func.coalesce(SuspiciousTransaction.cashier_id, '')
+    status_columns = [
+        func.sum(case((SuspiciousTransaction.review_status == status, 1), else_=0)).label(status)
+        for status in SUMMARY_STATUSES
+    ]
+    rows = db.session.execute(
+        db.select(
+            cashier.label('cashier_id'),
+            SuspiciousTransaction.transaction_type,
+            func.count().label('total'),
+            *status_columns
+        )
+        .where(*criteria)
+        .group_by(cashier, SuspiciousTransaction.transaction_type)
+    ).mappings().all()
+    return [dict(row) for row in rows]
+
+def add_report_to_summary(report_id):
+    """
+    Add a newly saved report's transactions to the summary counts.
+    
+    Call in the same database transaction as the upload, before commit.
+    
+    Args:
+        report_id: ID of the TransactionReport
+    """
+    rows = aggregate_transactions(SuspiciousTransaction.report_id == report_id)
+    if rows:
+        upsert_summary_rows(rows)
+
+def upsert_summary_rows(rows):
+    """
+    Add counts to the summary, creating rows for new cashier/type pairs.
+    
+    PostgreSQL and SQLite use INSERT ... ON CONFLICT DO UPDATE, so two
+    uploads bringing the same new pair at once both succeed. Other
+    databases update first and insert the missing pairs in a savepoint,
+    retrying the update if a concurrent upload inserted the pair first.
+    
+    Args:
+        rows: dicts with the TransactionSummary columns, as returned by
+            aggregate_transactions
+    """
+    columns = ('total',) + SUMMARY_STATUSES
+    table = TransactionSummary.__table__
+    dialect = db.session.get_bind().dialect.name
+    
+    if dialect in ('postgresql', 'sqlite'):
+        dialect_insert = postgresql_insert if dialect == 'postgresql' else sqlite_insert
+        statement = dialect_insert(table).values(rows)
+        db.session.execute(statement.on_conflict_do_update(
+            index_elements=['cashier_id', 'transaction_type'],
+            set_={column: table.c[column] + statement.excluded[column] for column in columns}
+        ))
+        return
+    
+    for row in rows:
+        increment = (
+            update(TransactionSummary)
+            .where(
+                TransactionSummary.cashier_id == row['cashier_id'],
+                TransactionSummary.transaction_type == row['transaction_type']
+            )
+            .values(**{column: getattr(TransactionSummary, column) + row[column] for column in columns})
+        )
+        if db.session.execute(increment).rowcount:
+            continue
+        try:
+            with db.session.begin_nested():
+                db.session.execute(insert(TransactionSummary), row)
+        except IntegrityError:
+            db.session.execute(increment)
+
+def record_status_change(transaction, old_status, new_status):
+    """
+    Move one transaction between status counts in the summary.
+    
+    Call in the same database transaction as the review update, before commit.
+    
+    Args:
+        transaction: SuspiciousTransaction that was reviewed
+        old_status: Review status before the change
+        new_status: Review status after the change
+    """
+    record_status_changes({(transaction.cashier_id or '', transaction.transaction_type, old_status): 1}, new_status)
+
+def record_status_changes(moved, new_status):
+    """
+    Move many transactions between status counts in the summary.
+    
+    Issues one UPDATE per cashier and transaction type. Call in the same
+    database transaction as the review update, before commit.
+    
+    Args:
+        moved: dict of (cashier_id or '', transaction_type, old_status) to
+            the number of transactions moved out of that status
+        new_status: Review status after the change
+    """
+    changes = {}
+    for (cashier_id, transaction_type, old_status), count in moved.items():
+        if old_status == new_status or not count:
+            continue
+        deltas = changes.setdefault((cashier_id, transaction_type), {})
+        if old_status in SUMMARY_STATUSES:
+            deltas[old_status] = deltas.get(old_status, 0) - count
+        if new_status in SUMMARY_STATUSES:
+            deltas[new_status] = deltas.get(new_status, 0) + count
+    
+    for (cashier_id, transaction_type), deltas in changes.items():
+        values = {status: getattr(TransactionSummary, status) + delta for status, delta in deltas.items() if delta}
+        if not values:
+            continue
+        db.session.execute(
+            update(TransactionSummary)
+            .where(
+                TransactionSummary.cashier_id == cashier_id,
+                TransactionSummary.transaction_type == transaction_type
+            )
+            .values(**values)
+        )
+
+def rebuild_summary():
+    """
+    Recompute the summary table from all transactions.
+    
+    Returns:
+        int: Number of summary rows written
+    """
+    rows = aggregate_transactions()
+    db.session.execute(delete(TransactionSummary))
+    if rows:
+        db.session.execute(insert(TransactionSummary), rows)
+    db.session.commit()
+    logging.info(f"Rebuilt transaction summary with {len(rows)} rows")
+    return len(rows)
+
+def ensure_summary():
+    """
+    Build the summary table if it is empty but transactions exist.
+    
+    Only an empty table is rebuilt; counts that drifted from the
+    transactions, e.g. after rows were edited by hand, are repaired with
+    `flask --app main rebuild-summary`.
+    """
+    has_summary = db.session.execute(db.select(TransactionSummary.id).limit(1)).first()
+    has_transactions = db.session.execute(db.select(SuspiciousTransaction.id).limit(1)).first()
+    if has_transactions and not has_summary:
+        rebuild_summary()
+
+def get_statistics():
+    """
+    Aggregate statistics for the home page and reports page.
+    
+    Reads the summary table, whose size depends on the number of cashiers
+    and transaction types, not on the number of transactions.
+    
+    Returns:
+        dict: total_reports, total_suspicious, pending_reviews, fraud_count,
+        and status_counts, type_counts and cashier_counts as lists of
+        (key, count) tuples, cashiers ordered by count (top 10)
+    """
+    rows = db.session.execute(db.select(TransactionSummary)).scalars().all()
+    
+    total = 0
+    status_totals = dict.fromkeys(SUMMARY_STATUSES, 0)
+    type_totals = {}
+    cashier_totals = {}
+    for row in rows:
+        total += row.total
+        for status in SUMMARY_STATUSES:
+            status_totals[status] += getattr(row, status)
+        type_totals[row.transaction_type] = type_totals.get(row.transaction_type, 0) + row.total
+        cashier_id = row.cashier_id or None
+        cashier_totals[cashier_id] = cashier_totals.get(cashier_id, 0) + row.total
+    
+    status_counts = [(status, count) for status, count in status_totals.items() if count]
+    other_count = total - sum(status_totals.values())
+    if other_count:
+        status_counts.append(('other', other_count))
+    
+    return {
+        'total_reports': db.session.execute(db.select(func.count(TransactionReport.id))).scalar(),
+        'total_suspicious': total,
+        'pending_reviews': status_totals['pending'],
+        'fraud_count': status_totals['fraud'],
+        'status_counts': status_counts,
+        'type_counts': sorted((item for item in type_totals.items() if item[1]), key=lambda item: item[0]),
+        'cashier_counts': sorted(
+            (item for item in cashier_totals.items() if item[1]), key=lambda item: item[1], reverse=True
+        )[:10]
+    }
@@ -0,0 +1,338 @@
+import os
+import re
+import json
+import time
+import bisect
+import logging
+import subprocess
+import threading
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app import db
+from models import VideoSource
+from utils.media_cache import get_media_cache
+from utils.metrics import span
+
+VIDEO_EXTENSIONS = ('.mp4',)
+
+# Directory rescans happen at most this often unless the directory itself changed
+CATALOG_REFRESH_SECONDS = 60
+
+# ffprobe reads every packet header of a source video to list its keyframes
+KEYFRAME_PROBE_TIMEOUT_SECONDS = 300
+
+# Camera prefix, date, then optional hour, minute and second, e.g.
+# 2025-07-04.mp4, 20250704_1430.mp4, 2025-07-04-14-30.mp4, cam1_20250704.mp4
+VIDEO_FILENAME_PATTERN = re.compile(
+    r'^(?:(?P<prefix>[A-Za-z]+?)(?P<camera>\d*)_)?'
+    r'(?P<date>\d{4}-\d{2}-\d{2}|\d{8})'
+    r'(?:[-_](?P<hour>\d{2})(?:[-_]?(?P<minute>\d{2})(?:[-_]?(?P<second>\d{2}))?)?)?'
+)
+
+_catalog_lock = threading.Lock()
+_catalog = {
+    'source_dir': None,
+    'dir_mtime': None,
+    'checked_at': 0.0,
+    'index': ([], [], timedelta(0))
+}
+
+def parse_video_filename(filename):
+    """
+    Parse camera and recording start time from a video filename.
+    
+    Args:
+        filename: Video file basename
+    
+    Returns:
+        tuple: (camera, start time, nominal span) or None if the name has no date
+    """
+    match = VIDEO_FILENAME_PATTERN.match(filename)
+    if not match:
+        return None
+    
+    date_str = match.group('date').replace('-', '')
+    try:
+        start_time = datetime.strptime(date_str, '%Y%m%d')
+        if match.group('hour') is None:
+            # Daily recordings cover the whole named day
+            return match.group('camera') or None, start_time, timedelta(days=1)
+        
+        start_time = start_time.replace(
+            hour=int(match.group('hour')),
+            minute=int(match.group('minute') or 0),
+            second=int(match.group('second') or 0)
+        )
+    except ValueError:
+        return None
+    
+    return match.group('camera') or None, start_time, timedelta(hours=1)
+
+def probe_duration(path):
+    """
+    Get the duration of a video file with ffprobe.
+    
+    Args:
+        path: Path to video file
+    
+    Returns:
+        float: Duration in seconds or None
+    """
+    if not get_media_cache().tool_available('ffprobe'):
+        return None
+    
+    try:
+        cmd = ['ffprobe', '-v', 'error', '-show_entries', 'format=duration', '-of', 'csv=p=0', path]
+        with span('ffprobe'):
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
+        if result.returncode == 0 and result.stdout.strip():
+            return float(result.stdout.strip())
+    except (FileNotFoundError, subprocess.TimeoutExpired, ValueError):
+        pass
+    return None
+
+def refresh_video_catalog(force=False):
+    """
+    Bring the video catalog up to date with the video source directory.
+    
+    Only files whose mtime or size changed since they were indexed are parsed
+    and probed again; files that disappeared are dropped. The catalog is
+    written in a session of its own, so the caller's session is never
+    committed. Another process indexing the same new files makes the
+    commit fail on the unique path; the scan is then rolled back and run
+    once more against what that process stored.
+    
+    Args:
+        force: Rescan even if the refresh interval has not elapsed
+    
+    Returns:
+        dict: Counts of added, updated, removed and total catalog entries,
+        or None if the catalog was still fresh
+    """
+    source_dir = current_app.config['VIDEO_SOURCE_FOLDER']
+    
+    with _catalog_lock:
+        try:
+            dir_mtime = os.stat(source_dir).st_mtime
+        except OSError:
+            dir_mtime = None
+        
+        # Adding or removing files changes the directory mtime, so an unchanged
+        # directory only needs a periodic rescan for files rewritten in place
+        if not force and _catalog['source_dir'] == source_dir and _catalog['dir_mtime'] == dir_mtime \
+                and time.monotonic() - _catalog['checked_at'] < CATALOG_REFRESH_SECONDS:
+            return None
+        
+        with Session(db.engine) as session:
+            for attempt in range(2):
+                try:
+                    stats = _sync_catalog(session, source_dir, dir_mtime)
+                    session.commit()
+                    break
+                except IntegrityError as e:
+                    session.rollback()
+                    if attempt:
+                        raise
+                    logging.info(f"Video catalog changed by another process, rescanning: {str(e.orig)}")
+            
+            # Rebuild the in-memory interval index ordered by start time
+            entries = session.execute(
+                db.select(VideoSource.start_time, VideoSource.end_time, VideoSource.camera, VideoSource.path)
+                .order_by(VideoSource.start_time, VideoSource.path)
+            ).all()
+        _catalog['source_dir'] = source_dir
+        _catalog['dir_mtime'] = dir_mtime
+        _catalog['checked_at'] = time.monotonic()
+        _catalog['index'] = (
+            [entry[0] for entry in entries],
+            [tuple(entry) for entry in entries],
+            max((entry[1] - entry[0] for entry in entries), default=timedelta(0))
+        )
+        
+        stats['total'] = len(entries)
+        if stats['added'] or stats['updated'] or stats['removed']:
+            logging.info(f"Video catalog refreshed: {stats}")
+        return stats
+
+def _sync_catalog(session, source_dir, dir_mtime):
+    # Stage the catalog changes for the source directory in the session
+    indexed = {source.path: source for source in session.execute(db.select(VideoSource)).scalars()}
+    stats = {'added': 0, 'updated': 0, 'removed': 0}
+    seen = set()
+    
+    if dir_mtime is not None:
+        for entry in os.scandir(source_dir):
+            if not entry.is_file() or not entry.name.lower().endswith(VIDEO_EXTENSIONS):
+                continue
+            
+            parsed = parse_video_filename(entry.name)
+            if not parsed:
+                continue
+            
+            seen.add(entry.path)
+            file_stat = entry.stat()
+            source = indexed.get(entry.path)
+            if source and source.file_mtime == file_stat.st_mtime and source.file_size == file_stat.st_size:
+                continue
+            
+            camera, start_time, duration_span = parsed
+            duration = probe_duration(entry.path)
+            if duration and duration_span < timedelta(days=1):
+                duration_span = timedelta(seconds=duration)
+            
+            if source is None:
+                source = VideoSource(path=entry.path)
+                session.add(source)
+                stats['added'] += 1
+            else:
+                stats['updated'] += 1
+            source.camera = camera
+            source.start_time = start_time
+            source.end_time = start_time + duration_span
+            source.duration = duration
+            source.file_mtime = file_stat.st_mtime
+            source.file_size = file_stat.st_size
+            source.keyframes = None
+            source.indexed_date = datetime.utcnow()
+    
+    for path, source in indexed.items():
+        if path not in seen:
+            session.delete(source)
+            stats['removed'] += 1
+    
+    return stats
+
+@span('catalog_lookup')
+def lookup_video(timestamp, camera=None):
+    """
+    Find the source video covering a timestamp.
+    
+    Binary search finds the recordings starting at or before the timestamp;
+    the latest-starting one that still covers it is the most specific match.
+    
+    Args:
+        timestamp: datetime object
+        camera: Optional camera to restrict the search to
+    
+    Returns:
+        str: Path to source video file or None
+    """
+    refresh_video_catalog()
+    
+    starts, entries, max_span = _catalog['index']
+    earliest_start = timestamp - max_span
+    
+    index = bisect.bisect_right(starts, timestamp) - 1
+    while index >= 0 and starts[index] >= earliest_start:
+        start_time, end_time, entry_camera, path = entries[index]
+        if timestamp < end_time and (camera is None or entry_camera == camera):
+            return path
+        index -= 1
+    
+    return None
+
+
+def probe_keyframes(path):
+    """
+    List the keyframe times of the first video stream with ffprobe.
+    
+    Only packet headers are read, nothing is decoded.
+    
+    Args:
+        path: Path to video file
+    
+    Returns:
+        list: Sorted keyframe times in seconds, empty if probing failed
+    """
+    if not get_media_cache().tool_available('ffprobe'):
+        return []
+    
+    try:
+        cmd = [
+            'ffprobe', '-v', 'error',
+            '-select_streams', 'v:0',
+            '-show_entries', 'packet=pts_time,flags',
+            '-of', 'csv=p=0',
+            path
+        ]
+        with span('ffprobe'):
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=KEYFRAME_PROBE_TIMEOUT_SECONDS)
+        if result.returncode != 0:
+            return []
+        
+        keyframes = []
+        for line in result.stdout.splitlines():
+            pts_time, _, flags = line.partition(',')
+            if 'K' in flags and pts_time not in ('', 'N/A'):
+                keyframes.append(float(pts_time))
+        return sorted(keyframes)
+    except (FileNotFoundError, subprocess.TimeoutExpired, ValueError):
+        return []
+
+def get_keyframes(path):
+    """
+    Get the keyframe index of a source video.
+    
+    The index is built once with ffprobe and stored on the catalog entry,
+    and kept in the media cache for as long as the file's mtime and size
+    are unchanged. It is left out of the cache's store file, since the
+    catalog entry already persists it.
+    
+    Args:
+        path: Path to video file
+    
+    Returns:
+        list: Sorted keyframe times in seconds, empty if unavailable
+    """
+    return get_media_cache().get('keyframes', path, load_keyframes, persist=False) or []
+
+def load_keyframes(path):
+    """
+    Load the keyframe index stored on the catalog entry, probing if needed.
+    
+    Args:
+        path: Path to video file
+    
+    Returns:
+        list: Sorted keyframe times in seconds, empty if unavailable
+    """
+    file_stat = os.stat(path)
+    file_key = (file_stat.st_mtime, file_stat.st_size)
+    
+    source = VideoSource.query.filter_by(path=path).first()
+    if source and source.keyframes and (source.file_mtime, source.file_size) == file_key:
+        return json.loads(source.keyframes)
+    
+    keyframes = probe_keyframes(path)
+    if keyframes and source and (source.file_mtime, source.file_size) == file_key:
+        # Stored in a session of its own, like the catalog, not the caller's
+        with Session(db.engine) as session:
+            session.execute(
+                update(VideoSource)
+                .where(VideoSource.path == path, VideoSource.file_mtime == file_key[0], VideoSource.file_size == file_key[1])
+                .values(keyframes=json.dumps(keyframes))
+            )
+            session.commit()
+    logging.info(f"Indexed {len(keyframes)} keyframes in {path}")
+    return keyframes
+
+def keyframe_before(path, offset_seconds):
+    """
+    Find the seek position for a clip starting at an offset in a source video.
+    
+    Args:
+        path: Path to video file
+        offset_seconds: Desired clip start offset
+    
+    Returns:
+        float: Time of the last keyframe at or before the offset, or the
+        offset itself if no keyframe index is available
+    """
+    keyframes = get_keyframes(path)
+    index = bisect.bisect_right(keyframes, offset_seconds) - 1
+    if index < 0:
+        return offset_seconds if not keyframes else 0.0
+    return keyframes[index]
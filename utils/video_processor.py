@@ -6,6 +6,20 @@ import glob
 from flask import current_app
 import requests
 import json
+from utils.video_catalog import lookup_video, keyframe_before, KEYFRAME_PROBE_TIMEOUT_SECONDS
+from utils.media_cache import get_media_cache
+from utils.dvr_client import get_dvr_client
+from utils.health_probe import run_all, cached_probe, DEFAULT_CACHE_SECONDS, DEFAULT_DEADLINE_SECONDS
+from utils.metrics import span
+
+# Clip length around each transaction (90 seconds before, 30 seconds after)
+CLIP_SECONDS_BEFORE = 90
+CLIP_SECONDS_AFTER = 30
+
+# FFmpeg timeouts: one clip, and the base and per-clip allowance of a batched run
+CLIP_TIMEOUT_SECONDS = 30
+BATCH_TIMEOUT_SECONDS = 30
+BATCH_TIMEOUT_PER_CLIP_SECONDS = 10
 
 def create_video_clip(transaction):
     """
@@ -20,18 +34,9 @@ def create_video_clip(transaction):
     """
     try:
         # Calculate clip start and end times (90 seconds before, 30 seconds after)
-        clip_start = transaction.transaction_timestamp - timedelta(seconds=90)
-        clip_end = transaction.transaction_timestamp + timedelta(seconds=30)
-        
-        # Create output filename
-        output_filename = f"{transaction.transaction_type.replace(' ', '_')}_{transaction.transaction_timestamp.strftime('%Y-%m-%d_%H-%M-%S')}_Cashier{transaction.cashier_id or 'Unknown'}.mp4"
+        clip_start, clip_end = clip_window(transaction.transaction_timestamp)
         
-        # Create date-based subfolder
-        date_folder = transaction.transaction_timestamp.strftime('%Y-%m-%d')
-        output_dir = os.path.join(current_app.config['CLIPS_FOLDER'], date_folder)
-        os.makedirs(output_dir, exist_ok=True)
-        
-        output_path = os.path.join(output_dir, output_filename)
+        output_path = clip_output_path(transaction)
         
         # Try different video source methods
         success = False
@@ -67,6 +72,108 @@ def create_video_clip(transaction):
         logging.error(f"Error creating video clip for transaction {transaction.id}: {str(e)}")
         return None
 
+def clip_window(timestamp):
+    """
+    Calculate the clip start and end times for a transaction timestamp.
+    
+    Args:
+        timestamp: Transaction timestamp
+        
+    Returns:
+        tuple: (clip start, clip end) datetimes
+    """
+    return timestamp - timedelta(seconds=CLIP_SECONDS_BEFORE), timestamp + timedelta(seconds=CLIP_SECONDS_AFTER)
+
+def clip_output_path(transaction, filename=None):
+    """
+    Build the output path for a transaction clip in its date-based subfolder.
+    
+    Args:
+        transaction: SuspiciousTransaction object
+        filename: Optional filename overriding the per-transaction name
+        
+    Returns:
+        str: Path for the output clip
+    """
+    # Create output filename
+    if filename is None:
+        # Cashier names like "N/A" must not introduce a subdirectory
+        cashier = (transaction.cashier_id or 'Unknown').replace('/', '')
+        filename = f"{transaction.transaction_type.replace(' ', '_')}_{transaction.transaction_timestamp.strftime('%Y-%m-%d_%H-%M-%S')}_Cashier{cashier}.mp4"
+    
+    # Create date-based subfolder
+    date_folder = transaction.transaction_timestamp.strftime('%Y-%m-%d')
+    output_dir = os.path.join(current_app.config['CLIPS_FOLDER'], date_folder)
+    os.makedirs(output_dir, exist_ok=True)
+    
+    return os.path.join(output_dir, filename)
+
+def has_remote_video_source():
+    """
+    Check if a remote video source takes priority over local files.
+    
+    Returns:
+        bool: True if Alibi Cloud or an RTSP stream is configured
+    """
+    return bool(os.environ.get('ALIBI_CLOUD_API') or os.environ.get('RTSP_STREAM_URL'))
+
+def merge_clip_windows(transactions):
+    """
+    Merge the overlapping clip windows of transactions from one source video.
+    
+    Args:
+        transactions: List of SuspiciousTransaction objects
+        
+    Returns:
+        list: (start, end, transactions) tuples ordered by start time
+    """
+    merged = []
+    for transaction in sorted(transactions, key=lambda t: t.transaction_timestamp):
+        start, end = clip_window(transaction.transaction_timestamp)
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end), merged[-1][2] + [transaction])
+        else:
+            merged.append((start, end, [transaction]))
+    return merged
+
+def create_video_clips_from_source(source_path, transactions):
+    """
+    Create the clips for all transactions that share one local source video.
+    
+    Overlapping clip windows are merged into a single clip, and all clips
+    are cut by one FFmpeg process that opens the source once per clip as a
+    fast-seeked `-ss ... -i source` input, so only the clipped ranges are
+    read and the process startup is paid once.
+    
+    Args:
+        source_path: Path to source video file
+        transactions: List of SuspiciousTransaction objects
+        
+    Returns:
+        dict: Transaction ID to clip path, None where extraction failed
+    """
+    clips = []
+    clip_transactions = []
+    for start, end, window_transactions in merge_clip_windows(transactions):
+        first = window_transactions[0]
+        if len(window_transactions) == 1:
+            output_path = clip_output_path(first)
+        else:
+            # One clip covers every transaction in the merged window
+            output_path = clip_output_path(first, f"MERGED_{start.strftime('%Y-%m-%d_%H-%M-%S')}_to_{end.strftime('%H-%M-%S')}_{len(window_transactions)}events.mp4")
+        clips.append((output_path, start, end))
+        clip_transactions.append(window_transactions)
+    
+    results = extract_video_clips(source_path, clips)
+    
+    clip_paths = {}
+    for (output_path, _, _), window_transactions in zip(clips, clip_transactions):
+        for transaction in window_transactions:
+            clip_paths[transaction.id] = output_path if results.get(output_path) else None
+    
+    logging.info(f"Created {sum(1 for ok in results.values() if ok)}/{len(clips)} clips for {len(transactions)} transactions from {source_path}")
+    return clip_paths
+
 def find_source_video(timestamp):
     """
     Find the source video file that contains the given timestamp.
@@ -78,87 +185,14 @@ def find_source_video(timestamp):
         str: Path to source video file or None
     """
     try:
-        video_source_dir = current_app.config['VIDEO_SOURCE_FOLDER']
-        
-        # Common video file patterns with various naming conventions
-        patterns = [
-            # Exact time matches
-            f"{timestamp.strftime('%Y-%m-%d-%H-%M')}.mp4",
-            f"{timestamp.strftime('%Y%m%d_%H%M')}.mp4",
-            f"{timestamp.strftime('%Y-%m-%d_%H-%M-%S')}.mp4",
-            f"{timestamp.strftime('%Y%m%d_%H%M%S')}.mp4",
-            
-            # Daily files (common for 24-hour recordings)
-            f"{timestamp.strftime('%Y-%m-%d')}.mp4",
-            f"{timestamp.strftime('%Y%m%d')}.mp4",
-            f"{timestamp.strftime('%Y-%m-%d')}*.mp4",
-            f"{timestamp.strftime('%Y%m%d')}*.mp4",
-            
-            # Hourly files
-            f"{timestamp.strftime('%Y-%m-%d-%H')}*.mp4",
-            f"{timestamp.strftime('%Y%m%d_%H')}*.mp4",
-            
-            # Common camera naming patterns
-            f"cam1_{timestamp.strftime('%Y%m%d')}.mp4",
-            f"camera1_{timestamp.strftime('%Y-%m-%d')}.mp4",
-            f"recording_{timestamp.strftime('%Y%m%d')}.mp4"
-        ]
-        
-        # Search for matching files
-        for pattern in patterns:
-            search_path = os.path.join(video_source_dir, pattern)
-            matches = glob.glob(search_path)
-            
-            if matches:
-                # Return the first match (could be enhanced to find best match)
-                logging.info(f"Found video file match: {matches[0]} for pattern: {pattern}")
-                return matches[0]
-        
-        # Log available files for debugging
-        all_files = glob.glob(os.path.join(video_source_dir, "*.mp4"))
-        logging.warning(f"No video file found for {timestamp}. Available files: {all_files}")
-        logging.info(f"Searched patterns: {patterns}")
-        
-        # If no exact match, look for files in the same hour
-        hour_pattern = os.path.join(video_source_dir, f"{timestamp.strftime('%Y-%m-%d-%H')}*.mp4")
-        matches = glob.glob(hour_pattern)
-        
-        if matches:
-            return matches[0]
-        
-        # Last resort: look for files on the same day
-        day_pattern = os.path.join(video_source_dir, f"{timestamp.strftime('%Y-%m-%d')}*.mp4")
-        matches = glob.glob(day_pattern)
-        
-        if matches:
-            # Find the file with timestamp closest to our target
-            target_time = timestamp.time()
-            best_match = None
-            min_diff = float('inf')
-            
-            for match in matches:
-                # Try to extract time from filename
-                try:
-                    basename = os.path.basename(match)
-                    # This is a simplified approach - you might need to adjust based on your naming convention
-                    if len(basename) >= 19:  # YYYY-MM-DD-HH-MM format
-                        file_time_str = basename[11:16]  # HH-MM part
-                        file_time = datetime.strptime(file_time_str, '%H-%M').time()
-                        
-                        # Calculate time difference
-                        diff = abs((datetime.combine(timestamp.date(), target_time) - 
-                                  datetime.combine(timestamp.date(), file_time)).total_seconds())
-                        
-                        if diff < min_diff:
-                            min_diff = diff
-                            best_match = match
-                except Exception:
-                    continue
-            
-            return best_match
+        source_video = lookup_video(timestamp)
         
-        logging.warning(f"No video file found for timestamp {timestamp}")
-        return None
+        if source_video:
+            logging.debug(f"Found video file match: {source_video} for {timestamp}")
+        else:
+            # The worker looks up every due job on each poll, so keep this quiet
+            logging.debug(f"No video file found for timestamp {timestamp}")
+        return source_video
         
     except Exception as e:
         logging.error(f"Error finding source video: {str(e)}")
@@ -186,46 +220,18 @@ def extract_video_clip(source_path, output_path, start_time, end_time):
         # Calculate duration
         duration = (end_time - start_time).total_seconds()
         
-        # Get video file creation time (simplified approach)
-        # In a real implementation, you'd need to correlate video timestamp with transaction timestamp
-        # For now, we'll assume the video starts at the beginning of the hour
-        
-        # For daily video files (like 2025-07-04.mp4), assume video starts at beginning of day
-        # Extract the date from the video file and calculate offset from midnight
-        import os
-        video_filename = os.path.basename(source_path)
-        
-        # For files named like "2025-07-04.mp4", extract the date
-        if video_filename.startswith('20') and len(video_filename) >= 10:
-            try:
-                # Extract date from filename like "2025-07-04.mp4"
-                date_str = video_filename[:10]  # "2025-07-04"
-                video_date = datetime.strptime(date_str, '%Y-%m-%d').date()
-                day_start = datetime.combine(video_date, datetime.min.time())
-                
-                # Calculate offset in seconds from start of day
-                offset_seconds = (start_time - day_start).total_seconds()
-                
-                # Since your video file is only 30 seconds, let's use a proportional offset
-                # For testing, we'll take the transaction time within the video duration
-                offset_seconds = offset_seconds % 30  # Keep within 30-second video length
-                
-                logging.info(f"Video {video_filename} calculated offset: {offset_seconds}s for transaction at {start_time}")
-            except ValueError:
-                # Fallback to hourly offset if date parsing fails
-                video_start = start_time.replace(minute=0, second=0, microsecond=0)
-                offset_seconds = (start_time - video_start).total_seconds()
-        else:
-            # Fallback for other naming patterns
-            video_start = start_time.replace(minute=0, second=0, microsecond=0)
-            offset_seconds = (start_time - video_start).total_seconds()
+        offset_seconds = max(0, calculate_video_offset(source_path, start_time))
+        
+        # Seek on the input to the keyframe before the offset, so FFmpeg jumps
+        # straight there instead of demuxing everything before the clip
+        seek_seconds = keyframe_before(source_path, offset_seconds)
         
         # FFmpeg command
         cmd = [
             'ffmpeg',
+            '-ss', str(seek_seconds),  # Start offset
             '-i', source_path,
-            '-ss', str(max(0, offset_seconds)),  # Start offset
-            '-t', str(duration),  # Duration
+            '-t', str(duration + offset_seconds - seek_seconds),  # Duration
             '-c', 'copy',  # Copy streams without re-encoding for speed
             '-avoid_negative_ts', 'make_zero',
             '-y',  # Overwrite output file
@@ -233,8 +239,10 @@ def extract_video_clip(source_path, output_path, start_time, end_time):
         ]
         
         # Execute FFmpeg command
-        logging.info(f"Executing FFmpeg command: {' '.join(cmd)}")
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
+        if logging.getLogger().isEnabledFor(logging.DEBUG):
+            logging.debug(f"Executing FFmpeg command: {' '.join(cmd)}")
+        with span('ffmpeg'):
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=CLIP_TIMEOUT_SECONDS)
         
         if result.returncode == 0:
             logging.info(f"Successfully created clip: {output_path}")
@@ -250,18 +258,142 @@ def extract_video_clip(source_path, output_path, start_time, end_time):
         logging.error(f"Error extracting video clip: {str(e)}")
         return False
 
+def calculate_video_offset(source_path, start_time):
+    """
+    Calculate the offset of a clip start time within a source video.
+    
+    Args:
+        source_path: Path to source video file
+        start_time: Start time for the clip
+        
+    Returns:
+        float: Offset in seconds from the start of the video
+    """
+    # Get video file creation time (simplified approach)
+    # In a real implementation, you'd need to correlate video timestamp with transaction timestamp
+    # For now, we'll assume the video starts at the beginning of the hour
+    
+    # For daily video files (like 2025-07-04.mp4), assume video starts at beginning of day
+    # Extract the date from the video file and calculate offset from midnight
+    video_filename = os.path.basename(source_path)
+    
+    # For files named like "2025-07-04.mp4", extract the date
+    if video_filename.startswith('20') and len(video_filename) >= 10:
+        try:
+            # Extract date from filename like "2025-07-04.mp4"
+            date_str = video_filename[:10]  # "2025-07-04"
+            video_date = datetime.strptime(date_str, '%Y-%m-%d').date()
+            day_start = datetime.combine(video_date, datetime.min.time())
+            
+            # Calculate offset in seconds from start of day
+            offset_seconds = (start_time - day_start).total_seconds()
+            
+            # Since your video file is only 30 seconds, let's use a proportional offset
+            # For testing, we'll take the transaction time within the video duration
+            offset_seconds = offset_seconds % 30  # Keep within 30-second video length
+            
+            logging.debug(f"Video {video_filename} calculated offset: {offset_seconds}s for transaction at {start_time}")
+        except ValueError:
+            # Fallback to hourly offset if date parsing fails
+            video_start = start_time.replace(minute=0, second=0, microsecond=0)
+            offset_seconds = (start_time - video_start).total_seconds()
+    else:
+        # Fallback for other naming patterns
+        video_start = start_time.replace(minute=0, second=0, microsecond=0)
+        offset_seconds = (start_time - video_start).total_seconds()
+    
+    return offset_seconds
+
+def extract_video_clips(source_path, clips):
+    """
+    Extract several clips from one source video with a single FFmpeg run.
+    
+    Each clip gets its own input seeked to the keyframe before it, so only
+    the clipped ranges of the source are read, and is written as a separate
+    output. If the combined run fails, each clip is retried on its own.
+    
+    Args:
+        source_path: Path to source video file
+        clips: List of (output_path, start_time, end_time) tuples
+        
+    Returns:
+        dict: Output path to True if the clip was created
+    """
+    if not clips:
+        return {}
+    
+    if len(clips) == 1:
+        output_path, start_time, end_time = clips[0]
+        return {output_path: extract_video_clip(source_path, output_path, start_time, end_time)}
+    
+    try:
+        # Check if FFmpeg is available
+        if not is_ffmpeg_available():
+            logging.error("FFmpeg is not available")
+            return {output_path: False for output_path, _, _ in clips}
+        
+        # FFmpeg command with one fast-seeked input and one output per clip
+        cmd = ['ffmpeg', '-y']
+        outputs = []
+        for index, (output_path, start_time, end_time) in enumerate(clips):
+            offset_seconds = max(0, calculate_video_offset(source_path, start_time))
+            seek_seconds = keyframe_before(source_path, offset_seconds)
+            cmd += ['-ss', str(seek_seconds), '-i', source_path]  # Start offset
+            outputs += [
+                '-map', str(index),
+                '-t', str((end_time - start_time).total_seconds() + offset_seconds - seek_seconds),  # Duration
+                '-c', 'copy',  # Copy streams without re-encoding for speed
+                '-avoid_negative_ts', 'make_zero',
+                output_path
+            ]
+        cmd += outputs
+        
+        # Execute FFmpeg command
+        if logging.getLogger().isEnabledFor(logging.DEBUG):
+            logging.debug(f"Executing FFmpeg command for {len(clips)} clips: {' '.join(cmd)}")
+        with span('ffmpeg'):
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=BATCH_TIMEOUT_SECONDS + BATCH_TIMEOUT_PER_CLIP_SECONDS * len(clips))
+        
+        if result.returncode == 0:
+            logging.info(f"Successfully created {len(clips)} clips from {source_path}")
+            return {output_path: True for output_path, _, _ in clips}
+        else:
+            logging.error(f"FFmpeg error: {result.stderr}")
+            
+    except subprocess.TimeoutExpired:
+        logging.error("FFmpeg command timed out")
+    except Exception as e:
+        logging.error(f"Error extracting video clips: {str(e)}")
+    
+    # Fall back to one FFmpeg run per clip
+    return {output_path: extract_video_clip(source_path, output_path, start_time, end_time)
+            for output_path, start_time, end_time in clips}
+
+def max_batch_clips(seconds):
+    """
+    Most clips one extract_video_clips call can take and still end in time.
+    
+    Counts the worst case: probing the source's keyframes, the batched run
+    timing out and every clip then being retried on its own.
+    
+    Args:
+        seconds: Time the call must finish within
+    
+    Returns:
+        int: Number of clips, at least 1
+    """
+    per_clip_seconds = BATCH_TIMEOUT_PER_CLIP_SECONDS + CLIP_TIMEOUT_SECONDS
+    return max(1, (seconds - KEYFRAME_PROBE_TIMEOUT_SECONDS - BATCH_TIMEOUT_SECONDS) // per_clip_seconds)
+
 def is_ffmpeg_available():
     """
     Check if FFmpeg is available on the system.
+    The check runs once per process and is cached.
     
     Returns:
         bool: True if FFmpeg is available
     """
-    try:
-        result = subprocess.run(['ffmpeg', '-version'], capture_output=True, text=True)
-        return result.returncode == 0
-    except FileNotFoundError:
-        return False
+    return get_media_cache().tool_available('ffmpeg')
 
 def extract_clip_from_alibi_cloud(timestamp, output_path, start_time, end_time):
     """
@@ -284,61 +416,16 @@ def extract_clip_from_alibi_cloud(timestamp, output_path, start_time, end_time):
         alibi_password = os.environ.get('ALIBI_PASSWORD', 'password')
         camera_id = os.environ.get('ALIBI_CAMERA_ID', '4')
         
-        # Convert to format used by Alibi DVR systems
-        start_str = start_time.strftime('%Y-%m-%d %H:%M:%S')
-        end_str = end_time.strftime('%Y-%m-%d %H:%M:%S')
-        
         logging.info(f"Requesting clip from DVR {alibi_dvr_host}:{alibi_dvr_port} for Camera {camera_id}")
-        logging.info(f"Time range: {start_str} to {end_str}")
-        
-        # Try different Alibi DVR endpoints for your system
-        common_paths = [
-            '/cgi-bin/videodownload.cgi',
-            '/api/video/export',
-            '/video/download',
-            '/playback/download',
-            '/cgi-bin/playback.cgi',
-            '/download/video'
-        ]
-        
-        for path in common_paths:
-            try:
-                # Build URL for video download using your actual DVR details
-                dvr_url = f"http://{alibi_dvr_host}:{alibi_dvr_port}{path}"
-                
-                # Parameters for video export
-                params = {
-                    'camera': camera_id,
-                    'channel': camera_id,
-                    'starttime': start_str,
-                    'endtime': end_str,
-                    'format': 'mp4'
-                }
-                
-                # Make authenticated request
-                response = requests.get(
-                    dvr_url,
-                    params=params,
-                    auth=(alibi_username, alibi_password),
-                    timeout=60,
-                    stream=True
-                )
-                
-                if response.status_code == 200 and 'video' in response.headers.get('content-type', ''):
-                    # Save the video clip
-                    with open(output_path, 'wb') as f:
-                        for chunk in response.iter_content(chunk_size=8192):
-                            f.write(chunk)
-                    logging.info(f"Successfully downloaded clip from local DVR via {dvr_url}")
-                    return True
-                elif response.status_code == 404:
-                    continue  # Try next configuration
-                else:
-                    logging.warning(f"DVR endpoint {dvr_url} returned: {response.status_code}")
-                    
-            except requests.exceptions.RequestException as e:
-                logging.warning(f"Failed to connect to DVR at {dvr_url}: {str(e)}")
-                continue
+        logging.info(f"Time range: {start_time.strftime('%Y-%m-%d %H:%M:%S')} to {end_time.strftime('%Y-%m-%d %H:%M:%S')}")
+        
+        # Pooled client that remembers which download endpoint works for this DVR
+        client = get_dvr_client(
+            alibi_dvr_host, alibi_dvr_port, alibi_username, alibi_password,
+            max_downloads=current_app.config.get('DVR_MAX_DOWNLOADS', 4)
+        )
+        if client.download_clip(camera_id, start_time, end_time, output_path):
+            return True
         
         logging.info("DVR web interface not accessible from cloud server - this is normal for security")
         logging.info("Trying RTSP connection as alternative method")
@@ -397,8 +484,9 @@ def extract_clip_from_rtsp(rtsp_url, timestamp, output_path, start_time, end_tim
         ]
         
         # Execute FFmpeg command
-        logging.info(f"Executing RTSP extraction: {' '.join(cmd[:3])}...")  # Don't log full URL for security
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
+        logging.debug(f"Executing RTSP extraction: {' '.join(cmd[:3])}...")  # Don't log full URL for security
+        with span('ffmpeg'):
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
         
         if result.returncode == 0:
             logging.info(f"Successfully extracted clip from RTSP stream")
@@ -414,62 +502,94 @@ def extract_clip_from_rtsp(rtsp_url, timestamp, output_path, start_time, end_tim
         logging.error(f"Error extracting clip from RTSP: {str(e)}")
         return False
 
-def test_video_connection():
+def test_video_connection(refresh=False):
     """
     Test video source connections and return status.
+    The sources are probed concurrently under one overall deadline, and the
+    result is reused for PROBE_CACHE_SECONDS unless a refresh is requested.
+    
+    Args:
+        refresh: Probe again even if a recent result is cached
     
     Returns:
         dict: Status of different video sources
     """
-    status = {
-        'alibi_cloud': False,
-        'rtsp_stream': False,
-        'local_files': False,
-        'ffmpeg': is_ffmpeg_available()
-    }
+    ttl = current_app.config.get('PROBE_CACHE_SECONDS', DEFAULT_CACHE_SECONDS)
+    deadline = current_app.config.get('PROBE_DEADLINE_SECONDS', DEFAULT_DEADLINE_SECONDS)
+    video_source_dir = current_app.config.get('VIDEO_SOURCE_FOLDER', 'video_source')
+    
+    def probe_sources():
+        # The probes run outside the app context, so settings are read up front
+        return run_all({
+            'alibi_cloud': probe_alibi_cloud,
+            'rtsp_stream': probe_rtsp_stream,
+            'local_files': lambda: probe_local_files(video_source_dir),
+            'ffmpeg': is_ffmpeg_available
+        }, deadline=deadline, default=False)
+    
+    return dict(cached_probe('video_connection', probe_sources, ttl=ttl, refresh=refresh))
+
+def probe_alibi_cloud():
+    """
+    Check if the Alibi Cloud API answers with the configured credentials.
+    
+    Returns:
+        bool: True if the status endpoint returned 200
+    """
+    alibi_api_url = os.environ.get('ALIBI_CLOUD_API')
+    alibi_username = os.environ.get('ALIBI_USERNAME')
+    alibi_password = os.environ.get('ALIBI_PASSWORD')
+    
+    if not all([alibi_api_url, alibi_username, alibi_password]):
+        return False
     
     try:
-        # Test Alibi Cloud connection
-        alibi_api_url = os.environ.get('ALIBI_CLOUD_API')
-        alibi_username = os.environ.get('ALIBI_USERNAME')
-        alibi_password = os.environ.get('ALIBI_PASSWORD')
-        
-        if all([alibi_api_url, alibi_username, alibi_password]):
-            try:
-                response = requests.get(
-                    f"{alibi_api_url}/api/status",
-                    auth=(alibi_username, alibi_password),
-                    timeout=10
-                )
-                status['alibi_cloud'] = response.status_code == 200
-            except:
-                pass
-        
-        # Test RTSP stream
-        rtsp_url = os.environ.get('RTSP_STREAM_URL')
-        if rtsp_url and is_ffmpeg_available():
-            try:
-                # Quick test to see if stream is accessible
-                cmd = ['ffprobe', '-v', 'quiet', '-t', '1', rtsp_url]
-                result = subprocess.run(cmd, capture_output=True, timeout=10)
-                status['rtsp_stream'] = result.returncode == 0
-            except:
-                pass
-        
-        # Test local files
-        video_source_dir = current_app.config.get('VIDEO_SOURCE_FOLDER', 'video_source')
-        if os.path.exists(video_source_dir):
-            video_files = glob.glob(os.path.join(video_source_dir, '*.mp4'))
-            status['local_files'] = len(video_files) > 0
-        
-    except Exception as e:
-        logging.error(f"Error testing video connections: {str(e)}")
+        response = requests.get(
+            f"{alibi_api_url}/api/status",
+            auth=(alibi_username, alibi_password),
+            timeout=10
+        )
+        return response.status_code == 200
+    except requests.exceptions.RequestException:
+        return False
+
+def probe_rtsp_stream():
+    """
+    Check if the configured RTSP stream can be opened.
+    
+    Returns:
+        bool: True if ffprobe could read the stream
+    """
+    rtsp_url = os.environ.get('RTSP_STREAM_URL')
+    if not rtsp_url or not is_ffmpeg_available():
+        return False
     
-    return status
+    try:
+        # Quick test to see if stream is accessible
+        cmd = ['ffprobe', '-v', 'quiet', '-t', '1', rtsp_url]
+        result = subprocess.run(cmd, capture_output=True, timeout=10)
+        return result.returncode == 0
+    except (FileNotFoundError, subprocess.TimeoutExpired):
+        return False
+
+def probe_local_files(video_source_dir):
+    """
+    Check if the video source directory holds any videos.
+    
+    Args:
+        video_source_dir: Path to video source directory
+    
+    Returns:
+        bool: True if at least one MP4 file exists
+    """
+    if not os.path.exists(video_source_dir):
+        return False
+    return len(glob.glob(os.path.join(video_source_dir, '*.mp4'))) > 0
 
 def get_video_info(video_path):
     """
     Get information about a video file.
+    Results are cached by path, mtime and size.
     
     Args:
         video_path: Path to video file
@@ -478,22 +598,37 @@ def get_video_info(video_path):
         dict: Video information or None
     """
     try:
-        cmd = [
-            'ffprobe',
-            '-v', 'quiet',
-            '-print_format', 'json',
-            '-show_format',
-            '-show_streams',
-            video_path
-        ]
-        
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        
-        if result.returncode == 0:
-            return json.loads(result.stdout)
-        else:
-            return None
+        return get_media_cache().get('video_info', video_path, probe_video_info)
             
     except Exception as e:
         logging.error(f"Error getting video info: {str(e)}")
         return None
+
+def probe_video_info(video_path):
+    """
+    Run ffprobe for the format and stream information of a video file.
+    
+    Args:
+        video_path: Path to video file
+        
+    Returns:
+        dict: Video information or None
+    """
+    if not get_media_cache().tool_available('ffprobe'):
+        return None
+    
+    cmd = [
+        'ffprobe',
+        '-v', 'quiet',
+        '-print_format', 'json',
+        '-show_format',
+        '-show_streams',
+        video_path
+    ]
+    
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    
+    if result.returncode == 0:
+        return json.loads(result.stdout)
+    else:
+        return None
\ No newline at end of file
@@ -0,0 +1,6 @@
+from app import app
+from utils.job_queue import run_worker
+
+# Dedicated video clip worker, use with VIDEO_WORKER_MODE=external
+if __name__ == "__main__":
+    run_worker(app)